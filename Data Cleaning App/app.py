@@ -2,16 +2,21 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from modules.data_loader import load_data
-from modules.missing_values import handle_missing_values
-from modules.duplicates import handle_duplicates
-from modules.outliers import handle_outliers
-from modules.data_types import fix_data_types
-from modules.text_cleaning import handle_text_encoded_values, clean_text_values
-from modules.feature_engineering import engineer_features
-from modules.data_export import export_data
-from modules.eda import exploratory_analysis
 from modules.auth import login_form
 from modules.logger import get_logger
+from modules.plan import CleaningPlan
+from modules.history import DatasetHistory
+from modules.instrumentation import ProfileLog, set_session_log
+from modules.metrics import get_registry, start_reporting
+from modules.session_data import get_manager
+from modules.job_panel import keep_polling
+# tab modules are imported when their tab first runs
+from modules.lazy import lazy_import
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Copy-on-write lets history versions and df_original share unchanged
+# column buffers with the working frame instead of holding full copies.
+pd.set_option("mode.copy_on_write", True)
 
 st.set_page_config(page_title="Data Cleaning App", page_icon="🧹", layout="wide")
 
@@ -20,6 +25,8 @@ st.markdown("**A comprehensive tool for data scientists and students to clean an
 
 logger = get_logger('data-clean-app')
 logger.info('Starting Data Cleaning App')
+# snapshots for the /metrics and /ready endpoints of health_app.py
+start_reporting()
 
 # Authentication
 if 'logged_in' not in st.session_state:
@@ -37,64 +44,155 @@ if not st.session_state.get('logged_in'):
         st.info('Please log in via the sidebar to continue')
         st.stop()
 
-if 'df' not in st.session_state:
-    st.session_state.df = None
-if 'df_original' not in st.session_state:
-    st.session_state.df_original = None
+if 'session_data' not in st.session_state:
+    ctx = get_script_run_ctx()
+    st.session_state.session_data = get_manager().create(ctx.session_id if ctx else None)
+# the working frame, original and history; spilled to disk while other
+# sessions need the memory, and reloaded here on first use
+data = st.session_state.session_data
+if 'plan' not in st.session_state:
+    st.session_state.plan = CleaningPlan()
+if 'profile_log' not in st.session_state:
+    st.session_state.profile_log = ProfileLog()
+# operations measured during this run are listed in the profiler panel
+set_session_log(st.session_state.profile_log)
+
+
+def commit(df, label):
+    """Make ``df`` the working dataset, recording a history version if it changed."""
+    data.commit(df, label)
+
+
+def _undo():
+    data.undo()
+
+
+def _redo():
+    data.redo()
+
+
+def history_controls():
+    history = data.history
+    if history is None:
+        return
+    st.sidebar.header("🕘 History")
+    col1, col2 = st.sidebar.columns(2)
+    # callbacks run before the script, so every tab already sees the new version
+    with col1:
+        st.button("↩️ Undo", key="undo", on_click=_undo, disabled=not history.can_undo, use_container_width=True)
+    with col2:
+        st.button("↪️ Redo", key="redo", on_click=_redo, disabled=not history.can_redo, use_container_width=True)
+    st.sidebar.caption(f"Step {history.position + 1} of {len(history)}: {history.labels[history.position]} "
+                       f"({history.nbytes / 1024**2:.1f} MB held)")
+
+
+def profiler_panel():
+    log = st.session_state.profile_log
+    if not len(log):
+        return
+    with st.sidebar.expander(f"⏱️ Profiler ({len(log)} steps)"):
+        st.caption("Slowest steps of this session")
+        st.dataframe(log.slowest(10).round(3), hide_index=True, use_container_width=True)
+        st.button("Clear", key="profiler_clear", on_click=log.clear)
+
+
+def report_session():
+    """Keep all sessions within the memory budget and record this one for the metrics snapshot."""
+    get_manager().enforce(keep=data)
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        get_registry().track_session(ctx.session_id, data.nbytes)
+
+
+def show_pending_plan():
+    if len(st.session_state.plan):
+        st.info(f"{len(st.session_state.plan)} queued text cleaning steps are not applied yet. Run them from the Text Cleaning tab.")
+
+history_controls()
 
 tabs = st.tabs(["📤 Load Data", "📊 EDA", "🔤 Text Cleaning", "⚠️ Missing Values", "🔄 Duplicates", "📈 Outliers", "🏷️ Data Types", "⚡ Features", "💾 Export"])
 
 with tabs[0]:
-    st.session_state.df, st.session_state.df_original = load_data()
+    df, data.df_original = load_data()
+    if df is None:
+        data.history = None
+    elif data.history is None or df is not data.history.current():
+        data.history = DatasetHistory(df)
+    data.df = df
+    if st.session_state.get('plan_file_key') != st.session_state.get('loaded_file_key'):
+        # queued steps belong to the previous dataset
+        st.session_state.plan.clear()
+        st.session_state.plan_file_key = st.session_state.get('loaded_file_key')
 
 with tabs[1]:
-    if st.session_state.df is not None:
-        exploratory_analysis(st.session_state.df)
+    if data.df is not None:
+        show_pending_plan()
+        lazy_import('modules.eda').exploratory_analysis(data.df)
     else:
         st.warning("Load data first")
 
 with tabs[2]:
-    if st.session_state.df is not None:
+    if data.df is not None:
+        text_cleaning = lazy_import('modules.text_cleaning')
         choice = st.radio("Text Operation", ["Text-encoded numbers", "Clean text values"])
         if choice == "Text-encoded numbers":
-            st.session_state.df = handle_text_encoded_values(st.session_state.df)
+            commit(text_cleaning.handle_text_encoded_values(data.df, st.session_state.plan), "Text-encoded numbers")
         else:
-            st.session_state.df = clean_text_values(st.session_state.df)
+            commit(text_cleaning.clean_text_values(data.df, st.session_state.plan), "Clean text values")
+        commit(text_cleaning.show_plan(data.df, st.session_state.plan), "Run plan")
     else:
         st.warning("Load data first")
 
 with tabs[3]:
-    if st.session_state.df is not None:
-        st.session_state.df = handle_missing_values(st.session_state.df)
+    if data.df is not None:
+        show_pending_plan()
+        commit(lazy_import('modules.missing_values').handle_missing_values(data.df), "Missing values")
     else:
         st.warning("Load data first")
 
 with tabs[4]:
-    if st.session_state.df is not None:
-        st.session_state.df = handle_duplicates(st.session_state.df)
+    if data.df is not None:
+        show_pending_plan()
+        commit(lazy_import('modules.duplicates').handle_duplicates(data.df), "Duplicates")
     else:
         st.warning("Load data first")
 
 with tabs[5]:
-    if st.session_state.df is not None:
-        st.session_state.df = handle_outliers(st.session_state.df)
+    if data.df is not None:
+        show_pending_plan()
+        commit(lazy_import('modules.outliers').handle_outliers(data.df), "Outliers")
     else:
         st.warning("Load data first")
 
 with tabs[6]:
-    if st.session_state.df is not None:
-        st.session_state.df = fix_data_types(st.session_state.df)
+    if data.df is not None:
+        show_pending_plan()
+        commit(lazy_import('modules.data_types').fix_data_types(data.df), "Data types")
     else:
         st.warning("Load data first")
 
 with tabs[7]:
-    if st.session_state.df is not None:
-        st.session_state.df = engineer_features(st.session_state.df)
+    if data.df is not None:
+        show_pending_plan()
+        commit(lazy_import('modules.feature_engineering').engineer_features(data.df), "Features")
     else:
         st.warning("Load data first")
 
 with tabs[8]:
-    if st.session_state.df is not None:
-        export_data(st.session_state.df, st.session_state.df_original)
+    if data.df is not None:
+        if len(st.session_state.plan):
+            show_pending_plan()
+            # the export needs the data, so this is where queued steps finally run
+            if st.button("Run queued steps before export", key="export_run_plan"):
+                commit(st.session_state.plan.execute(data.df), "Run plan")
+                st.session_state.plan.clear()
+                st.rerun()
+        lazy_import('modules.data_export').export_data(data.df, data.df_original)
     else:
         st.warning("Load data first")
+
+# drawn last so it includes the steps run above
+profiler_panel()
+report_session()
+# background jobs update their progress bars through reruns
+keep_polling()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Time and memory-profile every cleaning step on generated messy data.
+
+Usage:
+  python benchmarks/bench_suite.py --rows 1e4 1e5 1e6        # compare with the baseline
+  python benchmarks/bench_suite.py --rows 1e4 1e5 --save     # record a new baseline
+  python benchmarks/bench_suite.py --rows 1e5 --only knn_impute fuzzy_duplicates
+
+Each size is generated by ``messy_data.make_messy`` with a fixed seed and
+written to CSV. Then the steps run in the order a user would take them:
+the loader, text cleaning and type fixing each feed the next step, and the
+imputation, duplicate, outlier and export steps all start from the typed
+frame. Every step is measured with ``modules.instrumentation`` (wall and CPU
+time, peak memory above the start of the step), on a fresh copy of its
+input so caches keyed by column buffers start cold. The best of
+``--repeat`` runs is kept.
+
+Results are compared with ``benchmarks/baseline.json``. A step regresses
+when it is slower or uses more memory than the baseline by more than the
+tolerance and by more than a small absolute margin (timer noise). The
+script exits with status 1 when any step regressed. Baselines depend on
+the machine; record one with ``--save`` before comparing on a new one.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from messy_data import make_messy, rows_arg  # noqa: E402
+from modules import cleaning  # noqa: E402
+from modules.data_types import compact_dtypes  # noqa: E402
+from modules.fuzzy import find_fuzzy_duplicates  # noqa: E402
+from modules.instrumentation import profile  # noqa: E402
+from modules.readers import read_file, write_file  # noqa: E402
+from modules.writers import export_to_spool  # noqa: E402
+
+# as in app.py; the column caches rely on it
+pd.set_option("mode.copy_on_write", True)
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+NUMERIC = ['age', 'experience', 'salary', 'score']
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_MB = 16
+
+
+def load_csv(path):
+    return read_file(path)
+
+
+def clean_text(df):
+    df = cleaning.replace_null_strings(df)
+    return cleaning.strip_spaces(df)
+
+
+def fix_types(df):
+    df = cleaning.convert_text_numbers(df, 'age')
+    df = cleaning.convert_column(df, 'age', 'float')
+    return cleaning.convert_column(df, 'city', 'category')
+
+
+def export(fmt):
+    def run(df):
+        export_to_spool(df, fmt).close()
+    return run
+
+
+# name, function, input ('csv' for the file, 'raw' for the loaded frame, 'text' after text cleaning,
+# 'typed' after type fixing), output stage or None, and the largest size it runs at
+STEPS = [
+    ('load_csv', load_csv, 'csv', 'raw', None),
+    ('text_numbers', lambda df: cleaning.convert_text_numbers(df, 'age'), 'raw', None, None),
+    ('null_tokens_strip', clean_text, 'raw', 'text', None),
+    ('fix_dtypes', fix_types, 'text', 'typed', None),
+    ('compact_dtypes', lambda df: compact_dtypes(df)[0], 'typed', None, None),
+    ('fill_median', lambda df: cleaning.fill_missing(df, NUMERIC, 'median'), 'typed', None, None),
+    ('knn_impute', lambda df: cleaning.knn_impute(df, NUMERIC), 'typed', None, 1_000_000),
+    ('remove_duplicates', cleaning.remove_duplicates, 'typed', None, None),
+    ('fuzzy_duplicates', lambda df: find_fuzzy_duplicates(df, ['name'], 0.85, blocking=['city']), 'typed', None,
+     100_000),
+    ('outliers_iqr', lambda df: cleaning.treat_outlier_columns(df, NUMERIC, 'iqr', 'remove'), 'typed', None, None),
+    ('isolation_forest', lambda df: cleaning.remove_anomalies(df, NUMERIC), 'typed', None, 1_000_000),
+    ('export_csv', export('csv'), 'typed', None, None),
+    ('export_parquet', export('parquet'), 'typed', None, None),
+]
+
+
+def measure(name, func, data, repeat):
+    """Best (fastest) profile record of ``repeat`` runs of ``func`` on fresh copies of ``data``."""
+    best = result = None
+    for _ in range(repeat):
+        fresh = data.copy() if isinstance(data, pd.DataFrame) else data
+        cleaning._parse_number.cache_clear()
+        gc.collect()
+        with profile(f'bench.{name}', fresh) as step:
+            result = func(fresh)
+            step.output(result)
+        if best is None or step.record['wall_s'] < best['wall_s']:
+            best = step.record
+        del fresh
+    record = {key: best[key] for key in ('rows_in', 'rows_out')}
+    for key, digits in (('wall_s', 4), ('cpu_s', 4), ('peak_mb', 2)):
+        record[key] = round(best[key], digits) if best[key] is not None else None
+    return record, result
+
+
+def run_size(rows, seed, repeat, only, workdir):
+    path = os.path.join(workdir, f'messy_{rows}.csv')
+    write_file(make_messy(rows, seed=seed), path)
+    stages = {'csv': path}
+    results = {}
+    for name, func, source, output, max_rows in STEPS:
+        if max_rows is not None and rows > max_rows:
+            continue
+        if only and name not in only and output is None:
+            continue
+        record, result = measure(name, func, stages[source], repeat if not only or name in only else 1)
+        if output is not None:
+            stages[output] = result
+        if not only or name in only:
+            results[name] = record
+            print(f"{rows:>11,}  {name:<20} {record['wall_s']:9.3f}s  {_mb(record['peak_mb'])}", flush=True)
+    os.remove(path)
+    return results
+
+
+def _mb(value):
+    return f"{value:8.1f} MB" if value is not None else '       - MB'
+
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Rows of (rows, step, metric, baseline, current, change) for every regression."""
+    regressions = []
+    for rows, steps in results.items():
+        for name, record in steps.items():
+            base = baseline.get(rows, {}).get(name)
+            if base is None:
+                continue
+            for metric, tol, margin in (('wall_s', tolerance, MIN_SECONDS), ('peak_mb', memory_tolerance, MIN_MB)):
+                old, new = base.get(metric), record.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + tol) and new - old > margin:
+                    regressions.append((rows, name, metric, old, new, (new - old) / old if old else np.inf))
+    return regressions
+
+
+def machine():
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'profile_memory': os.environ.get('DATA_CLEAN_PROFILE_MEMORY', 'rss'),
+            'recorded': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleaning steps on generated messy data")
+    parser.add_argument("--rows", type=rows_arg, nargs='+', default=[10_000, 100_000],
+                        help="dataset sizes, e.g. 1e4 1e5 1e6 1e7")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs='+', choices=[step[0] for step in STEPS], help="steps to measure")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action='store_true', help="record these results in the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed peak memory growth")
+    parser.add_argument("--verbose", action='store_true', help="log every profiled step")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+        for rows in args.rows:
+            results[str(rows)] = run_size(rows, args.seed, args.repeat, args.only, workdir)
+
+    saved = json.loads(args.baseline.read_text()) if args.baseline.exists() else {'machine': None, 'results': {}}
+    if args.save:
+        for rows, steps in results.items():
+            saved['results'].setdefault(rows, {}).update(steps)
+        saved['machine'] = machine()
+        args.baseline.write_text(json.dumps(saved, indent=2, sort_keys=True) + '\n')
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not saved['results']:
+        print(f"No baseline at {args.baseline}; record one with --save")
+        return 0
+    regressions = compare(results, saved['results'], args.tolerance, args.memory_tolerance)
+    for rows, name, metric, old, new, change in regressions:
+        unit = 's' if metric == 'wall_s' else ' MB'
+        print(f"REGRESSION {int(rows):,} rows {name} {metric}: {old:.3f}{unit} -> {new:.3f}{unit} ({change:+.0%})")
+    if not regressions:
+        print(f"No regressions against {args.baseline.name} (recorded {saved['machine']['recorded']})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Seeded generator of messy datasets for benchmarks.
+
+Usage:
+  python benchmarks/messy_data.py --rows 1000000 --out messy.csv
+
+The same ``rows`` and ``seed`` always give the same frame. It has the
+problems the app is built to clean, at any size:
+
+- ``name``: unique-ish names with stray spaces, shouting case and
+  near-duplicates (one-letter typos of another row's name)
+- ``age``: numbers stored as text, mixed with word numbers
+  ("twenty-two"), null tokens ("N/A", "?") and impossible ages
+- ``salary``, ``experience``, ``score``: numeric with missing values and
+  extreme outliers
+- ``city``: a low-cardinality column with inconsistent case and spaces
+- ``joined``: dates in two formats
+- ``active``: mixed types (booleans, 0/1, "yes"/"no", null tokens)
+- exact duplicate rows, shuffled among the others
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from modules.readers import write_file  # noqa: E402
+
+FIRST = ['Ali', 'Sara', 'Ahmed', 'Fatima', 'John', 'Maria', 'Omar', 'Aisha', 'David', 'Elena', 'Hassan', 'Zara',
+         'Michael', 'Sofia', 'Bilal', 'Hina', 'James', 'Laura', 'Usman', 'Nadia', 'Peter', 'Anna', 'Imran', 'Mina']
+SYLLABLES = ['ka', 'ra', 'mo', 'li', 'sha', 'no', 'ven', 'tar', 'el', 'dor', 'bi', 'zu', 'qui', 'man', 'son', 'ber',
+             'ha', 'tel', 'ro', 'gan', 'vi', 'din', 'lo', 'pe', 'us', 'mar', 'ek', 'fi', 'st', 'ow']
+CITIES = ['Lahore', 'Karachi', 'Islamabad', 'London', 'Paris', 'Berlin', 'Madrid', 'New York', 'Toronto', 'Dubai',
+          'Sydney', 'Tokyo', 'Cairo', 'Nairobi', 'Lima', 'Oslo', 'Rome', 'Delhi', 'Seoul', 'Chicago']
+NULL_TOKENS = ['N/A', 'null', 'NA', '?', 'None', 'nan']
+WORD_NUMBERS = ['eighteen', 'twenty', 'twenty-two', 'thirty five', 'forty-one', 'fifty', 'sixty-three', 'seventy']
+ACTIVE = np.array([True, False, 'yes', 'no', 'Yes', 1, 0, 'N/A'], dtype=object)
+# Distinct names are drawn from a pool of at most this many
+NAME_POOL = 500_000
+
+
+def _names(rng, rows):
+    size = min(rows, NAME_POOL)
+    syllables = np.array(SYLLABLES)
+    last = syllables[rng.integers(0, len(syllables), size)]
+    for _ in range(2):
+        last = np.char.add(last, syllables[rng.integers(0, len(syllables), size)])
+    pool = np.char.add(np.char.add(np.array(FIRST)[rng.integers(0, len(FIRST), size)], ' '),
+                       np.char.capitalize(last)).astype(object)
+    return pool[rng.permutation(size) if rows <= size else rng.integers(0, size, rows)]
+
+
+def _typo(rng, text):
+    i = int(rng.integers(0, len(text) - 1))
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def _pick(rng, rows, *choices):
+    """Index arrays splitting ``rows`` by the probabilities in ``choices``; the rest are not returned."""
+    draw = rng.random(rows)
+    edges = np.cumsum(choices)
+    return [np.flatnonzero((draw >= lo) & (draw < hi)) for lo, hi in zip(np.r_[0, edges[:-1]], edges)]
+
+
+def make_messy(rows, seed=0, duplicate_rate=0.05, null_rate=0.05, outlier_rate=0.01, near_duplicate_rate=0.02):
+    """A messy DataFrame of ``rows`` rows, the same for the same ``seed``."""
+    rng = np.random.default_rng(seed)
+    unique = max(rows - int(rows * duplicate_rate), 1)
+
+    names = _names(rng, unique)
+    padded, shouting, near = _pick(rng, unique, 0.05, 0.02, near_duplicate_rate)
+    names[near] = [_typo(rng, name) for name in names[rng.integers(0, unique, len(near))]]
+    names[padded] = np.char.add(np.char.add('  ', names[padded].astype(str)), ' ').astype(object)
+    names[shouting] = np.char.upper(names[shouting].astype(str)).astype(object)
+
+    ages = rng.integers(18, 80, unique)
+    age = np.array([str(n) for n in range(100)] + ['250', '-3'], dtype=object)[ages]
+    words, tokens, impossible = _pick(rng, unique, 0.05, null_rate, outlier_rate)
+    age[words] = np.array(WORD_NUMBERS, dtype=object)[rng.integers(0, len(WORD_NUMBERS), len(words))]
+    age[tokens] = np.array(NULL_TOKENS, dtype=object)[rng.integers(0, len(NULL_TOKENS), len(tokens))]
+    age[impossible] = np.where(rng.random(len(impossible)) < 0.5, '250', '-3')
+
+    experience = np.clip(ages - 22 + rng.normal(0, 3, unique), 0, None).round(1)
+    salary = (rng.lognormal(10.8, 0.4, unique) * (1 + experience / 40)).round(2)
+    score = rng.normal(70, 12, unique).round(1)
+    for values in (experience, salary, score):
+        missing, extreme = _pick(rng, unique, null_rate, outlier_rate)
+        values[missing] = np.nan
+        values[extreme] *= 50
+
+    cities = np.array(CITIES + [f' {c}' for c in CITIES] + [c.upper() for c in CITIES], dtype=object)
+    city = cities[np.where(rng.random(unique) < 0.9, rng.integers(0, len(CITIES), unique),
+                           rng.integers(len(CITIES), len(cities), unique))]
+
+    days = pd.date_range('2010-01-01', periods=5000, freq='D')
+    formats = np.concatenate([days.strftime('%Y-%m-%d'), days.strftime('%d/%m/%Y')]).astype(object)
+    joined = formats[rng.integers(0, len(days), unique) + len(days) * (rng.random(unique) < 0.3)]
+    joined[_pick(rng, unique, null_rate)[0]] = np.nan
+
+    active = ACTIVE[rng.integers(0, len(ACTIVE), unique)]
+
+    # exact duplicates repeat earlier rows, shuffled in among them
+    order = np.concatenate([np.arange(unique), rng.integers(0, unique, rows - unique)])
+    rng.shuffle(order)
+    columns = {'id': np.arange(1, unique + 1), 'name': names, 'age': age, 'experience': experience,
+               'salary': salary, 'score': score, 'city': city, 'joined': joined, 'active': active}
+    return pd.DataFrame({name: values[order] for name, values in columns.items()})
+
+
+def rows_arg(text):
+    """Row counts like ``100000`` or ``1e6``."""
+    return int(float(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a messy dataset")
+    parser.add_argument("--rows", type=rows_arg, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="CSV, Excel, JSON, Parquet or Feather file to write")
+    args = parser.parse_args()
+
+    df = make_messy(args.rows, seed=args.seed)
+    write_file(df, args.out)
+    print(f"Wrote {len(df):,} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
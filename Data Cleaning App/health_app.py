@@ -1,7 +1,32 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from modules.metrics import read_snapshot, readiness, render
 
 app = FastAPI()
 
+# Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """503 once the app is over its memory budget or has stopped writing metrics."""
+    snapshot = read_snapshot()
+    is_ready, reason = readiness(snapshot)
+    body = {"status": "ready" if is_ready else "not ready", "reason": reason}
+    if snapshot is not None:
+        body["sessions"] = len(snapshot.get("sessions", {}))
+        body["rss_bytes"] = snapshot.get("rss_bytes")
+        body["memory_budget_bytes"] = snapshot.get("memory_budget_bytes")
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render(read_snapshot()), media_type=PROMETHEUS_CONTENT_TYPE)
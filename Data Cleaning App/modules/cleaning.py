@@ -0,0 +1,440 @@
+"""UI-free cleaning operations.
+
+Every function takes a DataFrame plus plain parameters and returns a new
+DataFrame; none of them touch Streamlit. The tabs in ``app.py`` and the
+batch runner in ``scripts/batch_clean.py`` both call into this module.
+"""
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from modules import imputation
+from modules.fingerprints import drop_duplicates, take_rows
+from modules.fuzzy import find_fuzzy_duplicates, merge_clusters
+from modules.outlier_engine import isolation_forest_mask, outlier_bounds, outlier_mask
+from modules.instrumentation import profiled
+from modules.profiling import profile_column
+from modules.stats import frame_quantiles, null_counts, quantiles
+from modules.utils import NULL_STRINGS, text_to_number
+
+TEXT_DTYPES = ['object', 'string', 'category']
+
+
+def _numeric_columns(df):
+    return df.select_dtypes(include=[np.number]).columns.tolist()
+
+
+def _text_columns(df):
+    return df.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+
+
+def _shallow(df):
+    # Operations below only ever replace whole columns, so a shallow copy
+    # keeps the caller's frame intact without duplicating its data.
+    return df.copy(deep=False)
+
+
+# Missing values
+
+def missing_summary(df):
+    counts = null_counts(df)
+    summary = pd.DataFrame({
+        'Column': df.columns,
+        'Missing Count': counts.values,
+        'Missing %': (counts.values / len(df) * 100).round(2) if len(df) else 0.0,
+    })
+    return summary[summary['Missing Count'] > 0].sort_values('Missing %', ascending=False)
+
+
+@profiled
+def drop_missing_rows(df, subset=None):
+    present = (df if subset is None else df[subset]).notna().all(axis=1).to_numpy()
+    return take_rows(df, np.flatnonzero(present))
+
+
+@profiled
+def drop_missing_columns(df, threshold=50):
+    """Drop columns whose missing percentage is above ``threshold``."""
+    if not len(df):
+        return df
+    missing_pct = df.isnull().sum() / len(df) * 100
+    return df.drop(columns=missing_pct[missing_pct > threshold].index.tolist())
+
+
+def _fillna(series, value):
+    # a category column (see data_types.compact_dtypes) only takes known categories
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def fill_custom_value(df, column, value):
+    """Fill one column with a user-supplied value.
+
+    Null-like tokens (``'NA'``, ``'null'``...) fill with NaN. Raises
+    ``ValueError`` when a numeric column is given a non-numeric value.
+    """
+    df = _shallow(df)
+    if str(value) in NULL_STRINGS:
+        df[column] = df[column].fillna(np.nan)
+        return df
+    if df[column].dtype.kind in ('i', 'u', 'f'):
+        parsed = pd.to_numeric(value, errors='coerce')
+        if pd.isna(parsed):
+            raise ValueError(f"Column '{column}': fill value not numeric")
+        df[column] = df[column].fillna(parsed)
+    else:
+        df[column] = _fillna(df[column], value)
+    return df
+
+
+@profiled
+def fill_missing(df, columns=None, strategy='mean', value=None):
+    """Fill missing values in ``columns`` (all applicable columns if omitted).
+
+    ``strategy`` is one of ``mean``, ``median``, ``mode``, ``ffill``,
+    ``bfill`` or ``value``.
+    """
+    if strategy == 'ffill':
+        return df.ffill() if columns is None else df.assign(**{c: df[c].ffill() for c in columns})
+    if strategy == 'bfill':
+        return df.bfill() if columns is None else df.assign(**{c: df[c].bfill() for c in columns})
+    if columns is None:
+        columns = _numeric_columns(df) if strategy in ('mean', 'median') else df.columns.tolist()
+    if strategy == 'value':
+        for col in columns:
+            df = fill_custom_value(df, col, value)
+        return df
+    df = _shallow(df)
+    for col in columns:
+        if strategy == 'mean':
+            df[col] = df[col].fillna(df[col].mean())
+        elif strategy == 'median':
+            df[col] = df[col].fillna(df[col].median())
+        elif strategy == 'mode':
+            mode = df[col].mode()
+            df[col] = df[col].fillna(mode[0] if not mode.empty else 0)
+        else:
+            raise ValueError(f"Unknown fill strategy: {strategy}")
+    return df
+
+
+@profiled
+def knn_impute(df, columns=None, n_neighbors=5, n_jobs=None, progress=None):
+    """Impute numeric ``columns`` from the nearest complete rows (see :mod:`modules.imputation`)."""
+    if columns is None:
+        columns = _numeric_columns(df)
+    if not columns:
+        return df
+    imputed = imputation.knn_impute(df, columns, n_neighbors=n_neighbors, n_jobs=n_jobs, progress=progress)
+    if not imputed:
+        return df
+    df = _shallow(df)
+    for col, values in imputed.items():
+        df[col] = values
+    return df
+
+
+# Duplicates
+
+@profiled
+def remove_duplicates(df, subset=None, keep='first'):
+    """Drop duplicate rows using the cached row fingerprint index."""
+    return drop_duplicates(df, subset=subset or None, keep=keep)
+
+
+@profiled
+def remove_fuzzy_duplicates(df, columns, threshold=0.85, blocking=None, keep='first'):
+    """Merge near-duplicate rows on ``columns`` (see :mod:`modules.fuzzy`)."""
+    result = find_fuzzy_duplicates(df, columns, thresholds=threshold, blocking=blocking)
+    if not result.duplicate_rows:
+        return df
+    return merge_clusters(df, result.labels, keep=keep)
+
+
+# Outliers
+
+def iqr_bounds(series, k=1.5):
+    q1, q3 = quantiles(series, (0.25, 0.75))
+    iqr = q3 - q1
+    return q1 - k * iqr, q3 + k * iqr
+
+
+@profiled
+def treat_outliers(df, column, action='cap', k=1.5, bounds=None):
+    """Remove, cap or median-replace values outside the IQR bounds of ``column``."""
+    lower, upper = bounds if bounds is not None else iqr_bounds(df[column], k)
+    if action == 'remove':
+        inside = ((df[column] >= lower) & (df[column] <= upper)).to_numpy(dtype=bool, na_value=False)
+        return take_rows(df, np.flatnonzero(inside))
+    df = _shallow(df)
+    if action == 'cap':
+        df[column] = df[column].clip(lower=lower, upper=upper)
+    elif action == 'median':
+        outside = (df[column] < lower) | (df[column] > upper)
+        df[column] = df[column].mask(outside, df[column].median())
+    else:
+        raise ValueError(f"Unknown outlier action: {action}")
+    return df
+
+
+@profiled
+def treat_outlier_columns(df, columns=None, method='iqr', action='remove', k=None):
+    """Remove, cap or median-replace outliers of many numeric columns at once.
+
+    ``method`` is ``'iqr'``, ``'zscore'`` or ``'mad'``; removal drops every
+    row with an outlier in any column in one filtering step.
+    """
+    if action not in ('remove', 'cap', 'median'):
+        raise ValueError(f"Unknown outlier action: {action}")
+    bounds = outlier_bounds(df, columns, method=method, k=k)
+    mask = outlier_mask(df, bounds)
+    if action == 'remove':
+        return take_rows(df, np.flatnonzero(~mask.to_numpy().any(axis=1)))
+    changed = bounds.index[mask.to_numpy().any(axis=0)]
+    if not len(changed):
+        return df
+    medians = frame_quantiles(df, changed, (0.5,))[0.5]
+    df = _shallow(df)
+    for col in changed:
+        if action == 'cap':
+            df[col] = df[col].clip(lower=bounds.at[col, 'lower'], upper=bounds.at[col, 'upper'])
+        else:
+            df[col] = df[col].mask(mask[col], medians[col])
+    return df
+
+
+@profiled
+def remove_anomalies(df, columns=None, contamination='auto', n_jobs=None):
+    """Drop the rows an Isolation Forest flags over ``columns`` (all numeric by default)."""
+    anomalous = isolation_forest_mask(df, columns, contamination=contamination, n_jobs=n_jobs)
+    return take_rows(df, np.flatnonzero(~anomalous))
+
+
+# Data types
+
+@profiled
+def convert_column(df, column, new_type):
+    """Convert ``column`` to ``int`` (nullable), ``float``, ``string`` or ``category``.
+
+    Values that cannot be parsed as numbers become missing.
+    """
+    df = _shallow(df)
+    if new_type == 'int':
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+    elif new_type == 'float':
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    elif new_type == 'string':
+        df[column] = df[column].astype('string')
+    elif new_type == 'category':
+        df[column] = df[column].astype('category')
+    else:
+        raise ValueError(f"Unknown type: {new_type}")
+    return df
+
+
+# Text
+
+def find_mixed_columns(df):
+    """Text columns that mix words with digits or missing values.
+
+    Decided from cached column profiles (see ``modules/profiling.py``), so
+    unchanged columns are not rescanned.
+    """
+    return [col for col in _text_columns(df) if profile_column(df[col]).mixed]
+
+
+@lru_cache(maxsize=100_000)
+def _parse_number(text):
+    # memoized across columns and calls; the same labels recur a lot
+    num = text_to_number(text)
+    if num is None:
+        return None, False
+    return num, True
+
+
+def text_numbers_series(series):
+    """Number words and digit strings in ``series`` as numbers.
+
+    The parser runs once per distinct value and the results are mapped
+    back with a single ``take``, so cost follows the number of distinct
+    values rather than rows. Returns ``series`` unchanged when nothing
+    converts.
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = np.empty(len(uniques), dtype=object)
+    converted = False
+    for i, val in enumerate(uniques):
+        num, ok = _parse_number(str(val).lower().strip())
+        parsed[i] = num if ok else val
+        converted |= ok
+    if not converted:
+        return series
+    # values the parser rejects still go through the usual numeric coercion
+    numbers = pd.to_numeric(pd.Series(parsed, dtype=object), errors='coerce').to_numpy()
+    if (codes < 0).any():
+        # missing values have code -1, which picks the trailing NaN
+        numbers = np.append(numbers.astype('float64'), np.nan)
+    return pd.Series(numbers[codes], index=series.index, name=series.name)
+
+
+def converted_text_count(before, after):
+    """Values that were text in ``before`` and are numbers in ``after``."""
+    codes, uniques = pd.factorize(before)
+    # missing values have code -1, which picks the trailing False
+    is_text = np.array([isinstance(val, str) for val in uniques] + [False])
+    return int((is_text[codes] & after.notna().to_numpy()).sum())
+
+
+def null_strings_series(series):
+    return series.replace(NULL_STRINGS, np.nan)
+
+
+def strip_series(series):
+    return series.astype(str).str.strip()
+
+
+def special_chars_series(series):
+    return series.astype(str).str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
+
+
+def to_numeric_series(series):
+    return pd.to_numeric(series, errors='coerce')
+
+
+def clip_series(series, lower=None, upper=None):
+    return series.clip(lower=lower, upper=upper)
+
+
+def fill_value_series(series, value):
+    return _fillna(series, value)
+
+
+# Element-wise column operations: each output value depends only on the
+# input value (and, at most, on the set of distinct values), which is what
+# lets CleaningPlan evaluate them on distinct values only.
+COLUMN_OPERATIONS = {
+    'convert_text_numbers': text_numbers_series,
+    'replace_null_strings': null_strings_series,
+    'strip_spaces': strip_series,
+    'remove_special_chars': special_chars_series,
+    'to_numeric': to_numeric_series,
+    'clip': clip_series,
+    'fill_value': fill_value_series,
+}
+
+
+def apply_to_columns(df, func, columns=None, **params):
+    """Replace each of ``columns`` (text columns if omitted) with ``func(column)``."""
+    df = _shallow(df)
+    for col in _text_columns(df) if columns is None else columns:
+        df[col] = func(df[col], **params)
+    return df
+
+
+@profiled
+def convert_text_numbers(df, column):
+    """Convert number words and digit strings in ``column`` to numbers."""
+    original = df[column]
+    converted = text_numbers_series(original)
+    if converted is original:
+        return df
+    df = _shallow(df)
+    df[column] = converted
+    return df
+
+
+@profiled
+def replace_null_strings(df, columns=None):
+    return apply_to_columns(df, null_strings_series, columns or None)
+
+
+@profiled
+def strip_spaces(df, columns=None):
+    return apply_to_columns(df, strip_series, columns or None)
+
+
+@profiled
+def remove_special_chars(df, columns=None):
+    return apply_to_columns(df, special_chars_series, columns or None)
+
+
+# Feature engineering
+
+def _widen(series):
+    # compacted int8/int16 columns would silently overflow in arithmetic
+    if series.dtype.kind in ('i', 'u'):
+        return series.astype('int64')
+    return series
+
+
+@profiled
+def create_column(df, name, col_a, operation, col_b):
+    """Create ``name`` as ``col_a <operation> col_b`` (add, subtract, multiply, divide)."""
+    a, b = _widen(df[col_a]), _widen(df[col_b])
+    ops = {'add': a.add, 'subtract': a.sub, 'multiply': a.mul, 'divide': a.div}
+    if operation.lower() not in ops:
+        raise ValueError(f"Unknown operation: {operation}")
+    df = _shallow(df)
+    df[name] = ops[operation.lower()](b)
+    return df
+
+
+@profiled
+def normalize(df, columns):
+    df = _shallow(df)
+    for col in columns:
+        values = _widen(df[col])
+        df[col] = (values - values.min()) / (values.max() - values.min())
+    return df
+
+
+@profiled
+def standardize(df, columns):
+    df = _shallow(df)
+    for col in columns:
+        df[col] = (df[col] - df[col].mean()) / df[col].std()
+    return df
+
+
+OPERATIONS = {
+    'drop_missing_rows': drop_missing_rows,
+    'drop_missing_columns': drop_missing_columns,
+    'fill_missing': fill_missing,
+    'knn_impute': knn_impute,
+    'remove_duplicates': remove_duplicates,
+    'remove_fuzzy_duplicates': remove_fuzzy_duplicates,
+    'treat_outliers': treat_outliers,
+    'treat_outlier_columns': treat_outlier_columns,
+    'remove_anomalies': remove_anomalies,
+    'convert_column': convert_column,
+    'convert_text_numbers': convert_text_numbers,
+    'replace_null_strings': replace_null_strings,
+    'strip_spaces': strip_spaces,
+    'remove_special_chars': remove_special_chars,
+    'create_column': create_column,
+    'normalize': normalize,
+    'standardize': standardize,
+}
+
+
+def apply_step(df, step):
+    """Apply one ``{"op": name, **params}`` step."""
+    params = dict(step)
+    op = params.pop('op')
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {op}")
+    return OPERATIONS[op](df, **params)
+
+
+def run_steps(df, steps, timings=None):
+    """Apply ``steps`` in order; per-step seconds are appended to ``timings`` if given."""
+    for step in steps:
+        start = time.perf_counter()
+        df = apply_step(df, step)
+        if timings is not None:
+            timings.append((step['op'], time.perf_counter() - start))
+    return df
@@ -0,0 +1,96 @@
+"""Caches of per-column results that survive operations on other columns.
+
+Entries are keyed by :func:`modules.utils.buffer_key`, the identity of
+the memory behind a column. Under copy-on-write a column an operation did
+not touch keeps its buffer, so its cached profile or statistics are still
+found after the operation; a changed column has a new buffer and misses.
+Each entry holds a weak reference to the buffer's owner and is ignored
+once that owner is gone, so a recycled address never matches.
+
+Without copy-on-write a column can be changed in place (``df.loc[i, c] =
+v``) and keep its buffer, so a cached value could describe old data. The
+caches are then bypassed: every lookup misses and nothing is stored.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from modules.utils import buffer_key, buffer_owner
+
+
+def _reference(obj):
+    try:
+        return weakref.ref(obj)
+    except TypeError:
+        # not weak-referenceable: keep it alive for the life of the entry
+        return lambda: obj
+
+
+def _columns(series):
+    return list(series) if isinstance(series, (list, tuple)) else [series]
+
+
+def enabled():
+    """Whether buffer identity implies unchanged values, i.e. copy-on-write is on."""
+    return bool(pd.get_option('mode.copy_on_write'))
+
+
+class ColumnCache:
+    """Thread-safe LRU of values computed from one column or a group of columns.
+
+    ``series`` may be a Series or a list of Series; a group entry is valid
+    only while every one of its columns is unchanged.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, series, tag):
+        return tuple(buffer_key(s) for s in _columns(series)) + (tag,)
+
+    def get(self, series, tag=None):
+        if not enabled():
+            self.misses += 1
+            return None
+        key = self._key(series, tag)
+        owners = [buffer_owner(s) for s in _columns(series)]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and all(ref() is owner for ref, owner in zip(entry[0], owners)):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, series, value, tag=None):
+        if not enabled():
+            return value
+        key = self._key(series, tag)
+        with self._lock:
+            self._entries[key] = ([_reference(buffer_owner(s)) for s in _columns(series)], value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def get_or_compute(self, series, compute, tag=None):
+        value = self.get(series, tag)
+        if value is None:
+            value = self.put(series, compute(series), tag)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
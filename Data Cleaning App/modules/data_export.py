@@ -1,6 +1,8 @@
 import streamlit as st
-import pandas as pd
-import io
+from modules.preview import preview_dataframe
+from modules.job_panel import job_result, job_running, start_job
+from modules.instrumentation import profile
+from modules.writers import EXCEL_MAX_ROWS, EXPORT_FORMATS, export_to_spool
 
 def export_data(df, df_original):
     st.subheader("💾 Export Cleaned Data")
@@ -17,24 +19,36 @@ def export_data(df, df_original):
     
     st.markdown("---")
     st.write("**Cleaned Data Preview:**")
-    st.dataframe(df, use_container_width=True)
+    preview_dataframe(df, key="export_preview")
     
     st.markdown("---")
-    export_format = st.radio("Select format", ["CSV", "Excel"], horizontal=True)
+    labels = {label: fmt for fmt, (label, _, _) in EXPORT_FORMATS.items()}
+    export_format = st.radio("Select format", list(labels), horizontal=True)
     filename = st.text_input("Filename (without extension):", "cleaned_data")
+    fmt = labels[export_format]
+    _, extension, mime = EXPORT_FORMATS[fmt]
     
-    # Provide download buttons directly (no intermediate press required)
-    if export_format == "CSV":
-        csv_bytes = df.to_csv(index=False).encode('utf-8')
-        st.download_button(label="Download CSV", data=csv_bytes, file_name=f"{filename}.csv", mime="text/csv")
-    elif export_format == "Excel":
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Cleaned')
-            if df_original is not None:
-                try:
-                    df_original.to_excel(writer, index=False, sheet_name='Original')
-                except Exception:
-                    # ignore writing original if it fails
-                    pass
-        st.download_button(label="Download Excel", data=buffer.getvalue(), file_name=f"{filename}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    data, total = df, len(df)
+    if fmt == 'xlsx':
+        include_original = st.checkbox("Include original data sheet", value=df_original is not None and len(df_original) <= 100_000,
+                                       disabled=df_original is None, key="export_original")
+        data = {'Cleaned': df}
+        if include_original and df_original is not None:
+            data['Original'] = df_original
+            total += len(df_original)
+        if total >= EXCEL_MAX_ROWS:
+            st.caption("Sheets longer than Excel's 1,048,576-row limit continue on additional sheets.")
+    
+    # written in chunks to a spooled temp file, never as one in-memory string
+    if st.button("Prepare download", key="export_prepare", disabled=job_running('export')):
+        def export(report):
+            with profile(f"export_{fmt}", df):
+                spool = export_to_spool(data, fmt, progress=lambda rows: report(
+                    rows / max(total, 1), f"wrote {rows:,} of {total:,} rows"))
+            return spool, export_format, f"{filename}.{extension}", mime
+        start_job('export', "Export", export, df)
+    prepared = job_result('export', df)
+    if prepared is not None:
+        spool, label, file_name, file_mime = prepared
+        with spool:
+            st.download_button(label=f"Download {label}", data=spool.read(), file_name=file_name, mime=file_mime)
@@ -1,18 +1,46 @@
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
-import io
 from modules.logger import get_logger
+from modules.parse_cache import content_key, get_parse_cache
+from modules.data_types import compact_dtypes
+from modules.fingerprints import duplicate_count
+from modules.outlier_engine import bounds_from_stats, outlier_mask
+from modules.readers import (NDJSON_EXTENSIONS, excel_header, excel_sheets, json_fields, read_excel, read_file,
+                             read_json)
+from modules.sources import ARROW_EXTENSIONS, ServerFile, arrow_schema, data_dirs, list_files, read_arrow
+from modules.streaming import get_export_dir, stream_csv, stream_json
+from modules.utils import NA_VALUES
+from modules.writers import EXPORT_FORMATS, export_to_file
+from modules.preview import preview_dataframe
+from modules.instrumentation import profile
 
 logger = get_logger('data_loader')
 
+JSON_EXTENSIONS = ('.json',) + NDJSON_EXTENSIONS
+# Exports of chunked datasets larger than this stay on the server instead of
+# being read into memory for the browser
+DOWNLOAD_MAX_BYTES = int(float(os.environ.get('DATA_CLEAN_DOWNLOAD_MAX_MB', '200')) * 1024**2)
+
 def load_data():
     st.subheader("📂 Upload Your Dataset")
     
-    uploaded_file = st.file_uploader(
-        "Choose a file",
-        type=["csv", "xlsx", "xls", "json"],
-        help="Supported formats: CSV, Excel, JSON"
-    )
+    # files in the allow-listed data directories are read in place, not uploaded
+    server = bool(data_dirs()) and st.radio("Source", ["Upload", "Server files"], horizontal=True,
+                                            key="data_source") == "Server files"
+    if server:
+        uploaded_file = server_file_picker()
+    else:
+        uploaded_file = st.file_uploader(
+            "Choose a file",
+            type=["csv", "xlsx", "xls", "json", "jsonl", "ndjson"],
+            help="Supported formats: CSV, Excel, JSON and line-delimited JSON"
+        )
+    
+    optimize = st.checkbox("Optimize memory usage on load", value=True, key="compact_on_load",
+                           help="Downcast numbers and store text as category or Arrow strings")
     
     df = None
     df_original = None
@@ -24,40 +52,284 @@ def load_data():
             size = uploaded_file.size
         except Exception:
             size = None
-        if size and size > MAX_BYTES:
+        name = uploaded_file.name.lower()
+        sheets = columns = None
+        if name.endswith(ARROW_EXTENSIONS):
+            columns = arrow_options(uploaded_file)
+        elif name.endswith(JSON_EXTENSIONS):
+            columns = json_options(uploaded_file)
+        # memory-mapped Arrow and Parquet files have no size limit
+        if size and size > MAX_BYTES and not name.endswith(ARROW_EXTENSIONS):
+            if name.endswith(('.csv',) + JSON_EXTENSIONS):
+                # large CSV and JSON files are streamed to disk instead of being rejected
+                load_chunked(uploaded_file, fields=columns)
+                return None, None
             st.error(f"File too large ({size / (1024**2):.1f} MB). Max allowed is {MAX_BYTES / (1024**2):.0f} MB")
             return None, None
+        if name.endswith('.xlsx'):
+            sheets, columns = excel_options(uploaded_file)
+            if not sheets:
+                st.info("Select at least one sheet")
+                return None, None
+        file_key = (getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, size), optimize,
+                    sheets, columns)
+        data = st.session_state.get('session_data')
+        if st.session_state.get('loaded_file_key') == file_key and data is not None and data.df is not None:
+            # same upload as the previous run: keep the session's working copy
+            df = data.df
+            df_original = data.df_original
+            show_load_summary(df, st.session_state.get('load_stats', {}))
+            show_compaction_report(st.session_state.get('compaction_report'))
+            return df, df_original
         try:
-            na_values = ['None', 'none', 'NONE', 'null', 'NULL', 'NaN', 'nan', '??', '?', 'NA', 'N/A', '']
-            
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file, na_values=na_values, keep_default_na=True)
-            elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(uploaded_file)
-            elif uploaded_file.name.endswith('.json'):
-                df = pd.read_json(uploaded_file)
-            
-            df_original = df.copy()
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Rows", df.shape[0])
-            with col2:
-                st.metric("Columns", df.shape[1])
-            with col3:
-                st.metric("Memory Usage", f"{df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
-            with col4:
-                st.metric("Duplicates", df.duplicated().sum())
+            with profile('load_file', file=uploaded_file.name, size_bytes=size) as step:
+                df = parse_upload(uploaded_file, sheets=sheets, columns=columns)
+                report = None
+                if optimize:
+                    df, report = compact_dtypes(df)
+                step.output(df)
+            # with copy-on-write a shallow copy keeps the original intact
+            df_original = df.copy(deep=not pd.get_option('mode.copy_on_write'))
+            stats = {
+                'memory_mb': df.memory_usage(deep=True).sum() / 1024**2,
+                'duplicates': duplicate_count(df),
+            }
+            if report is not None:
+                stats['saved_mb'] = report['Bytes Saved'].sum() / 1024**2
             
+            st.session_state.loaded_file_key = file_key
+            st.session_state.load_stats = stats
+            st.session_state.compaction_report = report
             st.success("✅ Data loaded successfully!")
             logger.info(f"Loaded file {uploaded_file.name} ({size if size else 'unknown size'})")
-            st.subheader("📋 Data Preview")
-            st.dataframe(df, use_container_width=True)
+            show_load_summary(df, stats)
+            show_compaction_report(report)
             
         except Exception as e:
             st.error(f"❌ Error loading file: {str(e)}")
             return None, None
-    else:
+    elif not server:
         st.info("👆 Upload a CSV, Excel, or JSON file to get started")
     
     return df, df_original
+
+
+def show_load_summary(df, stats):
+    # memory and duplicate counts are computed once at load, not on every rerun
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Rows", df.shape[0])
+    with col2:
+        st.metric("Columns", df.shape[1])
+    with col3:
+        saved = stats.get('saved_mb')
+        st.metric("Memory Usage", f"{stats.get('memory_mb', 0):.2f} MB",
+                  delta=f"-{saved:.2f} MB" if saved else None, delta_color="inverse")
+    with col4:
+        st.metric("Duplicates", stats.get('duplicates'))
+    st.subheader("📋 Data Preview")
+    preview_dataframe(df, key="loaded_preview")
+
+
+def show_compaction_report(report):
+    if report is None:
+        return
+    changed = report[report['Bytes Saved'] > 0]
+    with st.expander(f"Memory optimization: {len(changed)} columns compacted"):
+        st.dataframe(changed, use_container_width=True)
+
+
+def excel_options(uploaded_file):
+    """Sheet and column pickers for an .xlsx upload; returns ``(sheets, columns or None)``."""
+    key = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    info = st.session_state.get('excel_info')
+    if info is None or info[0] != key:
+        # sheet sizes and headers come from the workbook's first rows only
+        data = uploaded_file.getvalue()
+        sheets = excel_sheets(data)
+        headers = {name: excel_header(data, name) for name, _, _ in sheets}
+        info = st.session_state.excel_info = (key, sheets, headers)
+    _, sheets, headers = info
+    names = [name for name, _, _ in sheets]
+    if len(names) == 1:
+        selected = names
+    else:
+        selected = st.multiselect("Sheets", names, default=names[:1], key="excel_sheets")
+        st.caption(" · ".join(f"{name}: {max(rows - 1, 0):,} rows" for name, rows, _ in sheets))
+    available = list(dict.fromkeys(col for name in selected for col in headers[name]))
+    columns = st.multiselect("Columns (all if empty)", available, key="excel_columns")
+    return tuple(selected), tuple(columns) or None
+
+
+def server_file_picker():
+    """Pick a file from the data directories; returns a :class:`~modules.sources.ServerFile` or None."""
+    files = {label: (path, size) for label, path, size in list_files()}
+    if not files:
+        st.info("No supported files in the data directories")
+        return None
+    label = st.selectbox("File", list(files), index=None, placeholder="Choose a file", key="server_file")
+    if label is None:
+        return None
+    path, size = files[label]
+    st.caption(f"{size / 1024**2:,.1f} MB on the server")
+    try:
+        return ServerFile(path)
+    except (OSError, PermissionError) as e:
+        st.error(f"❌ Cannot open {label}: {e}")
+        return None
+
+
+def arrow_options(server_file):
+    """Column picker for a Parquet or Arrow file, from its metadata; returns the columns or None for all."""
+    schema, rows = arrow_schema(server_file.path)
+    names = [name for name in schema.names if not name.startswith('__index_level_')]
+    st.caption(f"{rows:,} rows · {len(names)} columns" if rows is not None else f"{len(names)} columns")
+    columns = st.multiselect("Columns (all if empty)", names, key="arrow_columns")
+    return tuple(columns) or None
+
+
+def json_options(uploaded_file):
+    """Field picker for a JSON upload; returns the selected flattened fields, or None for all."""
+    key = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    info = st.session_state.get('json_info')
+    if info is None or info[0] != key:
+        # fields are listed from the first records only; server files are read from their path
+        source = getattr(uploaded_file, 'path', uploaded_file)
+        info = st.session_state.json_info = (key, json_fields(source, ndjson=_ndjson(uploaded_file)))
+    fields = st.multiselect("Fields (all if empty)", info[1], key="json_fields",
+                            help="Nested objects are flattened into dotted names such as user.name")
+    return tuple(fields) or None
+
+
+def _ndjson(uploaded_file):
+    # .jsonl/.ndjson are line-delimited by name; .json is sniffed
+    return True if uploaded_file.name.lower().endswith(NDJSON_EXTENSIONS) else None
+
+
+def parse_upload(uploaded_file, na_values=None, sheets=None, columns=None):
+    """Parse an uploaded file, reusing the shared parse cache for identical bytes.
+
+    Excel workbooks are parsed only for the selected ``sheets`` and
+    ``columns``, and the result is kept on disk as Parquet as well. JSON
+    files keep only the selected ``columns`` (flattened field names).
+    """
+    if na_values is None:
+        na_values = NA_VALUES
+    if uploaded_file.name.lower().endswith(ARROW_EXTENSIONS):
+        # memory-mapped in place: there are no upload bytes to parse or cache
+        return read_arrow(uploaded_file.path, columns=columns)
+    data = uploaded_file.getvalue()
+    name = uploaded_file.name.lower().rsplit('.', 1)[-1]
+    if name == 'xlsx':
+        key = content_key(data, name=name, na_values=tuple(na_values), sheets=sheets, columns=columns)
+        return get_parse_cache().get_or_parse(
+            key, lambda: read_excel(data, sheets=sheets, columns=columns, na_values=na_values), persist=True)
+    if name in ('json', 'jsonl', 'ndjson'):
+        key = content_key(data, name=name, fields=columns)
+        return get_parse_cache().get_or_parse(
+            key, lambda: read_json(data, fields=columns, ndjson=_ndjson(uploaded_file)))
+    key = content_key(data, name=name, na_values=tuple(na_values))
+    return get_parse_cache().get_or_parse(key, lambda: read_file(data, uploaded_file.name, na_values))
+
+
+def load_chunked(uploaded_file, fields=None):
+    """Stream a large CSV or JSON file to an on-disk dataset and show its running summary.
+
+    The dataset is kept in ``st.session_state.chunked`` so reruns reuse it
+    instead of reading the upload again.
+    """
+    key = (getattr(uploaded_file, 'file_id', None) or uploaded_file.name, uploaded_file.size, fields)
+    dataset = st.session_state.get('chunked')
+    if dataset is None or st.session_state.get('chunked_key') != key:
+        if dataset is not None:
+            dataset.cleanup()
+        progress = st.empty()
+        try:
+            # server files are streamed from their path
+            source = getattr(uploaded_file, 'path', uploaded_file)
+            if hasattr(source, 'seek'):
+                source.seek(0)
+
+            def report(rows):
+                progress.write(f"Read {rows:,} rows...")
+
+            with profile('stream_file', file=uploaded_file.name, size_bytes=uploaded_file.size) as step:
+                if uploaded_file.name.lower().endswith(JSON_EXTENSIONS):
+                    dataset = step.output(stream_json(source, fields=fields, progress=report))
+                else:
+                    dataset = step.output(stream_csv(source, progress=report))
+        except Exception as e:
+            st.error(f"❌ Error loading file: {str(e)}")
+            return None
+        progress.empty()
+        st.session_state.chunked = dataset
+        st.session_state.chunked_key = key
+        logger.info(f"Streamed file {uploaded_file.name} ({uploaded_file.size} bytes) to {dataset.path}")
+
+    show_chunked_dataset(dataset)
+    return dataset
+
+
+def show_chunked_dataset(dataset):
+    st.info("Large file: the working dataset is kept on disk and processed in chunks. Clean and export it here; "
+            "the other tabs need data that fits in memory.")
+    summary = dataset.summary
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Rows", summary.rows)
+    with col2:
+        st.metric("Columns", len(summary.columns))
+    with col3:
+        st.metric("On Disk", f"{dataset.disk_bytes / 1024**2:.2f} MB")
+    with col4:
+        st.metric("Duplicates", summary.duplicate_rows)
+
+    st.write("**Column Summary:**")
+    st.dataframe(summary.to_frame(), use_container_width=True)
+    st.subheader("📋 Data Preview")
+    st.dataframe(dataset.head(100), use_container_width=True)
+
+    st.markdown("---")
+    operation = st.radio("Chunk-wise cleaning", ["Remove spaces", "Drop rows with missing values", "Remove outliers (IQR)"],
+                         key="chunked_op")
+    if st.button("Apply to all chunks", key="chunked_apply"):
+        text_cols = [c for c, t in summary.dtypes.items() if t == 'object']
+        if operation == "Remove spaces":
+            def func(chunk):
+                for col in text_cols:
+                    chunk[col] = chunk[col].str.strip()
+                return chunk
+        elif operation == "Drop rows with missing values":
+            def func(chunk):
+                return chunk.dropna()
+        else:
+            # bounds come from the quantile sketches gathered while streaming
+            bounds = bounds_from_stats(summary.numeric_stats(), method='iqr')
+            def func(chunk):
+                return chunk[~outlier_mask(chunk, bounds).to_numpy().any(axis=1)]
+        with profile(f"chunked: {operation}", dataset) as step:
+            cleaned = step.output(dataset.map_chunks(func))
+        dataset.cleanup()
+        st.session_state.chunked = cleaned
+        st.success(f"✅ {operation} applied to {cleaned.summary.rows:,} rows")
+        st.rerun()
+
+    labels = {label: fmt for fmt, (label, _, _) in EXPORT_FORMATS.items()}
+    export_format = st.selectbox("Download format", list(labels), key="chunked_export_format")
+    if st.button("Prepare download", key="chunked_export"):
+        fmt = labels[export_format]
+        _, extension, mime = EXPORT_FORMATS[fmt]
+        # written to disk chunk by chunk; only small files are read back for the browser
+        fd, path = tempfile.mkstemp(prefix='cleaned_data_', suffix=f'.{extension}', dir=get_export_dir())
+        os.close(fd)
+        with profile(f"chunked export {fmt}", dataset):
+            size = export_to_file(dataset.iter_chunks(), fmt, path)
+        if size > DOWNLOAD_MAX_BYTES:
+            st.success(f"✅ Exported {size / 1024**2:,.1f} MB to `{path}` on the server. Files over "
+                       f"{DOWNLOAD_MAX_BYTES / 1024**2:.0f} MB are not sent through the browser.")
+        else:
+            with open(path, 'rb') as fh:
+                content = fh.read()
+            os.remove(path)
+            st.download_button(label=f"Download {export_format}", data=content,
+                               file_name=f"cleaned_data.{extension}", mime=mime)
@@ -1,18 +1,72 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from modules import cleaning
+from modules.preview import preview_dataframe
+from modules.profiling import profile_column, profile_table
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = 'string[pyarrow]'
+except ImportError:
+    TEXT_DTYPE = None
+
+
+def _compact_series(series, category_ratio, max_categories):
+    kind = series.dtype.kind
+    if kind in ('i', 'u'):
+        return pd.to_numeric(series, downcast='integer')
+    if kind == 'f':
+        compact = series.astype('float32')
+        # only keep float32 when every value survives the round trip
+        if np.array_equal(compact.astype('float64').values, series.values, equal_nan=True):
+            return compact
+        return series
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) == 'string':
+        n_unique = series.nunique(dropna=True)
+        if n_unique <= max_categories and n_unique <= category_ratio * series.notna().sum():
+            return series.astype('category')
+        if TEXT_DTYPE is not None:
+            return series.astype(TEXT_DTYPE)
+    return series
+
+
+def compact_dtypes(df, category_ratio=0.5, max_categories=1000):
+    """Shrink a DataFrame's memory footprint without changing its values.
+
+    Integers are downcast to the smallest signed width, floats to float32 when
+    that is lossless, low-cardinality strings become ``category`` and other
+    strings become Arrow-backed ``string[pyarrow]``. Returns the compacted
+    frame and a per-column report of bytes saved.
+    """
+    compacted = {}
+    rows = []
+    for col in df.columns:
+        before = df[col].memory_usage(deep=True, index=False)
+        new = _compact_series(df[col], category_ratio, max_categories)
+        after = new.memory_usage(deep=True, index=False)
+        if after >= before:
+            new, after = df[col], before
+        compacted[col] = new
+        rows.append({'Column': col, 'Before': str(df[col].dtype), 'After': str(new.dtype),
+                     'Bytes Before': before, 'Bytes After': after, 'Bytes Saved': before - after})
+    out = pd.DataFrame(compacted, index=df.index)
+    return out, pd.DataFrame(rows, columns=['Column', 'Before', 'After', 'Bytes Before', 'Bytes After', 'Bytes Saved'])
+
 
 def fix_data_types(df):
     st.subheader("🏷️ Fix Data Types")
     
     st.write("**Current Data Types:**")
-    st.dataframe(pd.DataFrame({'Column': df.columns, 'Type': df.dtypes.values}), use_container_width=True)
+    # detected kinds and value shares (%) come from cached column profiles
+    st.dataframe(profile_table(df), use_container_width=True)
     
     st.markdown("---")
     col1, col2 = st.columns(2)
     
     with col1:
         selected_col = st.selectbox("Select column", df.columns)
+        st.caption(f"Detected: {profile_column(df[selected_col]).summary()}")
         new_type = st.selectbox("Convert to", ["int", "float", "string", "category"])
     
     with col2:
@@ -20,30 +74,20 @@ def fix_data_types(df):
         st.write(".")
         if st.button("Convert"):
             try:
-                if new_type == "int":
-                    # Use safe coercion to nullable integer dtype
-                    orig_non_na = df[selected_col].notna().sum()
-                    coerced = pd.to_numeric(df[selected_col], errors='coerce')
-                    non_na_after = coerced.notna().sum()
-                    coerced_count = orig_non_na - non_na_after
-                    df[selected_col] = coerced.astype('Int64')
-                    st.info(f"Coerced {coerced_count} non-numeric values to <NA>")
-                elif new_type == "float":
-                    coerced = pd.to_numeric(df[selected_col], errors='coerce')
-                    coerced_count = df[selected_col].notna().sum() - coerced.notna().sum()
-                    df[selected_col] = coerced.astype('float64')
-                    st.info(f"Coerced {coerced_count} non-numeric values to NaN")
-                elif new_type == "string":
-                    df[selected_col] = df[selected_col].astype('string')
-                elif new_type == "category":
+                orig_non_na = df[selected_col].notna().sum()
+                if new_type == "category":
                     card = df[selected_col].nunique(dropna=True)
                     if card > 1000:
                         st.warning(f"Column has high cardinality ({card}); categories may use a lot of memory")
-                    df[selected_col] = df[selected_col].astype('category')
+                df = cleaning.convert_column(df, selected_col, new_type)
+                if new_type in ("int", "float"):
+                    # values that could not be parsed were coerced to missing
+                    coerced_count = orig_non_na - df[selected_col].notna().sum()
+                    st.info(f"Coerced {coerced_count} non-numeric values to {'<NA>' if new_type == 'int' else 'NaN'}")
 
                 st.success(f"✅ Converted to {new_type}")
                 st.subheader("📋 Updated Dataset:")
-                st.dataframe(df, use_container_width=True)
+                preview_dataframe(df, key="types_preview")
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
     
@@ -1,20 +1,27 @@
 import streamlit as st
 import pandas as pd
+from modules import cleaning
+from modules.fingerprints import column_duplicate_counts, row_index
+from modules.fuzzy import find_fuzzy_duplicates, merge_clusters
+from modules.preview import preview_dataframe
+from modules.job_panel import dataset_version, job_result, job_running, start_job
 
 def handle_duplicates(df):
     st.subheader("🔄 Handle Duplicates")
     
     col1, col2 = st.columns(2)
     
+    # counts and samples come from the cached row fingerprint index
+    index = row_index(df)
     with col1:
-        st.metric("Total Duplicates", df.duplicated().sum())
-        if df.duplicated().sum() > 0:
+        st.metric("Total Duplicates", index.duplicate_count)
+        if index.duplicate_count > 0:
             st.write("**Sample Duplicates:**")
-            st.dataframe(df[df.duplicated(keep=False)].head(10), use_container_width=True)
+            st.dataframe(df.iloc[index.duplicate_positions(limit=10)], use_container_width=True)
     
     with col2:
         st.write("**Duplicates by Column:**")
-        dup_by_col = pd.DataFrame({'Column': df.columns, 'Duplicates': [df[col].duplicated().sum() for col in df.columns]})
+        dup_by_col = pd.DataFrame({'Column': df.columns, 'Duplicates': column_duplicate_counts(df).values})
         dup_by_col = dup_by_col[dup_by_col['Duplicates'] > 0]
         if len(dup_by_col) > 0:
             st.dataframe(dup_by_col, use_container_width=True)
@@ -22,32 +29,88 @@ def handle_duplicates(df):
             st.info("No duplicates in individual columns")
     
     st.markdown("---")
-    strategy = st.radio("Select Strategy", ["Remove all", "By columns", "Keep first/last"])
+    strategy = st.radio("Select Strategy", ["Remove all", "By columns", "Keep first/last", "Fuzzy match"])
     
+    busy = job_running('duplicates')
     if strategy == "Remove all":
-        if st.button("Remove duplicates"):
-            initial = len(df)
-            df = df.drop_duplicates()
-            st.success(f"✅ Removed {initial - len(df)} duplicates")
-            st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+        if st.button("Remove duplicates", disabled=busy):
+            _start_removal(df)
     
     elif strategy == "By columns":
         selected_cols = st.multiselect("Select columns", df.columns)
-        if selected_cols and st.button("Remove"):
-            initial = len(df)
-            df = df.drop_duplicates(subset=selected_cols)
-            st.success(f"✅ Removed {initial - len(df)} duplicates")
-            st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+        if selected_cols and st.button("Remove", disabled=busy):
+            _start_removal(df, subset=selected_cols)
     
     elif strategy == "Keep first/last":
         keep_opt = st.radio("Keep", ["first", "last"])
-        if st.button("Remove"):
-            initial = len(df)
-            df = df.drop_duplicates(keep=keep_opt)
-            st.success(f"✅ Removed {initial - len(df)} duplicates")
-            st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+        if st.button("Remove", disabled=busy):
+            _start_removal(df, keep=keep_opt)
     
+    elif strategy == "Fuzzy match":
+        return _fuzzy_duplicates(df)
+    
+    deduplicated = job_result('duplicates', df)
+    if deduplicated is not None:
+        st.success(f"✅ Removed {len(df) - len(deduplicated)} duplicates")
+        df = deduplicated
+        st.subheader("📋 Updated Dataset:")
+        preview_dataframe(df, key="duplicates_preview")
+    return df
+
+
+def _start_removal(df, **params):
+    start_job('duplicates', "Duplicate removal", lambda report: cleaning.remove_duplicates(df, **params), df)
+
+
+def _fuzzy_duplicates(df):
+    st.caption("Finds rows that differ only in case, spacing, punctuation or small typos. "
+               "Rows are only compared within the same blocking values.")
+    text_cols = [col for col in df.columns if df[col].dtype == object or str(df[col].dtype) in ('string', 'category')]
+    compare_cols = st.multiselect("Compare columns", df.columns, default=text_cols[:1], key="fuzzy_columns")
+    if not compare_cols:
+        st.info("Select at least one column to compare")
+        return df
+    thresholds = {}
+    threshold_cols = st.columns(min(len(compare_cols), 4))
+    for i, col in enumerate(compare_cols):
+        with threshold_cols[i % len(threshold_cols)]:
+            thresholds[col] = st.number_input(f"Similarity: {col}", 0.5, 1.0, 0.85, 0.01, key=f"fuzzy_threshold_{col}")
+    blocking = st.multiselect("Blocking columns (must match exactly)",
+                              [col for col in df.columns if col not in compare_cols], key="fuzzy_blocking")
+    
+    if st.button("Find near-duplicates", disabled=job_running('fuzzy')):
+        start_job('fuzzy', "Near-duplicate search", lambda report: find_fuzzy_duplicates(
+            df, compare_cols, thresholds=thresholds, blocking=blocking,
+            progress=lambda done, total: report(done / total, f"scored {done:,} of {total:,} candidate pairs")), df)
+    found = job_result('fuzzy', df)
+    if found is not None:
+        st.session_state.fuzzy_result = (dataset_version(df), found)
+    
+    stored = st.session_state.get('fuzzy_result')
+    # clusters are row positions of the version they were found in
+    if stored is None or stored[0] is not dataset_version(df):
+        return df
+    result = stored[1]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Clusters", result.clusters)
+    c2.metric("Rows to merge", result.duplicate_rows)
+    c3.metric("Candidate pairs", result.candidates)
+    if not result.duplicate_rows:
+        st.info("No near-duplicates found")
+        return df
+    st.write("**Sample Clusters:**")
+    positions = result.cluster_positions(limit=20)
+    sample = df.iloc[positions].copy()
+    sample.insert(0, 'Cluster', result.labels[positions])
+    st.dataframe(sample, use_container_width=True)
+    
+    keep_opt = st.radio("Keep", ["first", "last"], key="fuzzy_keep", horizontal=True)
+    fill = st.checkbox("Fill missing values from the other rows of each cluster", value=True, key="fuzzy_fill")
+    if st.button("Merge clusters"):
+        initial = len(df)
+        df = merge_clusters(df, result.labels, keep=keep_opt, fill_missing=fill)
+        del st.session_state.fuzzy_result
+        st.success(f"✅ Merged {initial - len(df)} near-duplicate rows")
+        st.subheader("📋 Updated Dataset:")
+        preview_dataframe(df, key="duplicates_preview")
     return df
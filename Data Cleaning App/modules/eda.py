@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from modules.stats import describe
 
 def exploratory_analysis(df):
     st.subheader("📊 Exploratory Data Analysis")
@@ -15,4 +16,5 @@ def exploratory_analysis(df):
     
     st.markdown("---")
     st.write("**Statistical Summary:**")
-    st.dataframe(df.describe().T, use_container_width=True)
+    # served from the per-column statistics cache; unchanged columns are not recomputed
+    st.dataframe(describe(df), use_container_width=True)
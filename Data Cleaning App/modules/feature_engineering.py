@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from modules import cleaning
+from modules.preview import preview_dataframe
 
 def engineer_features(df):
     st.subheader("⚡ Feature Engineering")
@@ -18,18 +20,11 @@ def engineer_features(df):
         
         if new_col_name and st.button("Create"):
             try:
-                if operation_type == "Add":
-                    df[new_col_name] = df[col_a] + df[col_b]
-                elif operation_type == "Subtract":
-                    df[new_col_name] = df[col_a] - df[col_b]
-                elif operation_type == "Multiply":
-                    df[new_col_name] = df[col_a] * df[col_b]
-                elif operation_type == "Divide":
-                    df[new_col_name] = df[col_a] / df[col_b]
+                df = cleaning.create_column(df, new_col_name, col_a, operation_type, col_b)
                 
                 st.success(f"✅ Column created")
                 st.subheader("📋 Updated Dataset:")
-                st.dataframe(df, use_container_width=True)
+                preview_dataframe(df, key="features_preview")
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
     
@@ -37,20 +32,18 @@ def engineer_features(df):
         numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
         selected_cols = st.multiselect("Select columns", numeric_cols)
         if selected_cols and st.button("Apply"):
-            for col in selected_cols:
-                df[col] = (df[col] - df[col].min()) / (df[col].max() - df[col].min())
+            df = cleaning.normalize(df, selected_cols)
             st.success("✅ Normalization applied")
             st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+            preview_dataframe(df, key="features_preview")
     
     elif operation == "Standardization":
         numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
         selected_cols = st.multiselect("Select columns", numeric_cols)
         if selected_cols and st.button("Apply"):
-            for col in selected_cols:
-                df[col] = (df[col] - df[col].mean()) / df[col].std()
+            df = cleaning.standardize(df, selected_cols)
             st.success("✅ Standardization applied")
             st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+            preview_dataframe(df, key="features_preview")
     
     return df
@@ -0,0 +1,187 @@
+"""Row fingerprint index for exact duplicate detection.
+
+Every column is hashed once per column version (64-bit, cached in a
+:class:`~modules.column_cache.ColumnCache`) and row fingerprints for any
+subset of columns are combined from those column hashes. A
+:class:`RowIndex` factorizes the fingerprints into row groups, and
+duplicate counts, duplicate samples and keep-first/last/none masks are
+all read from the groups. When rows are dropped, :func:`take_rows` carries
+the column hashes over to the result, so the smaller frame is never
+rehashed.
+
+Rows are grouped by fingerprint, then every repeated row is compared
+with the first row of its group before the index is used. In the rare
+case that two different rows' fingerprints collide (a probability around
+1e-7 for a few million rows), the groups are rebuilt from the values, so
+a distinct row is never counted or dropped as a duplicate.
+"""
+import numpy as np
+import pandas as pd
+
+from modules.column_cache import ColumnCache
+from modules.logger import get_logger
+
+logger = get_logger('fingerprints')
+
+_hashes = ColumnCache()
+_indexes = ColumnCache(max_entries=32)
+
+
+def _columns(df):
+    # positional, so duplicate column names are handled too
+    return [df.iloc[:, i] for i in range(df.shape[1])]
+
+
+def column_hashes(series):
+    """64-bit hash of every value of ``series`` (missing values hash equal)."""
+    return _hashes.get_or_compute(
+        series, lambda s: pd.util.hash_pandas_object(s, index=False, categorize=True).to_numpy(), tag='hash')
+
+
+def combine_hashes(hash_arrays, n):
+    # the tuple-hash mixing pandas uses to combine per-column hashes
+    out = np.full(n, 0x345678, dtype=np.uint64)
+    mult = np.uint64(1000003)
+    with np.errstate(over='ignore'):
+        for i, hashes in enumerate(hash_arrays):
+            out = (out ^ hashes) * mult
+            mult += np.uint64(82520 + 2 * (len(hash_arrays) - i - 1))
+        out += np.uint64(97531)
+    return out
+
+
+def _first_seen(codes):
+    # factorize numbers groups in order of first appearance, so a row is
+    # the first of its group exactly when its code exceeds all before it
+    if not len(codes):
+        return np.zeros(0, dtype=bool)
+    seen = np.maximum.accumulate(codes)
+    first = np.empty(len(codes), dtype=bool)
+    first[0] = True
+    first[1:] = codes[1:] > seen[:-1]
+    return first
+
+
+class RowIndex:
+    """Rows of a frame grouped by their fingerprint over ``columns``."""
+
+    def __init__(self, fingerprints, columns):
+        self.columns = list(columns)
+        self.fingerprints = fingerprints
+        self.codes, uniques = pd.factorize(fingerprints)
+        self.groups = len(uniques)
+        self.sizes = np.bincount(self.codes, minlength=self.groups)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def duplicate_count(self):
+        """Rows that repeat an earlier row (``df.duplicated().sum()``)."""
+        return len(self.codes) - self.groups
+
+    def duplicated(self, keep='first'):
+        """Boolean mask with the semantics of ``DataFrame.duplicated``."""
+        if keep is False:
+            return self.sizes[self.codes] > 1
+        if keep == 'first':
+            return ~_first_seen(self.codes)
+        if keep == 'last':
+            # a last occurrence is a first occurrence of the reversed rows
+            reversed_codes, _ = pd.factorize(self.codes[::-1])
+            return ~_first_seen(reversed_codes)[::-1]
+        raise ValueError(f"keep must be 'first', 'last' or False, not {keep!r}")
+
+    def duplicate_positions(self, limit=None):
+        """Positions of rows that have at least one duplicate."""
+        positions = np.flatnonzero(self.sizes[self.codes] > 1)
+        return positions if limit is None else positions[:limit]
+
+    def take(self, positions):
+        """The index of the frame made of rows ``positions`` (no rehashing)."""
+        return RowIndex(self.fingerprints[positions], self.columns)
+
+    def verify(self, series):
+        """Whether every repeated row equals the first row of its group, value by value."""
+        repeated = np.flatnonzero(self.duplicated('first'))
+        if not len(repeated):
+            return True
+        # groups are numbered in order of first appearance
+        first = np.flatnonzero(_first_seen(self.codes))[self.codes[repeated]]
+        for s in series:
+            values = _comparable(s)
+            left, right = values[repeated], values[first]
+            same = left == right
+            if values.dtype.kind in 'fc':
+                same |= np.isnan(left) & np.isnan(right)
+            if not same.all():
+                return False
+        return True
+
+
+def _comparable(series):
+    """An array whose elements are equal exactly where the values of ``series`` are (missing equals missing)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufc':
+        return series.to_numpy()
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'mM':
+        return series.to_numpy().view('i8')
+    return pd.factorize(series)[0]
+
+
+def _exact_index(series, columns):
+    frame = pd.DataFrame({i: s.reset_index(drop=True) for i, s in enumerate(series)})
+    codes = frame.groupby(list(frame.columns), sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    return RowIndex(codes.astype(np.uint64), columns)
+
+
+def _build_index(series, columns, n):
+    index = RowIndex(combine_hashes([column_hashes(s) for s in series], n), columns)
+    if not index.verify(series):
+        logger.warning(f"Row fingerprint collision over {len(columns)} columns; grouping rows by value instead")
+        index = _exact_index(series, columns)
+    return index
+
+
+def row_index(df, subset=None):
+    """The (cached) :class:`RowIndex` of ``df`` over ``subset`` (all columns by default)."""
+    columns = list(df.columns) if not subset else list(subset)
+    series = _columns(df) if not subset else [df[col] for col in columns]
+    if not series:
+        return RowIndex(np.zeros(len(df), dtype=np.uint64), columns)
+    return _indexes.get_or_compute(series, lambda cols: _build_index(cols, columns, len(df)), tag='rows')
+
+
+def duplicate_count(df, subset=None):
+    return row_index(df, subset).duplicate_count
+
+
+def column_duplicate_counts(df):
+    """``df[col].duplicated().sum()`` for every column, from the column hashes."""
+    counts = [_hashes.get_or_compute(s, lambda s: len(s) - len(pd.unique(column_hashes(s))), tag='dups')
+              for s in _columns(df)]
+    return pd.Series(counts, index=df.columns, dtype='int64')
+
+
+def take_rows(df, positions):
+    """``df.iloc[positions]``, carrying cached hashes and row index over to the result."""
+    if len(positions) == len(df):
+        return df
+    result = df.iloc[positions]
+    before, after = _columns(df), _columns(result)
+    for old, new in zip(before, after):
+        hashes = _hashes.get(old, tag='hash')
+        if hashes is not None:
+            _hashes.put(new, hashes[positions], tag='hash')
+    if before:
+        index = _indexes.get(before, tag='rows')
+        if index is not None:
+            _indexes.put(after, index.take(positions), tag='rows')
+    return result
+
+
+def drop_duplicates(df, subset=None, keep='first'):
+    """``df.drop_duplicates(subset, keep)`` answered from the row index."""
+    index = row_index(df, subset)
+    return take_rows(df, np.flatnonzero(~index.duplicated(keep)))
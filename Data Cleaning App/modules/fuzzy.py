@@ -0,0 +1,321 @@
+"""Near-duplicate (fuzzy) record detection.
+
+Comparing every pair of rows is O(n²). Instead:
+
+1. Compared columns are normalized (case, whitespace, punctuation), and
+   rows with identical normalized values collapse into one record.
+2. Records are split into blocks by the normalized blocking columns;
+   records in different blocks are never compared.
+3. Each record gets a MinHash signature over character 3-grams, and LSH
+   banding puts records with similar signatures in the same bucket.
+   Only records that share a bucket within their block become candidates.
+4. Candidate pairs are scored column by column, in parallel for large
+   candidate sets, against a similarity threshold per column.
+5. Accepted pairs are joined into clusters (connected components).
+
+Every step is linear in the number of rows or candidates.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from modules.fingerprints import combine_hashes
+from modules.logger import get_logger
+
+try:
+    from rapidfuzz.fuzz import ratio as _rapid_ratio
+except ImportError:
+    _rapid_ratio = None
+
+logger = get_logger('fuzzy')
+
+NUM_PERM = 96
+BANDS = 32
+SHINGLE = 3
+# Candidates whose estimated 3-gram Jaccard similarity is below this are
+# dropped before scoring; a one-character typo in a 20-character value
+# still leaves a Jaccard similarity around 0.7
+MIN_JACCARD = 0.4
+# Larger candidate sets are scored across a process pool
+PARALLEL_MIN_PAIRS = 20_000
+# Signatures are computed for batches of texts of similar length, each at
+# most this many characters wide in total (about 8 MB per uint64 array)
+MAX_BATCH_CELLS = 1_000_000
+_MAX = np.uint64(np.iinfo(np.uint64).max)
+
+
+def normalize_text(series):
+    """Lower-case, strip punctuation and collapse whitespace; missing becomes ''."""
+    codes, uniques = pd.factorize(series)
+    text = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.lower()
+    text = text.str.replace(r'[^\w\s]', ' ', regex=True).str.replace(r'\s+', ' ', regex=True).str.strip()
+    values = np.append(text.to_numpy(dtype=object), '')
+    # missing values have code -1, which picks the trailing ''
+    return values[codes]
+
+
+def similarity(a, b):
+    """Edit-based similarity of two strings in [0, 1]."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    if _rapid_ratio is not None:
+        return _rapid_ratio(a, b) / 100.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _gram_hashes(texts):
+    """64-bit hashes of the character 3-grams of ``texts`` (one row per text).
+
+    Texts are laid out as a fixed-width code point matrix, so grams are
+    built with array arithmetic rather than per-string loops. Returns the
+    hashes and a mask of the grams that lie inside each text.
+    """
+    padded = [f' {text} ' for text in texts]
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+    width = max(int(lengths.max()), SHINGLE)
+    codes = np.array(padded, dtype=f'<U{width}').view(np.uint32).reshape(len(padded), width).astype(np.uint64)
+    # code points fit in 21 bits, so three of them pack into one integer
+    grams = (codes[:, :-2] << np.uint64(42)) | (codes[:, 1:-1] << np.uint64(21)) | codes[:, 2:]
+    with np.errstate(over='ignore'):
+        grams ^= grams >> np.uint64(33)
+        grams *= np.uint64(0xFF51AFD7ED558CCD)
+        grams ^= grams >> np.uint64(33)
+    valid = np.arange(width - SHINGLE + 1)[None, :] < np.maximum(lengths - SHINGLE + 1, 1)[:, None]
+    return grams, valid
+
+
+def _length_batches(lengths, max_cells):
+    """Split positions ``0..n`` of ascending ``lengths`` into ranges whose
+    row count times widest row stays within ``max_cells`` (one row at least)."""
+    start, n = 0, len(lengths)
+    while start < n:
+        k = max(1, min(n - start, max_cells // max(int(lengths[start]), 1)))
+        # lengths only grow, so the ranges that fit are a prefix
+        fits = np.arange(1, k + 1) * lengths[start:start + k] <= max_cells
+        end = start + max(1, int(np.count_nonzero(fits)))
+        yield start, end
+        start = end
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=0, max_cells=MAX_BATCH_CELLS):
+    """MinHash signatures (``len(texts) x num_perm``) over character 3-grams.
+
+    Texts are batched by length, so one very long value gets a batch of
+    its own rather than widening the matrix of thousands of short ones.
+    """
+    rng = np.random.default_rng(seed)
+    # one xor-multiply hash per permutation (odd multipliers, wrapping)
+    salts = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True)
+    multipliers = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 2
+    order = np.argsort(lengths, kind='stable')
+    with np.errstate(over='ignore'):
+        for start, end in _length_batches(lengths[order], max_cells):
+            rows = order[start:end]
+            hashes, valid = _gram_hashes([texts[i] for i in rows])
+            batch = np.empty((len(rows), num_perm), dtype=np.uint64)
+            for j in range(num_perm):
+                values = (hashes ^ salts[j]) * multipliers[j]
+                values[~valid] = _MAX
+                batch[:, j] = values.min(axis=1)
+            signatures[rows] = batch
+    return signatures
+
+
+def candidate_pairs(signatures, blocks, bands=BANDS):
+    """Record pairs that share an LSH bucket within the same block."""
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    pairs = []
+    for band in range(bands):
+        part = signatures[:, band * rows:(band + 1) * rows]
+        keys = combine_hashes([part[:, i] for i in range(rows)] + [blocks], n)
+        codes, _ = pd.factorize(keys)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        same = np.flatnonzero(sorted_codes[1:] == sorted_codes[:-1]) + 1
+        if not len(same):
+            continue
+        # link each bucket member to its predecessor and to the bucket's
+        # first member: linear in bucket size, yet enough to find clusters
+        group_start = np.searchsorted(sorted_codes, sorted_codes[same], side='left')
+        pairs.append(np.column_stack([order[same - 1], order[same]]))
+        pairs.append(np.column_stack([order[group_start], order[same]]))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.vstack(pairs)
+    pairs = np.sort(pairs[pairs[:, 0] != pairs[:, 1]], axis=1).astype(np.int64)
+    # deduplicate on one integer per pair, much faster than unique(axis=0)
+    keys = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.column_stack([keys // n, keys % n])
+
+
+def similarity_at_least(a, b, threshold):
+    """``similarity(a, b) >= threshold``, skipping the full comparison when a
+    cheap upper bound already rules it out."""
+    if a == b:
+        return True
+    if not a or not b:
+        return threshold <= 0
+    if 2 * min(len(a), len(b)) / (len(a) + len(b)) < threshold:
+        return False
+    if _rapid_ratio is not None:
+        return _rapid_ratio(a, b, score_cutoff=threshold * 100) > 0
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def _score_chunk(args):
+    left, right, thresholds = args
+    accepted = np.ones(len(left[0]) if left else 0, dtype=bool)
+    for column, (a_values, b_values) in enumerate(zip(left, right)):
+        threshold = thresholds[column]
+        for i, (a, b) in enumerate(zip(a_values, b_values)):
+            if accepted[i] and not similarity_at_least(a, b, threshold):
+                accepted[i] = False
+    return accepted
+
+
+def score_pairs(records, pairs, thresholds, n_jobs=None, chunk_size=5_000, progress=None):
+    """Which candidate ``pairs`` meet every column's similarity threshold.
+
+    ``progress(done, total)`` is called after each chunk of pairs is scored.
+    """
+    if not len(pairs):
+        return np.zeros(0, dtype=bool)
+    chunks = []
+    for start in range(0, len(pairs), chunk_size):
+        part = pairs[start:start + chunk_size]
+        left = [column[part[:, 0]].tolist() for column in records]
+        right = [column[part[:, 1]].tolist() for column in records]
+        chunks.append((left, right, thresholds))
+    parallel = len(pairs) >= PARALLEL_MIN_PAIRS and n_jobs != 1
+    # scoring runs in a job thread of the multithreaded Streamlit server, where
+    # forked workers could inherit locks held by other threads; spawn them instead
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=n_jobs, mp_context=context) if parallel else None
+    accepted = []
+    try:
+        for scored in (pool.map(_score_chunk, chunks) if parallel else map(_score_chunk, chunks)):
+            accepted.append(scored)
+            if progress is not None:
+                progress(sum(len(a) for a in accepted), len(pairs))
+    finally:
+        if pool is not None:
+            # an interrupted run (a cancelled job) drops the chunks not yet started
+            pool.shutdown(cancel_futures=True)
+    return np.concatenate(accepted)
+
+
+class FuzzyResult:
+    """Cluster labels of near-duplicate rows.
+
+    ``labels[i]`` is the cluster of row ``i``; rows that matched nothing
+    are clusters of one.
+    """
+
+    def __init__(self, labels, candidates, matches):
+        self.labels = labels
+        self.candidates = candidates
+        self.matches = matches
+        self.sizes = np.bincount(labels) if len(labels) else np.zeros(0, dtype=np.int64)
+
+    @property
+    def clusters(self):
+        return int((self.sizes > 1).sum())
+
+    @property
+    def duplicate_rows(self):
+        """Rows that merging would remove."""
+        return int(len(self.labels) - len(self.sizes))
+
+    def cluster_positions(self, limit=None):
+        """Positions of rows in multi-row clusters, grouped by cluster."""
+        members = np.flatnonzero(self.sizes[self.labels] > 1)
+        members = members[np.argsort(self.labels[members], kind='stable')]
+        return members if limit is None else members[:limit]
+
+
+def find_fuzzy_duplicates(df, columns, thresholds=0.85, blocking=None, num_perm=NUM_PERM,
+                          bands=BANDS, min_jaccard=MIN_JACCARD, n_jobs=None, progress=None):
+    """Cluster rows of ``df`` that are near-duplicates on ``columns``.
+
+    ``thresholds`` is one similarity in [0, 1] or a ``{column: similarity}``
+    dict; ``blocking`` lists columns whose normalized values must match
+    exactly for two rows to be compared at all. ``progress(done, total)``
+    follows the scoring of candidate pairs.
+    """
+    columns = list(columns)
+    if not columns:
+        raise ValueError("Select at least one column to compare")
+    if not isinstance(thresholds, dict):
+        thresholds = {col: thresholds for col in columns}
+    blocking = list(blocking or [])
+    n = len(df)
+    if not n:
+        return FuzzyResult(np.zeros(0, dtype=np.int64), 0, 0)
+
+    normalized = {col: normalize_text(df[col]) for col in dict.fromkeys(columns + blocking)}
+    hashed = {col: pd.util.hash_array(values) for col, values in normalized.items()}
+    blocks = combine_hashes([hashed[col] for col in blocking], n) if blocking else np.zeros(n, dtype=np.uint64)
+    # rows with identical normalized values are one record
+    record_codes, _ = pd.factorize(combine_hashes([hashed[col] for col in columns] + [blocks], n))
+    _, first = np.unique(record_codes, return_index=True)
+    records = [normalized[col][first] for col in columns]
+    texts = [' | '.join(parts) for parts in zip(*records)]
+
+    signatures = minhash_signatures(texts, num_perm=num_perm)
+    pairs = candidate_pairs(signatures, blocks[first], bands=bands)
+    # MinHash agreement estimates the 3-gram Jaccard similarity of a pair;
+    # pairs far below any plausible match skip the edit-distance scoring
+    agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1) if len(pairs) else np.zeros(0)
+    pairs = pairs[agreement >= min_jaccard]
+    accepted = score_pairs(records, pairs, [thresholds.get(col, 0.85) for col in columns], n_jobs=n_jobs,
+                           progress=progress)
+    matched = pairs[accepted]
+    logger.info(f"Fuzzy duplicates: {n} rows, {len(first)} records, {len(pairs)} candidates, {len(matched)} matches")
+
+    # scipy is imported on first use, not when the app starts
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    graph = coo_matrix((np.ones(len(matched)), (matched[:, 0], matched[:, 1])), shape=(len(first), len(first)))
+    _, record_labels = connected_components(graph, directed=False)
+    return FuzzyResult(record_labels[record_codes], len(pairs), len(matched))
+
+
+def merge_clusters(df, labels, keep='first', fill_missing=True):
+    """Collapse each cluster to its first (or last) row.
+
+    With ``fill_missing`` the kept row's missing values are filled from the
+    other rows of its cluster.
+    """
+    if keep not in ('first', 'last'):
+        raise ValueError(f"keep must be 'first' or 'last', not {keep!r}")
+    label_series = pd.Series(labels)
+    kept = np.flatnonzero(~label_series.duplicated(keep=keep).to_numpy())
+    result = df.iloc[kept]
+    sizes = np.bincount(labels)
+    members = np.flatnonzero(sizes[labels] > 1)
+    if not fill_missing or not len(members):
+        return result
+    grouped = df.iloc[members].groupby(labels[members], sort=False)
+    donors = grouped.first() if keep == 'first' else grouped.last()
+    in_cluster = sizes[labels[kept]] > 1
+    donor_rows = donors.index.get_indexer(labels[kept][in_cluster])
+    result = result.copy(deep=False)
+    for i in range(df.shape[1]):
+        column = result.iloc[:, i]
+        missing = column.isna().to_numpy() & in_cluster
+        if not missing.any():
+            continue
+        filled = column.to_numpy(dtype=object).copy()
+        filled[missing] = donors.iloc[:, i].to_numpy(dtype=object)[donor_rows[missing[in_cluster]]]
+        result.isetitem(i, pd.Series(filled, index=column.index).astype(column.dtype, errors='ignore'))
+    return result
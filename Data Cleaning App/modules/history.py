@@ -0,0 +1,227 @@
+"""Versioned undo/redo history of the working dataset.
+
+Versions are stored column by column. With pandas copy-on-write enabled
+(``app.py`` turns it on), a column an operation did not touch keeps
+pointing at the same buffer in every version, so a history of N steps
+costs the original data plus the columns that actually changed. Old
+versions are evicted once the unique bytes held exceed a budget; the
+original and current versions are always kept.
+
+A history can be spilled to disk (see :mod:`modules.session_data`): every
+buffer is written once, to its own file, and read back the next time a
+version is needed.
+"""
+import os
+import pickle
+import shutil
+
+import pandas as pd
+
+from modules.logger import get_logger
+from modules.utils import buffer_key
+
+logger = get_logger('history')
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get('DATA_CLEAN_HISTORY_MB', '1024')) * 1024 * 1024
+INDEX = '__index__'
+
+
+def _nbytes(obj):
+    if isinstance(obj, pd.RangeIndex):
+        return 0
+    try:
+        return int(obj.memory_usage(deep=True, index=False)) if isinstance(obj, pd.Series) else int(obj.memory_usage(deep=True))
+    except Exception:
+        return int(obj.nbytes)
+
+
+def _dump(obj, path):
+    # pickle round-trips every dtype exactly, object columns and extension
+    # arrays included, and reloads into writable arrays
+    with open(path, 'wb') as fh:
+        pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load(path):
+    with open(path, 'rb') as fh:
+        return pickle.load(fh)
+
+
+def _index_key(index):
+    if isinstance(index, pd.RangeIndex):
+        # a RangeIndex holds no buffer; equal ranges are equal indexes
+        return (INDEX, 'range', index.start, index.stop, index.step)
+    return (INDEX,) + buffer_key(index)
+
+
+class Version:
+    def __init__(self, df, label):
+        self.label = label
+        self.columns = list(df.columns)
+        self.index = df.index
+        # shallow per-column references; copy-on-write protects them from
+        # later in-place edits of the frame they came from
+        self.data = [df.iloc[:, i].copy(deep=False) for i in range(df.shape[1])]
+        self.keys = [buffer_key(s) for s in self.data] + [_index_key(df.index)]
+        self.shape = df.shape
+
+    def to_frame(self):
+        """A new frame over this version's buffers (no data is copied)."""
+        if not self.data:
+            return pd.DataFrame(index=self.index)
+        df = pd.concat(self.data, axis=1, copy=False)
+        df.columns = self.columns
+        return df
+
+
+class DatasetHistory:
+    """Undo/redo stack of dataset versions sharing unchanged column buffers."""
+
+    def __init__(self, df, label='Loaded', max_bytes=DEFAULT_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self._versions = [Version(df, label)]
+        self._pos = 0
+        self._sizes = {}
+        self._account(self._versions[0])
+        self._current = df
+        # buffer key -> file while spilled to disk
+        self._files = None
+        self._spill_dir = None
+
+    def __len__(self):
+        return len(self._versions)
+
+    @property
+    def position(self):
+        return self._pos
+
+    @property
+    def labels(self):
+        return [v.label for v in self._versions]
+
+    @property
+    def version(self):
+        """The current version; the same object for as long as the data is unchanged, spills included."""
+        return self._versions[self._pos]
+
+    @property
+    def spilled(self):
+        return self._files is not None
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory by all versions, counting each shared buffer once."""
+        keys = set()
+        for version in self._versions:
+            keys.update(version.keys)
+        return sum(self._sizes.get(k, 0) for k in keys)
+
+    def _account(self, version):
+        for key, obj in zip(version.keys, version.data + [version.index]):
+            if key not in self._sizes:
+                self._sizes[key] = _nbytes(obj)
+
+    def current(self):
+        self._reload()
+        return self._current
+
+    def original(self):
+        self._reload()
+        return self._versions[0].to_frame()
+
+    def spill(self, directory):
+        """Write every version to files in ``directory`` and release them from memory.
+
+        Buffers shared between versions are written once. The history
+        reloads itself the next time a version is used.
+        """
+        if self.spilled:
+            return
+        os.makedirs(directory, exist_ok=True)
+        files = {}
+        try:
+            for version in self._versions:
+                for key, obj in zip(version.keys, version.data + [version.index]):
+                    if key not in files:
+                        files[key] = os.path.join(directory, f'{len(files)}.pkl')
+                        # columns are stored as bare arrays; their index is stored once
+                        _dump(obj if key[0] == INDEX else obj._values, files[key])
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        # nothing is released until every file is written
+        for version in self._versions:
+            version.data = version.index = None
+        self._files = files
+        self._spill_dir = directory
+        self._sizes = {}
+        self._current = None
+
+    def _reload(self):
+        if not self.spilled:
+            return
+        loaded = {key: _load(path) for key, path in self._files.items()}
+        for version in self._versions:
+            version.index = loaded[version.keys[-1]]
+            version.data = [pd.Series(loaded[key], index=version.index, name=name, copy=False)
+                            for key, name in zip(version.keys, version.columns)]
+            # new buffers, so new keys; shared ones are still shared
+            version.keys = [buffer_key(s) for s in version.data] + [_index_key(version.index)]
+            self._account(version)
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
+        self._files = None
+        self._current = self._versions[self._pos].to_frame()
+
+    def commit(self, df, label=''):
+        """Record ``df`` as the newest version, dropping any redo steps."""
+        self._reload()
+        if df is self._current:
+            return df
+        del self._versions[self._pos + 1:]
+        version = Version(df, label)
+        self._versions.append(version)
+        self._pos = len(self._versions) - 1
+        self._account(version)
+        self._evict()
+        self._current = df
+        return df
+
+    def _move(self, pos):
+        self._reload()
+        self._pos = pos
+        self._current = self._versions[pos].to_frame()
+        return self._current
+
+    @property
+    def can_undo(self):
+        return self._pos > 0
+
+    @property
+    def can_redo(self):
+        return self._pos < len(self._versions) - 1
+
+    def undo(self):
+        if self.can_undo:
+            return self._move(self._pos - 1)
+        return self._current
+
+    def redo(self):
+        if self.can_redo:
+            return self._move(self._pos + 1)
+        return self._current
+
+    def _evict(self):
+        # oldest intermediate versions go first; original and current stay
+        while self.nbytes > self.max_bytes:
+            candidates = [i for i in range(1, len(self._versions)) if i != self._pos]
+            if not candidates:
+                break
+            victim = candidates[0]
+            removed = self._versions.pop(victim)
+            if victim < self._pos:
+                self._pos -= 1
+            logger.info(f"Evicted history version '{removed.label}' to stay under {self.max_bytes} bytes")
+        live = set()
+        for version in self._versions:
+            live.update(version.keys)
+        self._sizes = {k: v for k, v in self._sizes.items() if k in live}
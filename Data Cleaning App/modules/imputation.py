@@ -0,0 +1,110 @@
+"""K-nearest-neighbour imputation that scales past memory-sized frames.
+
+scikit-learn's ``KNNImputer`` compares every incomplete row with every
+row, which is quadratic in time and in memory. Here:
+
+- only rows with missing values are imputed; the donors are the complete
+  rows (a seeded sample of ``max_donors`` of them on very large frames),
+  indexed once per missing-value pattern in a KD/ball tree over the
+  columns that pattern has observed;
+- incomplete rows are queried pattern by pattern in chunks of
+  ``chunk_size`` rows, so memory stays bounded by the chunk, and each
+  query is spread over ``n_jobs`` cores;
+- results are cached per column version (see
+  :mod:`modules.column_cache`), so repeating an imputation on an
+  unchanged dataset costs nothing and no frame is ever hashed.
+
+Within a pattern the ``nan_euclidean`` distance ``KNNImputer`` uses ranks
+donors exactly like the plain Euclidean distance over the observed
+columns, so with complete donors both pick the same neighbours. When the
+frame has fewer complete rows than ``n_neighbors``, the exact
+``KNNImputer`` is used instead.
+"""
+import numpy as np
+
+from modules.column_cache import ColumnCache
+from modules.logger import get_logger
+
+logger = get_logger('imputation')
+
+CHUNK_SIZE = 10_000
+# Each pattern's tree is built over at most this many complete rows
+MAX_DONORS = 200_000
+
+_cache = ColumnCache(max_entries=16)
+
+
+def _exact(values, n_neighbors):
+    from sklearn.impute import KNNImputer
+
+    # KNNImputer drops all-missing columns; they are left missing here
+    keep = ~np.isnan(values).all(axis=0)
+    out = values.copy()
+    out[:, keep] = KNNImputer(n_neighbors=n_neighbors).fit_transform(values[:, keep])
+    return out
+
+
+def impute_array(values, n_neighbors=5, chunk_size=CHUNK_SIZE, n_jobs=None, max_donors=MAX_DONORS, seed=0,
+                 progress=None):
+    """Fill the NaNs of a 2-d float array from the nearest complete rows.
+
+    ``progress(done, total)`` is called after each chunk with the number of
+    incomplete rows imputed so far.
+    """
+    from sklearn.neighbors import NearestNeighbors
+
+    missing = np.isnan(values)
+    incomplete = np.flatnonzero(missing.any(axis=1))
+    if not len(incomplete):
+        return values
+    complete = np.flatnonzero(~missing.any(axis=1))
+    if len(complete) < n_neighbors:
+        logger.info(f"KNN: {len(complete)} complete rows, using the exact imputer")
+        return _exact(values, n_neighbors)
+    if len(complete) > max_donors:
+        complete = np.sort(np.random.default_rng(seed).choice(complete, max_donors, replace=False))
+
+    out = values.copy()
+    donors = values[complete]
+    # rows missing every column have no distance to anything: column mean,
+    # as KNNImputer does
+    means = np.nanmean(values, axis=0)
+    patterns, inverse = np.unique(missing[incomplete], axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    done = 0
+    for p, pattern in enumerate(patterns):
+        rows = incomplete[inverse == p]
+        if pattern.all():
+            out[np.ix_(rows, np.flatnonzero(pattern))] = means
+            done += len(rows)
+            continue
+        observed, targets = np.flatnonzero(~pattern), np.flatnonzero(pattern)
+        index = NearestNeighbors(n_neighbors=n_neighbors, n_jobs=n_jobs).fit(donors[:, observed])
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            neighbours = index.kneighbors(values[np.ix_(chunk, observed)], return_distance=False)
+            out[np.ix_(chunk, targets)] = donors[:, targets][neighbours].mean(axis=1)
+            done += len(chunk)
+            if progress is not None:
+                progress(done, len(incomplete))
+    logger.info(f"KNN: imputed {len(incomplete)} rows over {len(patterns)} missing patterns "
+                f"from {len(complete)} complete rows")
+    return out
+
+
+def knn_impute(df, columns, n_neighbors=5, chunk_size=CHUNK_SIZE, n_jobs=None, progress=None):
+    """KNN-imputed values of the ``columns`` of ``df`` that have missing values.
+
+    Returns ``{column: array}``; cached until one of ``columns`` changes.
+    """
+    series = [df[col] for col in columns]
+
+    def compute(series):
+        values = np.column_stack([s.to_numpy(dtype='float64', na_value=np.nan) for s in series])
+        filled = impute_array(values, n_neighbors=n_neighbors, chunk_size=chunk_size, n_jobs=n_jobs,
+                              progress=progress)
+        return [filled[:, i] if s.isna().any() else None for i, s in enumerate(series)]
+
+    imputed = _cache.get_or_compute(series, compute, tag=('knn', n_neighbors))
+    # copies, so later edits of the frame never reach the cached arrays
+    return {col: values.copy() for col, values in zip(columns, imputed) if values is not None}
@@ -0,0 +1,257 @@
+"""Timing and memory instrumentation of cleaning operations and loaders.
+
+:func:`profile` is a context manager and :func:`profiled` a decorator for
+functions that take a DataFrame first. Every measured step records wall
+and CPU seconds, the peak memory it added and the rows and columns going
+in and out. Records are logged as structured ``profile`` events (see
+:mod:`modules.logger`) and added to the current session's
+:class:`ProfileLog`, which the sidebar profiler panel lists, and to the
+latency histograms of :mod:`modules.metrics`.
+
+``DATA_CLEAN_PROFILE_MEMORY`` picks how memory is measured:
+
+- ``rss`` (default): a background thread samples the resident set size
+  every 10 ms while steps run, and the peak is its highest rise above
+  the level at the start of the step. It is nearly free and sees every
+  allocation, including Arrow's and scikit-learn's. Memory that the
+  allocator reuses without growing the process is not counted. It needs
+  ``/proc`` (Linux).
+- ``tracemalloc``: exact Python and NumPy allocations, but allocation-heavy
+  code runs several times slower.
+- ``off``: times only.
+
+CPU time and memory are process-wide, so steps of sessions running at the
+same moment count each other's work.
+"""
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+from modules.logger import get_logger
+from modules.metrics import observe, rss_bytes
+
+logger = get_logger('instrumentation')
+
+MEMORY_MODE = os.environ.get('DATA_CLEAN_PROFILE_MEMORY', 'rss').lower()
+RSS_SAMPLE_SECONDS = 0.01
+# Records kept per session
+SESSION_LOG_SIZE = 200
+
+_local = threading.local()
+
+
+class ProfileLog:
+    """The most recent profile records of one session."""
+
+    def __init__(self, max_records=SESSION_LOG_SIZE):
+        self.records = deque(maxlen=max_records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        self.records.append(record)
+
+    def clear(self):
+        self.records.clear()
+
+    def slowest(self, n=10):
+        """The ``n`` slowest steps, slowest first."""
+        columns = {'operation': 'Step', 'wall_s': 'Wall (s)', 'cpu_s': 'CPU (s)', 'peak_mb': 'Peak (MB)',
+                   'rows_in': 'Rows in', 'rows_out': 'Rows out', 'cols_in': 'Cols in', 'cols_out': 'Cols out'}
+        table = pd.DataFrame(list(self.records), columns=list(columns))
+        return table.sort_values('wall_s', ascending=False).head(n).rename(columns=columns)
+
+
+def set_session_log(log):
+    """Send this thread's records (one Streamlit session's script run) to ``log``."""
+    _local.log = log
+
+
+def get_session_log():
+    return getattr(_local, 'log', None)
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+class _RssSampler:
+    """Samples resident memory while at least one step is running, in any thread."""
+
+    def __init__(self):
+        self._steps = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, step):
+        step.start = rss_bytes()
+        with self._lock:
+            self._steps.add(step)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='instrumentation-rss', daemon=True)
+                self._thread.start()
+
+    def remove(self, step):
+        with self._lock:
+            # enclosing steps see the last moment of this one too
+            self._sample(self._steps)
+            self._steps.discard(step)
+
+    def _sample(self, steps):
+        rss = rss_bytes()
+        for step in steps:
+            step.peak = max(step.peak, rss - step.start)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._steps:
+                    self._thread = None
+                    return
+                steps = list(self._steps)
+            self._sample(steps)
+            time.sleep(RSS_SAMPLE_SECONDS)
+
+
+class _Tracemalloc:
+    """Exact traced allocations; the peak is reset for each nested step."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = 0
+        self._started = False
+
+    def add(self, step):
+        with self._lock:
+            if self._steps == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            self._steps += 1
+        current, peak = tracemalloc.get_traced_memory()
+        # outer steps take the peak so far before it is reset
+        self._fold(_stack(), peak)
+        tracemalloc.reset_peak()
+        step.start = current
+
+    def remove(self, step):
+        _, peak = tracemalloc.get_traced_memory()
+        self._fold(_stack() + [step], peak)
+        with self._lock:
+            self._steps -= 1
+            # tracing someone else started (e.g. a benchmark) is left running
+            if self._steps == 0 and self._started:
+                tracemalloc.stop()
+                self._started = False
+
+    @staticmethod
+    def _fold(steps, peak):
+        for step in steps:
+            step.peak = max(step.peak, peak - step.start)
+
+
+def _memory_meter():
+    if MEMORY_MODE == 'tracemalloc':
+        return _Tracemalloc()
+    if MEMORY_MODE == 'rss' and rss_bytes() is not None:
+        return _RssSampler()
+    return None
+
+
+_meter = _memory_meter()
+
+
+class Step:
+    """A running measurement; :meth:`output` records the shape of the result."""
+
+    def __init__(self, name, df, fields):
+        rows, cols = _shape(df)
+        self.record = {'operation': name, 'rows_in': rows, 'cols_in': cols, 'rows_out': None, 'cols_out': None,
+                       **fields}
+        self.start = 0
+        self.peak = 0
+
+    def output(self, df):
+        self.record['rows_out'], self.record['cols_out'] = _shape(df)
+        return df
+
+
+def _shape(data):
+    # DataFrames and on-disk chunked datasets
+    shape = getattr(data, 'shape', None)
+    return shape if shape is not None and len(shape) == 2 else (None, None)
+
+
+@contextmanager
+def profile(name, df=None, **fields):
+    """Measure the enclosed block as step ``name``; ``df`` is its input frame.
+
+    Extra ``fields`` are added to the record. Yields a :class:`Step`;
+    call ``step.output(result)`` to record the output shape. Any object
+    with a two-dimensional ``shape`` can be measured.
+    """
+    stack = _stack()
+    step = Step(name, df, fields)
+    if _meter is not None:
+        _meter.add(step)
+    stack.append(step)
+    wall, cpu = time.perf_counter(), time.process_time()
+    error = None
+    try:
+        yield step
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record = step.record
+        record['wall_s'] = time.perf_counter() - wall
+        record['cpu_s'] = time.process_time() - cpu
+        stack.pop()
+        record['peak_mb'] = None
+        if _meter is not None:
+            _meter.remove(step)
+            record['peak_mb'] = step.peak / 1024**2
+        record['depth'] = len(stack)
+        record['error'] = error
+        record['at'] = time.time()
+        _emit(record)
+
+
+def _emit(record):
+    peak = f", peak {record['peak_mb']:.1f} MB" if record['peak_mb'] is not None else ''
+    logger.info(f"{record['operation']}: {record['wall_s']:.3f}s wall, {record['cpu_s']:.3f}s CPU{peak}, "
+                f"{record['rows_in']}x{record['cols_in']} -> {record['rows_out']}x{record['cols_out']}"
+                + (f" ({record['error']})" if record['error'] else ''),
+                extra={'event': 'profile', 'fields': record})
+    # process-wide latency histograms for the health service
+    observe(record)
+    log = getattr(_local, 'log', None)
+    if log is not None:
+        log.add(record)
+
+
+def profiled(name=None):
+    """Decorator measuring every call of a function that takes a DataFrame first.
+
+    Usable bare (``@profiled``) or with a step name (``@profiled('load')``).
+    """
+    def decorate(func):
+        operation = name if isinstance(name, str) else func.__name__
+
+        @wraps(func)
+        def wrapper(df, *args, **kwargs):
+            with profile(operation, df) as step:
+                return step.output(func(df, *args, **kwargs))
+        return wrapper
+
+    if callable(name):
+        return decorate(name)
+    return decorate
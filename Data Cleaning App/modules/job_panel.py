@@ -0,0 +1,86 @@
+"""Streamlit side of background jobs (see :mod:`modules.jobs`).
+
+A tab starts a job with :func:`start_job` and calls :func:`job_result` on
+every run. While the job runs, that shows its progress and a Cancel
+button. Once the job is done, ``job_result`` returns the result once.
+:func:`keep_polling`, called at the end of the script, reruns it while
+any of the session's jobs are running so the progress bars move.
+
+A result only applies to the data it was computed from. If the dataset
+changed while the job ran, the result is dropped with a warning.
+"""
+import time
+
+import streamlit as st
+
+from modules.jobs import CANCELLED, FAILED, get_executor
+
+POLL_SECONDS = 1.0
+# Jobs finishing within this time show their result in the same run
+QUICK_SECONDS = 0.5
+
+
+def _jobs():
+    if 'jobs' not in st.session_state:
+        st.session_state.jobs = {}
+    return st.session_state.jobs
+
+
+def dataset_version(df):
+    """What identifies ``df`` across reruns: its history version when it is
+    the session's current frame, else the frame itself.
+
+    Compare with ``is``. History versions survive spills to disk and undo,
+    frame objects do not, and unlike ``id()`` neither can be reused while held.
+    """
+    data = st.session_state.get('session_data')
+    history = data.history if data is not None else None
+    if history is not None and df is history.current():
+        return history.version
+    return df
+
+
+def job_running(key):
+    entry = _jobs().get(key)
+    return entry is not None and not entry[0].done
+
+
+def start_job(key, label, func, df):
+    """Run ``func(report)``, computed from ``df``, as this session's job ``key``."""
+    if job_running(key):
+        st.warning(f"{label} is already running")
+        return
+    job = get_executor().submit(label, func)
+    _jobs()[key] = (job, dataset_version(df))
+    job.wait(QUICK_SECONDS)
+
+
+def job_result(key, df):
+    """Show the progress of job ``key``; returns its result once, when it finished on ``df``."""
+    entry = _jobs().get(key)
+    if entry is None:
+        return None
+    job, version = entry
+    if not job.done:
+        text = f"{job.label}: {job.text}" if job.text else f"{job.label}..."
+        st.progress(job.progress, text=text)
+        st.button("Cancel", key=f"cancel_{key}", on_click=job.cancel, disabled=job.cancelled)
+        return None
+    del _jobs()[key]
+    if job.status == CANCELLED:
+        st.info(f"{job.label} cancelled")
+        return None
+    if job.status == FAILED:
+        st.error(f"❌ {job.label} failed: {job.error}")
+        return None
+    if version is not dataset_version(df):
+        st.warning(f"{job.label} finished after the data changed; its result was discarded. Run it again.")
+        return None
+    return job.result
+
+
+def keep_polling():
+    """Rerun the script while any of this session's jobs are running."""
+    if any(not job.done for job, _ in _jobs().values()):
+        time.sleep(POLL_SECONDS)
+        st.rerun()
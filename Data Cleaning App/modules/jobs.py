@@ -0,0 +1,160 @@
+"""Background jobs for long-running operations.
+
+Operations that take seconds to minutes run on a thread pool shared by
+all sessions instead of in the Streamlit script thread, so widget clicks
+and other users' reruns are never blocked by them. NumPy, pandas,
+scikit-learn and pyarrow release the GIL in their heavy loops, and fuzzy
+scoring has its own process pool, so threads run jobs concurrently
+without copying frames into other processes.
+
+A job function takes one argument, ``report(fraction, text=None)``.
+Calling it updates the job's progress, and it is also where cancellation
+takes effect: after :meth:`Job.cancel`, the next ``report`` raises
+:class:`JobCancelled`. A job that never reports can still be cancelled;
+its result is discarded when it finishes.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.logger import get_logger
+from modules.metrics import register
+from modules.instrumentation import get_session_log, set_session_log
+
+logger = get_logger('jobs')
+
+MAX_WORKERS = int(os.environ.get('DATA_CLEAN_JOB_WORKERS', '0')) or min(4, os.cpu_count() or 1)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class JobCancelled(Exception):
+    """Raised by ``report`` inside a job that was cancelled."""
+
+
+class Job:
+    """One submitted function, its progress and its outcome."""
+
+    def __init__(self, label, func):
+        self.label = label
+        self.func = func
+        self.status = QUEUED
+        self.progress = 0.0
+        self.text = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def report(self, fraction, text=None):
+        """Record progress (``fraction`` in [0, 1]); raises :class:`JobCancelled` once cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.label)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if text is not None:
+            self.text = text
+
+    def cancel(self):
+        self._cancel.set()
+        # a job still in the queue never starts
+        if self.future is not None and self.future.cancel():
+            self._finish(CANCELLED)
+
+    def wait(self, timeout=None):
+        """Wait up to ``timeout`` seconds; ``True`` when the job has finished."""
+        return self._finished.wait(timeout)
+
+    def _finish(self, status):
+        self.status = status
+        self.finished = time.time()
+        self._finished.set()
+
+    def _run(self, log):
+        if self._cancel.is_set():
+            self._finish(CANCELLED)
+            return
+        # profile records of the job go to the session that submitted it
+        set_session_log(log)
+        self.status = RUNNING
+        self.started = time.time()
+        try:
+            result = self.func(self.report)
+        except JobCancelled:
+            self._finish(CANCELLED)
+        except Exception as e:
+            logger.exception(f"Job '{self.label}' failed")
+            self.error = e
+            self._finish(FAILED)
+        else:
+            if self._cancel.is_set():
+                self._finish(CANCELLED)
+            else:
+                self.result = result
+                self.progress = 1.0
+                self._finish(DONE)
+        finally:
+            set_session_log(None)
+        logger.info(f"Job '{self.label}' {self.status} after {self.finished - self.started:.2f}s")
+
+
+class JobExecutor:
+    """Thread pool running the jobs of every session."""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = []
+        self.counts = {DONE: 0, FAILED: 0, CANCELLED: 0}
+
+    def submit(self, label, func):
+        """Queue ``func(report)`` and return its :class:`Job`."""
+        job = Job(label, func)
+        job.future = self._pool.submit(job._run, get_session_log())
+        with self._lock:
+            self._prune()
+            self._jobs.append(job)
+        return job
+
+    def _prune(self):
+        for job in [job for job in self._jobs if job.done]:
+            self.counts[job.status] += 1
+            self._jobs.remove(job)
+
+    def stats(self):
+        """Jobs by state, for :mod:`modules.metrics`."""
+        with self._lock:
+            self._prune()
+            active = [job.status for job in self._jobs]
+            return {'queued': active.count(QUEUED), 'running': active.count(RUNNING), 'workers': self.max_workers,
+                    'finished': dict(self.counts)}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = JobExecutor()
+            register('jobs', _executor.stats)
+    return _executor
@@ -0,0 +1,23 @@
+"""Imports deferred until first use, to keep the app's cold start short.
+
+``app.py`` imports the tab modules with :func:`lazy_import` when their tab
+first runs, so the login page and the empty app do not load them.
+Libraries only some operations need (scikit-learn, scipy, openpyxl) are
+imported inside the functions that use them. Every first import is
+profiled as ``import <module>``, so it shows up in the profiler panel
+and in the operation latency metrics. ``scripts/import_report.py``
+measures what each module adds to a cold start.
+"""
+import importlib
+import sys
+
+from modules.instrumentation import profile
+
+
+def lazy_import(name):
+    """The module ``name``, imported (and profiled) the first time it is asked for."""
+    module = sys.modules.get(name)
+    if module is None:
+        with profile(f'import {name}'):
+            module = importlib.import_module(name)
+    return module
@@ -1,10 +1,37 @@
+import json
 import logging
+import os
+
+# "json" writes one JSON object per line, including structured fields
+LOG_FORMAT = os.environ.get('DATA_CLEAN_LOG_FORMAT', 'text')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra={'event': ..., 'fields': {...}}`` is merged in."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if hasattr(record, 'event'):
+            entry['event'] = record.event
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
 
 def get_logger(name=__name__):
     logger = logging.getLogger(name)
     if not logger.handlers:
         handler = logging.StreamHandler()
-        fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+        if LOG_FORMAT == 'json':
+            fmt = JsonFormatter()
+        else:
+            fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
         handler.setFormatter(fmt)
         logger.addHandler(handler)
         logger.setLevel(logging.INFO)
@@ -0,0 +1,312 @@
+"""Process metrics for the health service.
+
+The Streamlit app and ``health_app.py`` run as separate processes (separate
+containers under docker-compose), so the app writes a JSON snapshot of
+its metrics to ``DATA_CLEAN_METRICS_DIR`` every few seconds and the health
+service serves the latest one. Snapshots hold:
+
+- the sessions seen recently and the bytes of DataFrames each one holds,
+- latency histograms and error counts of profiled steps (see
+  :mod:`modules.instrumentation`),
+- sections added by :func:`register`, such as the parse cache hit counts
+  the spills of :mod:`modules.session_data` and the background jobs of
+  :mod:`modules.jobs`,
+- the resident memory of the app process and its memory budget.
+
+:func:`render` turns a snapshot into the Prometheus text format and
+:func:`readiness` decides whether the app should get more traffic: it is
+not ready once its resident memory crosses the budget, or when no
+snapshot was written recently. The budget is ``DATA_CLEAN_MEMORY_BUDGET_MB``
+or, by default, 90% of the container's memory limit.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from modules.logger import get_logger
+
+logger = get_logger('metrics')
+
+METRICS_DIR = os.environ.get('DATA_CLEAN_METRICS_DIR') or os.path.join(
+    os.environ.get('DATA_CLEAN_WORKDIR') or tempfile.gettempdir(), 'metrics')
+SNAPSHOT_FILE = 'snapshot.json'
+SNAPSHOT_SECONDS = 5
+# Older snapshots mean the app process is gone or stuck
+STALE_SECONDS = 30
+# Sessions without a script run for this long are no longer counted
+SESSION_IDLE_SECONDS = int(os.environ.get('DATA_CLEAN_SESSION_IDLE_SECONDS', '1800'))
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+BUDGET_FRACTION = 0.9
+_STATM = '/proc/self/statm'
+_CGROUP_LIMITS = ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+# cgroup v1 reports "no limit" as a number near 2**63
+_NO_LIMIT = 2**60
+
+
+def rss_bytes():
+    """Resident memory of this process, or ``None`` without ``/proc``."""
+    try:
+        with open(_STATM) as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+
+def container_limit():
+    """The cgroup memory limit of this container in bytes, or ``None``."""
+    for path in _CGROUP_LIMITS:
+        try:
+            with open(path) as fh:
+                value = fh.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < _NO_LIMIT:
+            return int(value)
+    return None
+
+
+def memory_budget():
+    """Resident bytes above which the app reports itself not ready, or ``None``."""
+    value = os.environ.get('DATA_CLEAN_MEMORY_BUDGET_MB')
+    if value:
+        return int(float(value) * 1024**2)
+    limit = container_limit()
+    return int(limit * BUDGET_FRACTION) if limit else None
+
+
+class Histogram:
+    """Counts of observed values per ``LATENCY_BUCKETS`` bucket, plus their sum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last slot counts values above every bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum}
+
+
+class Registry:
+    """Metrics of this process, shared by every session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._latency = {}
+        self._errors = {}
+        self._sections = {}
+
+    def observe(self, record):
+        """Add a profile record: its wall time and whether it failed."""
+        operation = record['operation']
+        with self._lock:
+            if operation not in self._latency:
+                self._latency[operation] = Histogram()
+            self._latency[operation].observe(record['wall_s'])
+            if record.get('error'):
+                self._errors[operation] = self._errors.get(operation, 0) + 1
+
+    def track_session(self, session_id, nbytes):
+        """Record that ``session_id`` is alive and holds ``nbytes`` of DataFrames."""
+        with self._lock:
+            self._sessions[session_id] = (nbytes, time.time())
+
+    def set_session_bytes(self, session_id, nbytes):
+        """Update the bytes of a tracked session without marking it as seen."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id] = (nbytes, self._sessions[session_id][1])
+
+    def register(self, name, collect):
+        """Include ``collect()`` (a JSON-serializable dict) in snapshots as ``name``."""
+        self._sections[name] = collect
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for session_id, (_, seen) in list(self._sessions.items()):
+                if now - seen > SESSION_IDLE_SECONDS:
+                    del self._sessions[session_id]
+            snapshot = {
+                'time': now,
+                'pid': os.getpid(),
+                'rss_bytes': rss_bytes(),
+                'memory_budget_bytes': memory_budget(),
+                'sessions': {session_id: nbytes for session_id, (nbytes, _) in self._sessions.items()},
+                'latency': {op: h.to_dict() for op, h in self._latency.items()},
+                'errors': dict(self._errors),
+            }
+        for name, collect in self._sections.items():
+            try:
+                snapshot[name] = collect()
+            except Exception as e:
+                logger.warning(f"Metrics section {name} failed: {e}")
+        return snapshot
+
+
+_registry = Registry()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_registry():
+    return _registry
+
+
+def observe(record):
+    _registry.observe(record)
+
+
+def register(name, collect):
+    _registry.register(name, collect)
+
+
+def snapshot_path(directory=None):
+    return os.path.join(directory or METRICS_DIR, SNAPSHOT_FILE)
+
+
+def write_snapshot(path=None, registry=None):
+    """Write the current snapshot, replacing the previous one atomically."""
+    path = path or snapshot_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}.tmp'
+    with open(partial, 'w') as fh:
+        json.dump((registry or _registry).snapshot(), fh)
+    os.replace(partial, path)
+
+
+def read_snapshot(path=None):
+    """The latest snapshot, or ``None`` when there is none or it cannot be read."""
+    try:
+        with open(path or snapshot_path()) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_forever(interval):
+    while True:
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+        time.sleep(interval)
+
+
+def start_reporting(interval=SNAPSHOT_SECONDS):
+    """Write snapshots every ``interval`` seconds from a daemon thread; safe to call on every run."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_forever, args=(interval,), name='metrics-writer', daemon=True)
+            _writer.start()
+            logger.info(f"Writing metrics snapshots to {snapshot_path()}")
+
+
+def readiness(snapshot, now=None):
+    """``(ready, reason)`` for a snapshot from :func:`read_snapshot`."""
+    now = time.time() if now is None else now
+    if snapshot is None:
+        return False, "no metrics snapshot from the app (is it started with serve.py?)"
+    age = now - snapshot['time']
+    if age > STALE_SECONDS:
+        return False, f"metrics snapshot is {age:.0f}s old"
+    rss, budget = snapshot.get('rss_bytes'), snapshot.get('memory_budget_bytes')
+    if rss is not None and budget is not None and rss > budget:
+        return False, f"resident memory {rss / 1024**2:.0f} MB is over the {budget / 1024**2:.0f} MB budget"
+    return True, "ok"
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _bound(value):
+    return f'{value:g}'
+
+
+def render(snapshot, now=None):
+    """The snapshot in the Prometheus text exposition format."""
+    now = time.time() if now is None else now
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            lines.append(f'{name}{suffix}{_labels(**labels) if labels else ""} {value}')
+
+    ready, _ = readiness(snapshot, now)
+    metric('data_clean_ready', 'gauge', "1 when the app is under its memory budget and reporting",
+           [('', {}, int(ready))])
+    if snapshot is None:
+        return '\n'.join(lines) + '\n'
+    metric('data_clean_snapshot_age_seconds', 'gauge', "Seconds since the app wrote these metrics",
+           [('', {}, round(now - snapshot['time'], 3))])
+    if snapshot.get('rss_bytes') is not None:
+        metric('data_clean_resident_memory_bytes', 'gauge', "Resident memory of the app process",
+               [('', {}, snapshot['rss_bytes'])])
+    if snapshot.get('memory_budget_bytes') is not None:
+        metric('data_clean_memory_budget_bytes', 'gauge', "Resident memory above which the app is not ready",
+               [('', {}, snapshot['memory_budget_bytes'])])
+    sessions = snapshot.get('sessions', {})
+    metric('data_clean_active_sessions', 'gauge', "Sessions with a script run within DATA_CLEAN_SESSION_IDLE_SECONDS",
+           [('', {}, len(sessions))])
+    # session ids are shortened; the full id is not needed to tell sessions apart
+    metric('data_clean_session_dataframe_bytes', 'gauge', "Bytes of DataFrames held by each session",
+           [('', {'session': session_id[:8]}, nbytes) for session_id, nbytes in sorted(sessions.items())])
+    metric('data_clean_dataframe_bytes', 'gauge', "Bytes of DataFrames held by all sessions",
+           [('', {}, sum(sessions.values()))])
+    samples = []
+    for operation, hist in sorted(snapshot.get('latency', {}).items()):
+        cumulative = 0
+        for bound, count in zip(hist['buckets'] + ['+Inf'], hist['counts']):
+            cumulative += count
+            le = bound if bound == '+Inf' else _bound(bound)
+            samples.append(('_bucket', {'operation': operation, 'le': le}, cumulative))
+        samples.append(('_sum', {'operation': operation}, round(hist['sum'], 6)))
+        samples.append(('_count', {'operation': operation}, cumulative))
+    metric('data_clean_operation_seconds', 'histogram', "Wall time of cleaning operations, loads and exports",
+           samples)
+    metric('data_clean_operation_errors_total', 'counter', "Operations that raised an error",
+           [('', {'operation': op}, n) for op, n in sorted(snapshot.get('errors', {}).items())])
+    tiers = snapshot.get('parse_cache', {})
+    if tiers:
+        metric('data_clean_parse_cache_hits_total', 'counter', "Parsed-file cache hits",
+               [('', {'tier': tier}, t['hits']) for tier, t in sorted(tiers.items())])
+        metric('data_clean_parse_cache_misses_total', 'counter', "Parsed-file cache misses",
+               [('', {'tier': tier}, t['misses']) for tier, t in sorted(tiers.items())])
+        metric('data_clean_parse_cache_hit_ratio', 'gauge', "Share of parsed-file cache lookups that hit",
+               [('', {'tier': tier}, round(t['hits'] / (t['hits'] + t['misses']), 4))
+                for tier, t in sorted(tiers.items()) if t['hits'] + t['misses']])
+        metric('data_clean_parse_cache_bytes', 'gauge', "Bytes held by the parsed-file cache",
+               [('', {'tier': tier}, t['bytes']) for tier, t in sorted(tiers.items())])
+    store = snapshot.get('session_data')
+    if store:
+        metric('data_clean_session_budget_bytes', 'gauge', "Budget for the DataFrames of all sessions",
+               [('', {}, store['budget_bytes'])])
+        metric('data_clean_spilled_sessions', 'gauge', "Sessions whose DataFrames are spilled to disk",
+               [('', {}, store['spilled_sessions'])])
+        metric('data_clean_session_spills_total', 'counter', "Sessions spilled to disk",
+               [('', {}, store['spills'])])
+        metric('data_clean_session_reloads_total', 'counter', "Spilled sessions reloaded from disk",
+               [('', {}, store['reloads'])])
+    jobs = snapshot.get('jobs')
+    if jobs:
+        metric('data_clean_jobs', 'gauge', "Background jobs waiting or running",
+               [('', {'state': 'queued'}, jobs['queued']), ('', {'state': 'running'}, jobs['running'])])
+        metric('data_clean_job_workers', 'gauge', "Threads running background jobs", [('', {}, jobs['workers'])])
+        metric('data_clean_jobs_finished_total', 'counter', "Background jobs finished, by outcome",
+               [('', {'status': status}, n) for status, n in sorted(jobs['finished'].items())])
+    return '\n'.join(lines) + '\n'
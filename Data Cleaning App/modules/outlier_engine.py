@@ -0,0 +1,138 @@
+"""Outlier bounds and masks for many numeric columns at once.
+
+:func:`outlier_bounds` computes IQR, z-score or MAD bounds for every
+selected column together: quantiles come from
+:func:`modules.stats.frame_quantiles` (one vectorized pass over the
+columns not cached yet), means and deviations from the cached
+:class:`~modules.stats.ColumnStats`. :func:`bounds_from_stats` gives the
+same bounds from mergeable, sketch-based statistics, so chunked datasets
+that never fit in memory are handled too. :func:`outlier_mask` turns
+bounds into one boolean mask, and :func:`isolation_forest_mask` flags
+rows that are unusual across all columns together.
+"""
+import numpy as np
+import pandas as pd
+
+from modules.column_cache import ColumnCache
+from modules.logger import get_logger
+from modules.stats import column_stats, frame_quantiles, is_numeric, quantiles
+
+logger = get_logger('outlier_engine')
+
+# Default multiplier of each method's spread
+METHODS = {'iqr': 1.5, 'zscore': 3.0, 'mad': 3.5}
+# Scales a median absolute deviation to a normal standard deviation
+MAD_SCALE = 1.4826
+PREDICT_CHUNK_ROWS = 100_000
+
+_cache = ColumnCache(max_entries=64)
+
+
+def _check_method(method):
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method: {method}")
+    return METHODS[method]
+
+
+def _values(df, columns):
+    return np.column_stack([df[col].to_numpy(dtype='float64', na_value=np.nan) for col in columns])
+
+
+def _mad(series):
+    median = quantiles(series, (0.5,))[0]
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    deviations = np.abs(values[~np.isnan(values)] - median)
+    return float(np.median(deviations)) if len(deviations) else np.nan
+
+
+def _bounds_frame(columns, lower, upper):
+    return pd.DataFrame({'lower': lower, 'upper': upper}, index=list(columns), dtype='float64')
+
+
+def outlier_bounds(df, columns=None, method='iqr', k=None):
+    """``columns x (lower, upper)`` bounds of every numeric column of ``df``."""
+    default = _check_method(method)
+    k = default if k is None else k
+    if columns is None:
+        columns = [col for col in df.columns if is_numeric(df[col])]
+    columns = list(columns)
+    if method == 'iqr':
+        q = frame_quantiles(df, columns, (0.25, 0.75)).to_numpy()
+        iqr = q[:, 1] - q[:, 0]
+        return _bounds_frame(columns, q[:, 0] - k * iqr, q[:, 1] + k * iqr)
+    if method == 'zscore':
+        stats = [column_stats(df[col]) for col in columns]
+        mean = np.array([s.mean for s in stats])
+        std = np.array([s.std for s in stats])
+        return _bounds_frame(columns, mean - k * std, mean + k * std)
+    median = frame_quantiles(df, columns, (0.5,)).to_numpy()[:, 0]
+    mad = np.array([_cache.get_or_compute(df[col], _mad, tag='mad') for col in columns])
+    return _bounds_frame(columns, median - k * MAD_SCALE * mad, median + k * MAD_SCALE * mad)
+
+
+def bounds_from_stats(stats, method='iqr', k=None):
+    """Bounds from ``{column: ColumnStats}``, e.g. a chunked dataset's running statistics.
+
+    Quantiles come from the statistics' sketches. The MAD method uses half
+    the interquartile range as the median absolute deviation, which is
+    exact for symmetric distributions.
+    """
+    default = _check_method(method)
+    k = default if k is None else k
+    columns = list(stats)
+    if method == 'zscore':
+        mean = np.array([stats[col].mean for col in columns])
+        std = np.array([stats[col].std for col in columns])
+        return _bounds_frame(columns, mean - k * std, mean + k * std)
+    q = np.array([[stats[col].quantile(level) for level in (0.25, 0.5, 0.75)] for col in columns]).reshape(-1, 3)
+    iqr = q[:, 2] - q[:, 0]
+    if method == 'iqr':
+        return _bounds_frame(columns, q[:, 0] - k * iqr, q[:, 2] + k * iqr)
+    spread = k * MAD_SCALE * iqr / 2
+    return _bounds_frame(columns, q[:, 1] - spread, q[:, 1] + spread)
+
+
+def outlier_mask(df, bounds):
+    """Boolean frame: which values of ``bounds``' columns fall outside them.
+
+    Missing values are never outliers; ``outlier_mask(...).any(axis=1)``
+    is the combined row mask.
+    """
+    columns = list(bounds.index)
+    if not columns:
+        return pd.DataFrame(index=df.index)
+    values = _values(df, columns)
+    with np.errstate(invalid='ignore'):
+        mask = (values < bounds['lower'].to_numpy()) | (values > bounds['upper'].to_numpy())
+    return pd.DataFrame(mask, index=df.index, columns=columns)
+
+
+def isolation_forest_mask(df, columns=None, contamination='auto', n_estimators=100, n_jobs=None, seed=0):
+    """Rows an Isolation Forest finds anomalous over ``columns`` together.
+
+    Missing values are filled with the column median. The forest is built
+    from small subsamples (256 rows per tree) and rows are scored in
+    chunks across ``n_jobs`` cores. Cached until one of ``columns`` changes.
+    """
+    if columns is None:
+        columns = [col for col in df.columns if is_numeric(df[col])]
+    columns = list(columns)
+    if not columns or not len(df):
+        return np.zeros(len(df), dtype=bool)
+
+    def compute(series):
+        from sklearn.ensemble import IsolationForest
+
+        values = _values(df, columns)
+        medians = frame_quantiles(df, columns, (0.5,)).to_numpy()[:, 0]
+        missing = np.isnan(values)
+        values[missing] = np.take(np.nan_to_num(medians), np.nonzero(missing)[1])
+        forest = IsolationForest(n_estimators=n_estimators, contamination=contamination,
+                                 n_jobs=n_jobs, random_state=seed).fit(values)
+        mask = np.concatenate([forest.predict(values[start:start + PREDICT_CHUNK_ROWS]) == -1
+                               for start in range(0, len(values), PREDICT_CHUNK_ROWS)])
+        logger.info(f"Isolation Forest: {int(mask.sum())} of {len(mask)} rows anomalous over {len(columns)} columns")
+        return mask
+
+    series = [df[col] for col in columns]
+    return _cache.get_or_compute(series, compute, tag=('iforest', contamination, n_estimators, seed))
@@ -1,46 +1,76 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from modules import cleaning
+from modules.outlier_engine import METHODS, outlier_bounds, outlier_mask
+from modules.preview import preview_dataframe
+from modules.job_panel import job_result, job_running, start_job
+
+METHOD_NAMES = {"IQR": 'iqr', "Z-score": 'zscore', "MAD": 'mad'}
+ACTIONS = {"Remove": 'remove', "Cap at bounds": 'cap', "Replace with median": 'median'}
 
 def handle_outliers(df):
     st.subheader("📈 Handle Outliers")
-    
+
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     if not numeric_cols:
         st.warning("No numeric columns found")
         return df
-    
-    col = st.selectbox("Select column", numeric_cols)
-    Q1 = df[col].quantile(0.25)
-    Q3 = df[col].quantile(0.75)
-    IQR = Q3 - Q1
-    lower = Q1 - 1.5 * IQR
-    upper = Q3 + 1.5 * IQR
-    outliers_count = ((df[col] < lower) | (df[col] > upper)).sum()
-    
-    st.metric("Outliers Detected", outliers_count)
-    st.write(f"Bounds: [{lower:.2f}, {upper:.2f}]")
-    
-    action = st.radio("Action", ["Remove", "Cap at bounds", "Replace with median"])
-    
-    if action == "Remove" and st.button("Apply"):
+
+    method = st.radio("Method", list(METHOD_NAMES) + ["Isolation Forest"], horizontal=True, key="outlier_method")
+    columns = st.multiselect("Columns", numeric_cols, default=numeric_cols, key="outlier_columns")
+    if not columns:
+        st.info("Select at least one column")
+        return df
+
+    if method == "Isolation Forest":
+        return _isolation_forest(df, columns)
+
+    method = METHOD_NAMES[method]
+    k = st.number_input("Multiplier", 0.5, 10.0, METHODS[method], 0.5, key=f"outlier_k_{method}")
+    # bounds of every selected column in one pass, from cached statistics
+    bounds = outlier_bounds(df, columns, method=method, k=k)
+    mask = outlier_mask(df, bounds)
+    rows = mask.to_numpy().any(axis=1)
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("Outliers Detected", int(mask.to_numpy().sum()))
+        st.metric("Rows with outliers", int(rows.sum()))
+    with col2:
+        table = pd.DataFrame({'Lower': bounds['lower'], 'Upper': bounds['upper'], 'Outliers': mask.sum()})
+        st.dataframe(table.round(2), use_container_width=True)
+
+    action = st.radio("Action", list(ACTIONS))
+
+    if st.button("Apply"):
         initial = len(df)
-        df = df[(df[col] >= lower) & (df[col] <= upper)]
-        st.success(f"✅ Removed {initial - len(df)} outliers")
+        df = cleaning.treat_outlier_columns(df, columns, method=method, action=ACTIONS[action], k=k)
+        if action == "Remove":
+            st.success(f"✅ Removed {initial - len(df)} rows with outliers")
+        elif action == "Cap at bounds":
+            st.success("✅ Outliers capped")
+        else:
+            st.success("✅ Outliers replaced")
         st.subheader("📋 Updated Dataset:")
-        st.dataframe(df, use_container_width=True)
-    
-    elif action == "Cap at bounds" and st.button("Apply"):
-        df[col] = df[col].clip(lower=lower, upper=upper)
-        st.success("✅ Outliers capped")
-        st.subheader("📋 Updated Dataset:")
-        st.dataframe(df, use_container_width=True)
-    
-    elif action == "Replace with median" and st.button("Apply"):
-        median = df[col].median()
-        df.loc[(df[col] < lower) | (df[col] > upper), col] = median
-        st.success("✅ Outliers replaced")
+        preview_dataframe(df, key="outliers_preview")
+
+    return df
+
+
+def _isolation_forest(df, columns):
+    st.caption("Flags rows that are unusual across the selected columns together, not just in one of them.")
+    share = st.slider("Expected share of anomalies (0 = let the model decide)", 0.0, 0.2, 0.0, 0.005,
+                      key="outlier_contamination")
+    contamination = share if share > 0 else 'auto'
+    if st.button("Remove anomalous rows", disabled=job_running('isolation_forest')):
+        # scikit-learn reports no progress; a cancelled fit is discarded when it ends
+        start_job('isolation_forest', "Isolation Forest", lambda report: cleaning.remove_anomalies(
+            df, columns, contamination=contamination, n_jobs=-1), df)
+    cleaned = job_result('isolation_forest', df)
+    if cleaned is not None:
+        st.success(f"✅ Removed {len(df) - len(cleaned)} anomalous rows")
+        df = cleaned
         st.subheader("📋 Updated Dataset:")
-        st.dataframe(df, use_container_width=True)
-    
+        preview_dataframe(df, key="outliers_preview")
     return df
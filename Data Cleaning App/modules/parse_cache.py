@@ -0,0 +1,194 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from modules.logger import get_logger
+from modules.metrics import register
+from modules.streaming import get_workdir
+
+logger = get_logger('parse_cache')
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get('DATA_CLEAN_PARSE_CACHE_MB', '512')) * 1024 * 1024
+DEFAULT_DISK_BUDGET_BYTES = int(os.environ.get('DATA_CLEAN_DISK_CACHE_MB', '2048')) * 1024 * 1024
+
+
+def content_key(data: bytes, **options) -> str:
+    """Key for a parsed file: hash of its bytes plus the parse options."""
+    h = hashlib.blake2b(data, digest_size=20)
+    h.update(repr(sorted(options.items())).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _copy(df):
+    # under copy-on-write a shallow copy is enough to isolate callers
+    return df.copy(deep=not pd.get_option('mode.copy_on_write'))
+
+
+class ParseCache:
+    """Process-wide LRU cache of parsed DataFrames with a byte budget.
+
+    Entries are shared by every session, so callers get a copy and the
+    cached frame is never mutated.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            df = entry[0]
+        return _copy(df)
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            logger.info(f"Not caching parse result of {size} bytes (budget {self.max_bytes})")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (_copy(df), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def get_or_parse(self, key, parse, persist=False):
+        """Cached result of ``parse()``; with ``persist``, also kept in the on-disk cache.
+
+        Parsed copies on disk outlive this process's memory budget, so
+        slow formats such as Excel reload from Parquet instead.
+        """
+        df = self.get(key)
+        if df is not None:
+            return df
+        disk = get_disk_cache() if persist else None
+        df = disk.get(key) if disk is not None else None
+        if df is None:
+            df = parse()
+            if disk is not None:
+                disk.put(key, df)
+        self.put(key, df)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class DiskCache:
+    """Parsed DataFrames stored as Parquet files, evicting the least recently used past a byte budget."""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_DISK_BUDGET_BYTES):
+        self.path = path or os.path.join(get_workdir(), 'parse-cache')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f'{key}.parquet')
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError) as e:
+            if os.path.exists(path):
+                logger.warning(f"Discarding unreadable cache file {path}: {e}")
+                os.remove(path)
+            self.misses += 1
+            return None
+        # the modification time orders entries for eviction
+        os.utime(path)
+        self.hits += 1
+        return df
+
+    def put(self, key, df):
+        path = self._file(key)
+        partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            df.to_parquet(partial, index=False)
+        except Exception as e:
+            # e.g. object columns that mix numbers and text
+            logger.info(f"Not caching parse result on disk: {e}")
+            if os.path.exists(partial):
+                os.remove(partial)
+            return
+        # readers never see a half-written file
+        os.replace(partial, path)
+        self._evict()
+
+    @property
+    def nbytes(self):
+        return sum(os.path.getsize(os.path.join(self.path, name))
+                   for name in os.listdir(self.path) if name.endswith('.parquet'))
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.path, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.path, name))
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            os.remove(os.path.join(self.path, name))
+
+
+_cache = None
+_disk_cache = None
+
+
+def get_parse_cache():
+    global _cache
+    if _cache is None:
+        _cache = ParseCache()
+    return _cache
+
+
+def get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = DiskCache()
+    return _disk_cache
+
+
+def stats():
+    """Hits, misses and bytes of each cache tier in use, for :mod:`modules.metrics`."""
+    tiers = {}
+    for tier, cache in (('memory', _cache), ('disk', _disk_cache)):
+        if cache is not None:
+            tiers[tier] = {'hits': cache.hits, 'misses': cache.misses, 'bytes': cache.nbytes}
+    return tiers
+
+
+register('parse_cache', stats)
@@ -0,0 +1,147 @@
+"""Lazy cleaning plans.
+
+A :class:`CleaningPlan` records cleaning steps without running them. When
+the data is actually needed, adjacent column-wise steps are fused into one
+stage: each touched column is factorized once, the whole chain of
+element-wise operations runs over its distinct values only, and the result
+is mapped back with a single ``take``. A chain like strip spaces -> replace
+NULL strings -> to numeric -> clip therefore costs one pass per column and
+one intermediate frame instead of four of each.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.cleaning import COLUMN_OPERATIONS, OPERATIONS, TEXT_DTYPES, apply_step
+
+# Columns with more distinct values than this fraction of rows skip the
+# factorize step; evaluating the chain directly is cheaper there.
+FACTORIZE_MAX_RATIO = 0.5
+DTYPE_CHANGING = ('convert_text_numbers', 'to_numeric')
+
+
+class Step:
+    def __init__(self, op, columns=None, **params):
+        if op not in COLUMN_OPERATIONS and op not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+        if op in COLUMN_OPERATIONS and 'column' in params:
+            columns = [params.pop('column')]
+        self.op = op
+        self.columns = list(columns) if columns is not None else None
+        self.params = params
+
+    @property
+    def column_wise(self):
+        return self.op in COLUMN_OPERATIONS
+
+    def describe(self):
+        parts = [self.op]
+        if self.columns is not None:
+            parts.append(f"on {', '.join(map(str, self.columns))}")
+        if self.params:
+            parts.append(', '.join(f'{k}={v!r}' for k, v in self.params.items()))
+        return ' '.join(parts)
+
+    def __repr__(self):
+        return f'Step({self.describe()})'
+
+
+class CleaningPlan:
+    """An ordered list of pending cleaning steps, executed on demand."""
+
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add(self, op, columns=None, **params):
+        self.steps.append(Step(op, columns, **params))
+        return self
+
+    def clear(self):
+        self.steps = []
+
+    def describe(self):
+        return [step.describe() for step in self.steps]
+
+    def stages(self):
+        """Group steps into fused column-wise stages and single frame-level steps."""
+        stages = []
+        for step in self.steps:
+            if step.column_wise and stages and stages[-1][0] == 'columns' and _can_join(stages[-1][1], step):
+                stages[-1][1].append(step)
+            elif step.column_wise:
+                stages.append(('columns', [step]))
+            else:
+                stages.append(('frame', [step]))
+        return stages
+
+    def execute(self, df, timings=None):
+        """Run every step against ``df`` and return the result.
+
+        ``timings``, if given, receives ``(stage label, seconds)`` tuples.
+        """
+        for kind, steps in self.stages():
+            start = time.perf_counter()
+            if kind == 'columns':
+                df = _run_fused(df, steps)
+            else:
+                step = steps[0]
+                params = dict(step.params)
+                if step.columns is not None:
+                    params['columns'] = step.columns
+                df = apply_step(df, {'op': step.op, **params})
+            if timings is not None:
+                timings.append(('+'.join(s.op for s in steps), time.perf_counter() - start))
+        return df
+
+    def preview(self, df, n=20):
+        return self.execute(df.head(n))
+
+    @classmethod
+    def from_steps(cls, steps):
+        """Build a plan from ``{"op": name, "columns": [...], **params}`` dicts."""
+        plan = cls()
+        for step in steps:
+            params = dict(step)
+            plan.add(params.pop('op'), params.pop('columns', None), **params)
+        return plan
+
+
+def _can_join(stage, step):
+    # A step without explicit columns targets whatever is text when it runs,
+    # so it cannot be fused behind a step that may turn text into numbers.
+    if step.columns is not None:
+        return True
+    return not any(s.op in DTYPE_CHANGING for s in stage)
+
+
+def _chain(series, steps):
+    for step in steps:
+        series = COLUMN_OPERATIONS[step.op](series, **step.params)
+    return series
+
+
+def _run_column(series, steps):
+    if series.dtype.kind != 'O' and str(series.dtype) not in ('string', 'category'):
+        return _chain(series, steps)
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    if len(uniques) > FACTORIZE_MAX_RATIO * max(len(series), 1):
+        return _chain(series, steps)
+    uniques = pd.Series(np.asarray(uniques, dtype=object) if isinstance(uniques, pd.Categorical) else uniques)
+    mapped = _chain(uniques, steps)
+    return pd.Series(mapped.take(codes).values, index=series.index, name=series.name)
+
+
+def _run_fused(df, steps):
+    text_cols = df.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+    touched = {}
+    for step in steps:
+        for col in text_cols if step.columns is None else step.columns:
+            touched.setdefault(col, []).append(step)
+    df = df.copy(deep=False)
+    for col, col_steps in touched.items():
+        df[col] = _run_column(df[col], col_steps)
+    return df
@@ -0,0 +1,168 @@
+"""Paginated data preview.
+
+``st.dataframe(df)`` serializes the whole frame to Arrow and ships it to
+the browser on every rerun. :func:`preview_dataframe` renders only one
+page of rows and a window of columns instead. Sorting and filtering run
+on the server and produce an array of row positions, and both those
+positions and the serialized Arrow pages are cached per frame object, so
+paging through an unchanged dataset costs O(page size).
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+MAX_COLUMNS = 30
+MAX_CACHED_PAGES = 64
+MAX_CACHED_VIEWS = 16
+
+
+class _FrameCache:
+    """Small LRU cache whose entries belong to one frame object.
+
+    Keys include ``id(df)`` and each entry keeps a weak reference to the
+    frame it was computed from, so a recycled id never returns a stale page.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, df, key, compute):
+        key = (id(df),) + key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is df:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (weakref.ref(df), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_views = _FrameCache(MAX_CACHED_VIEWS)
+_pages = _FrameCache(MAX_CACHED_PAGES)
+
+
+def row_positions(df, sort_by=None, ascending=True, filter_column=None, filter_text=''):
+    """Row positions of ``df`` after filtering and sorting.
+
+    The filter is a case-insensitive substring match on the text of
+    ``filter_column``; missing values sort last.
+    """
+    return _views.get_or_compute(df, ('view', sort_by, ascending, filter_column, filter_text),
+                                 lambda: _row_positions(df, sort_by, ascending, filter_column, filter_text))
+
+
+def _row_positions(df, sort_by, ascending, filter_column, filter_text):
+    positions = np.arange(len(df))
+    if filter_column is not None and filter_text:
+        values = df[filter_column].astype(str)
+        mask = values.str.contains(filter_text, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        # to_numpy() arrays are read-only under copy-on-write
+        mask = mask & df[filter_column].notna().to_numpy()
+        positions = positions[mask]
+    if sort_by is not None:
+        values = df[sort_by].iloc[positions].reset_index(drop=True)
+        try:
+            order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        except TypeError:
+            # mixed types in an object column: compare as text
+            order = values.astype(str).sort_values(ascending=ascending, kind='stable').index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def _to_arrow(page):
+    try:
+        return pa.Table.from_pandas(page, preserve_index=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # object columns mixing e.g. numbers and strings have no Arrow type
+        page = page.copy()
+        for col in page.columns:
+            if page[col].dtype == object:
+                page[col] = page[col].astype(str).where(page[col].notna())
+        return pa.Table.from_pandas(page, preserve_index=True)
+
+
+def get_page(df, page=0, page_size=50, columns=None, sort_by=None, ascending=True,
+             filter_column=None, filter_text=''):
+    """One page of ``df`` as an Arrow table, plus the number of matching rows."""
+    positions = row_positions(df, sort_by, ascending, filter_column, filter_text)
+    columns = list(df.columns) if columns is None else list(columns)
+    start = page * page_size
+    key = ('page', sort_by, ascending, filter_column, filter_text, page, page_size, tuple(columns))
+
+    def compute():
+        col_positions = [df.columns.get_loc(c) for c in columns]
+        return _to_arrow(df.iloc[positions[start:start + page_size], col_positions])
+
+    return _pages.get_or_compute(df, key, compute), len(positions)
+
+
+def preview_dataframe(df, key, page_size=50):
+    """Render a paginated, sortable and filterable view of ``df``.
+
+    ``key`` must be unique among the previews shown in one run; it prefixes
+    the widget keys of the pager controls.
+    """
+    if df is None:
+        return
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    columns = list(df.columns)
+
+    with st.expander("Preview options"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sort_by = st.selectbox("Sort by", [None] + columns, key=f"{key}_sort",
+                                   format_func=lambda c: "(none)" if c is None else str(c))
+            ascending = st.checkbox("Ascending", value=True, key=f"{key}_asc")
+        with col2:
+            filter_column = st.selectbox("Filter column", [None] + columns, key=f"{key}_filter_col",
+                                         format_func=lambda c: "(none)" if c is None else str(c))
+            filter_text = st.text_input("Contains", key=f"{key}_filter_text")
+        with col3:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES,
+                                     index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1,
+                                     key=f"{key}_page_size")
+            if len(columns) > MAX_COLUMNS:
+                shown = st.multiselect("Columns", columns, default=columns[:MAX_COLUMNS], key=f"{key}_columns")
+            else:
+                shown = columns
+    shown = shown or columns[:1]
+
+    total = len(row_positions(df, sort_by, ascending, filter_column, filter_text))
+    pages = max(1, -(-total // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        # the data shrank (or a filter narrowed it) since the last run
+        st.session_state[f"{key}_page"] = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page") - 1
+    page = min(page, pages - 1)
+    table, total = get_page(df, page, page_size, shown, sort_by, ascending, filter_column, filter_text)
+    st.dataframe(table, use_container_width=True)
+    start = page * page_size
+    st.caption(f"Rows {min(start + 1, total):,}–{min(start + page_size, total):,} of {total:,}"
+               + (f" (filtered from {len(df):,})" if total != len(df) else "")
+               + f" · {len(shown)} of {len(columns)} columns")
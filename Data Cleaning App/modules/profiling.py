@@ -0,0 +1,191 @@
+"""Column type profiles.
+
+A profile says what a column's values look like: the share of numbers,
+number words ("twenty-two"), dates, NULL-like tokens and free text. Text
+columns are profiled from a random sample that grows until the Wilson
+confidence interval of every share is narrow enough and the "mixed"
+decision is settled; only columns where that never happens are scanned
+in full. A column is mixed when any value has letters and any has digits
+(or values are missing); when the sample has none of one, the whole
+column is checked for it, so a few rare values are never missed.
+Classification runs on distinct values, and profiles are cached
+per column buffer, so an operation that changes one column only costs a
+new profile for that column.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from modules.column_cache import ColumnCache
+from modules.utils import NULL_STRINGS, text_to_number
+
+KINDS = ('numeric', 'word_number', 'date', 'null_token', 'text')
+SAMPLE_SIZES = (2_000, 8_000, 32_000, 128_000)
+# Half-width of the 95% interval every share must reach before sampling stops
+TOLERANCE = 0.02
+Z = 1.96
+
+_NUMBER = r'[-+]?((\d{1,3}(,\d{3})+|\d+)(\.\d*)?|\.\d+)([eE][-+]?\d+)?'
+_DATE = (r'\d{4}[-/.]\d{1,2}[-/.]\d{1,2}([ t]\d{1,2}:\d{2}(:\d{2})?)?'
+         r'|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}'
+         r'|\d{1,2} (jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{2,4}'
+         r'|(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{1,2},? \d{2,4}')
+_NULL_TOKENS = {s.lower() for s in NULL_STRINGS}
+
+_cache = ColumnCache()
+
+
+def wilson_interval(k, n, z=Z):
+    """Wilson score interval for a proportion of ``k`` successes in ``n`` trials."""
+    if n == 0:
+        return 0.0, 1.0
+    p = k / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class ColumnProfile:
+    """What the values of one column look like.
+
+    ``shares`` are fractions of the non-missing values; ``bounds`` their
+    95% confidence intervals (exact when ``exact`` is true).
+    """
+
+    def __init__(self, dtype, rows, missing, counts, letters, digits, sampled, exact, has_letters=None,
+                 has_digits=None):
+        self.dtype = dtype
+        self.rows = rows
+        self.missing = missing
+        self.sampled = sampled
+        self.exact = exact
+        self.counts = counts
+        self.letters = letters
+        self.digits = digits
+        # whether any value of the whole column has letters (digits)
+        self.has_letters = letters > 0 if has_letters is None else has_letters
+        self.has_digits = digits > 0 if has_digits is None else has_digits
+        self.shares = {k: counts[k] / sampled if sampled else 0.0 for k in KINDS}
+        if exact:
+            self.bounds = {k: (self.shares[k], self.shares[k]) for k in KINDS}
+        else:
+            self.bounds = {k: wilson_interval(counts[k], sampled) for k in KINDS}
+
+    @property
+    def kind(self):
+        """The dominant kind of value, ``'empty'`` for an all-missing column."""
+        if not self.sampled:
+            return 'empty'
+        return max(KINDS, key=lambda k: self.counts[k])
+
+    @property
+    def is_text(self):
+        return self.dtype in ('object', 'string', 'category') or self.dtype.startswith('string')
+
+    @property
+    def mixed(self):
+        """A text column mixing words with digits or missing values."""
+        if not self.is_text:
+            return False
+        has_letters = self.missing > 0 or self.has_letters
+        has_digits = self.missing > 0 or self.has_digits
+        return has_letters and has_digits
+
+    def summary(self):
+        share = self.shares[self.kind] if self.sampled else 0.0
+        how = 'exact' if self.exact else f'{self.sampled:,} sampled'
+        return f"{self.kind} ({share:.0%}, {how})"
+
+
+def _classify(values, counts):
+    """Weighted kind counts and letter/digit counts for distinct ``values``."""
+    text = pd.Series(values, dtype=object).astype(str).str.strip().str.lower()
+    null_token = text.isin(_NULL_TOKENS).to_numpy()
+    letters = text.str.contains('[a-z]').to_numpy(dtype=bool)
+    numeric = text.str.fullmatch(_NUMBER).to_numpy(dtype=bool) & ~null_token
+    digits = text.str.contains(r'\d').to_numpy(dtype=bool)
+    date = ~numeric & ~null_token & text.str.fullmatch(_DATE).to_numpy(dtype=bool)
+    rest = ~(numeric | null_token | date)
+    word_number = np.zeros(len(text), dtype=bool)
+    for i in np.flatnonzero(rest & letters):
+        word_number[i] = text_to_number(text.iat[i]) is not None
+    kinds = {'numeric': numeric, 'word_number': word_number, 'date': date,
+             'null_token': null_token, 'text': rest & ~word_number}
+    out = {k: int(counts[mask].sum()) for k, mask in kinds.items()}
+    return out, int(counts[letters].sum()), int(counts[digits].sum())
+
+
+def _classify_sample(series):
+    codes, uniques = pd.factorize(series)
+    return _classify(np.asarray(uniques, dtype=object), np.bincount(codes, minlength=len(uniques)))
+
+
+def _settled(counts, n):
+    for k in KINDS:
+        low, high = wilson_interval(counts[k], n)
+        if high - low > 2 * TOLERANCE:
+            return False
+    return True
+
+
+def _any_match(values, pattern):
+    """Whether any of ``values`` contains ``pattern``; object columns are checked per distinct value."""
+    if values.dtype == object:
+        values = pd.Series(pd.unique(values.to_numpy()), dtype=object).astype(str)
+    return bool(values.str.contains(pattern, regex=True).any())
+
+
+def _profile(series, seed=0):
+    dtype = str(series.dtype)
+    rows = len(series)
+    missing = int(series.isna().sum())
+    present = rows - missing
+    if dtype == 'category':
+        # categories are the distinct values: classify them exactly
+        counts = series.value_counts(dropna=True)
+        kinds, letters, digits = _classify(np.asarray(counts.index, dtype=object), counts.to_numpy())
+        return ColumnProfile(dtype, rows, missing, kinds, letters, digits, present, True)
+    if not (series.dtype == object or dtype.startswith('string')):
+        kind = 'numeric' if series.dtype.kind in 'iufb' else 'date' if series.dtype.kind == 'M' else 'text'
+        counts = {k: present if k == kind else 0 for k in KINDS}
+        return ColumnProfile(dtype, rows, missing, counts, 0, present if kind == 'numeric' else 0, present, True)
+
+    values = series.dropna() if missing else series
+    rng = np.random.default_rng(seed)
+    for size in SAMPLE_SIZES:
+        if size >= present:
+            break
+        sample = values.iloc[np.sort(rng.choice(present, size=size, replace=False))]
+        kinds, letters, digits = _classify_sample(sample)
+        if _settled(kinds, size):
+            # rare letters or digits can hide outside the sample
+            has_letters = letters > 0 or _any_match(values, '[A-Za-z]')
+            has_digits = digits > 0 or _any_match(values, r'\d')
+            return ColumnProfile(dtype, rows, missing, kinds, letters, digits, size, False, has_letters, has_digits)
+    kinds, letters, digits = _classify_sample(values)
+    return ColumnProfile(dtype, rows, missing, kinds, letters, digits, present, True)
+
+
+def profile_column(series):
+    """The (cached) :class:`ColumnProfile` of ``series``."""
+    return _cache.get_or_compute(series, _profile, tag='profile')
+
+
+def profile_frame(df):
+    return {col: profile_column(df[col]) for col in df.columns}
+
+
+def profile_table(df):
+    """One row per column: dtype, detected kind and value shares."""
+    rows = []
+    for col, profile in profile_frame(df).items():
+        row = {'Column': col, 'Type': profile.dtype, 'Detected': profile.summary(), 'Missing': profile.missing}
+        row.update({k.replace('_', ' ').title(): round(profile.shares[k] * 100, 1) for k in KINDS})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def cache_stats():
+    return {'entries': len(_cache), 'hits': _cache.hits, 'misses': _cache.misses}
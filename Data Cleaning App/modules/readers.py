@@ -0,0 +1,473 @@
+import codecs
+import io
+import itertools
+import json
+import os
+import re
+from contextlib import contextmanager
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+from modules.utils import NA_VALUES
+from modules.writers import EXPORT_FORMATS, write
+
+READ_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.json', '.jsonl', '.ndjson')
+WRITE_FORMATS = ('csv', 'csv.gz', 'csv.zst', 'parquet', 'feather', 'xlsx', 'json')
+EXCEL_CHUNK_ROWS = 50_000
+# Added to the rows when several sheets are read together
+SHEET_COLUMN = 'sheet'
+JSON_CHUNK_ROWS = 50_000
+# Records inspected to list the fields of a JSON file
+JSON_SAMPLE_ROWS = 1_000
+# JSON arrays are decoded from blocks of this many bytes
+JSON_BLOCK_BYTES = 1 << 20
+NDJSON_EXTENSIONS = ('.jsonl', '.ndjson')
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_BOM = b'\xef\xbb\xbf'
+
+
+def read_file(source, name=None, na_values=None):
+    """Read a CSV, Excel or JSON file into a DataFrame.
+
+    ``source`` may be a path, raw bytes or a file-like object; ``name`` is
+    used to pick the format when ``source`` is not a path.
+    """
+    if na_values is None:
+        na_values = NA_VALUES
+    if name is None:
+        name = str(source)
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    name = name.lower()
+    if name.endswith('.csv'):
+        return pd.read_csv(source, na_values=na_values, keep_default_na=True)
+    elif name.endswith('.xlsx'):
+        return read_excel(source, na_values=na_values)
+    elif name.endswith('.xls'):
+        return pd.read_excel(source, na_values=na_values, keep_default_na=True)
+    elif name.endswith(('.json',) + NDJSON_EXTENSIONS):
+        return read_json(source, ndjson=True if name.endswith(NDJSON_EXTENSIONS) else None)
+    raise ValueError(f"Unsupported file type: {name}")
+
+
+def _open_workbook(source):
+    from openpyxl import load_workbook
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    elif hasattr(source, 'seek'):
+        source.seek(0)
+    # read-only mode parses rows as they are iterated instead of building
+    # the whole workbook in memory
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+def _header(values):
+    """Column names like ``pd.read_excel``: blanks become ``Unnamed: i``, repeats get ``.1``, ``.2``..."""
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f'Unnamed: {i}' if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def excel_sheets(source):
+    """``[(sheet name, rows, columns)]`` of an .xlsx workbook, sizes as recorded in the file."""
+    workbook = _open_workbook(source)
+    try:
+        return [(ws.title, ws.max_row, ws.max_column) for ws in workbook.worksheets]
+    finally:
+        workbook.close()
+
+
+def excel_header(source, sheet):
+    """Column names of ``sheet``, read from its first row only."""
+    workbook = _open_workbook(source)
+    try:
+        first = next(workbook[sheet].iter_rows(max_row=1, values_only=True), ())
+        return _header(first)
+    finally:
+        workbook.close()
+
+
+def _read_sheet(ws, columns, na_values, chunk_rows):
+    rows = ws.iter_rows(values_only=True)
+    names = _header(next(rows, ()))
+    positions = [i for i, name in enumerate(names) if columns is None or name in columns]
+    if not positions:
+        return pd.DataFrame()
+    names = [names[i] for i in positions]
+    # only cells up to the last selected column are materialized
+    rows = ws.iter_rows(min_row=2, max_col=positions[-1] + 1, values_only=True)
+    pick = itemgetter(*positions) if len(positions) > 1 else (lambda row: (row[positions[0]],))
+    chunks, chunk = [], []
+    for row in rows:
+        chunk.append(pick(row))
+        if len(chunk) == chunk_rows:
+            chunks.append(pd.DataFrame.from_records(chunk, columns=names))
+            chunk = []
+    if chunk or not chunks:
+        chunks.append(pd.DataFrame.from_records(chunk, columns=names))
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    # formatted but empty rows often trail the data
+    filled = np.flatnonzero(df.notna().any(axis=1).to_numpy())
+    df = df.iloc[:filled[-1] + 1 if len(filled) else 0]
+    tokens = set(na_values)
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        if column.dtype == object:
+            # blank cells and null tokens both become NaN, as in read_csv
+            df.isetitem(i, column.where(column.notna() & ~column.isin(tokens)))
+    return df.infer_objects()
+
+
+def read_excel(source, sheets=None, columns=None, na_values=None, chunk_rows=EXCEL_CHUNK_ROWS):
+    """Read ``sheets`` (default: the first) of an .xlsx workbook in streaming, read-only mode.
+
+    Only ``columns`` (default: all) are kept, and cells equal to one of
+    ``na_values`` become missing. Several sheets are stacked, with a
+    ``sheet`` column naming where each row came from.
+    """
+    if na_values is None:
+        na_values = NA_VALUES
+    workbook = _open_workbook(source)
+    try:
+        names = list(sheets) if sheets else workbook.sheetnames[:1]
+        frames = [_read_sheet(workbook[name], columns, na_values, chunk_rows) for name in names]
+    finally:
+        workbook.close()
+    if len(frames) == 1:
+        return frames[0]
+    for name, frame in zip(names, frames):
+        frame.insert(0, SHEET_COLUMN, name)
+    return pd.concat(frames, ignore_index=True)
+
+
+@contextmanager
+def _binary(source):
+    """A binary file object for a path, raw bytes or an open file; only paths are closed afterwards."""
+    if isinstance(source, bytes):
+        yield io.BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fh:
+            yield fh
+    else:
+        source.seek(0)
+        yield source
+
+
+def _json_lines(fh):
+    first = True
+    for line in fh:
+        if first:
+            line = line.lstrip(_BOM)
+            first = False
+        if line.strip():
+            yield line
+
+
+def _sniff_ndjson(fh):
+    # only a file starting with an object can be NDJSON; checked before
+    # reading a line, as a JSON array may be one very long line
+    head = b''
+    while not head and (block := fh.read(4096)):
+        head = block.lstrip(_BOM).lstrip()
+    if not head.startswith(b'{'):
+        return False
+    fh.seek(0)
+    lines = _json_lines(fh)
+    first = next(lines, b'').strip()
+    if not first.startswith(b'{'):
+        return False
+    try:
+        json.loads(first)
+    except ValueError:
+        # a document spread over several lines
+        return False
+    return next(lines, None) is not None
+
+
+def is_ndjson(source):
+    """Whether ``source`` holds one JSON record per line rather than a single document."""
+    with _binary(source) as fh:
+        return _sniff_ndjson(fh)
+
+
+def _batches(items, size):
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+def _field_tree(fields):
+    """``['a.b', 'c']`` as ``{'a': {'b': None}, 'c': None}``; ``None`` keeps a whole subtree."""
+    if not fields:
+        return None
+    tree = {}
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for part in parts[:-1]:
+            child = node.get(part, {})
+            if child is None:
+                break
+            node[part] = child
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _records_frame(records, tree, prefix=''):
+    """Flatten dict records into dotted columns, one nesting level at a time.
+
+    Each level is built column-wise by ``DataFrame.from_records``; only
+    the fields in ``tree`` are extracted.
+    """
+    if prefix == '':
+        records = [r if isinstance(r, dict) else {'value': r} for r in records]
+    columns = None
+    if tree is not None:
+        present = set().union(*map(dict.keys, records))
+        columns = [key for key in tree if key in present]
+    df = pd.DataFrame.from_records(records, columns=columns)
+    parts = []
+    for key in df.columns:
+        column = df[key]
+        name = f'{prefix}{key}'
+        sub = tree[key] if tree is not None else None
+        if column.dtype != object:
+            if sub is None:
+                parts.append(column.rename(name))
+            continue
+        values = column.tolist()
+        nested = [v if isinstance(v, dict) else {} for v in values]
+        if any(nested):
+            children = _records_frame(nested, sub, f'{name}.')
+            parts.extend(children[col] for col in children.columns)
+        if sub is not None:
+            continue
+        leaves = pd.Series([None if isinstance(v, dict) else json.dumps(v) if isinstance(v, list) else v
+                            for v in values], dtype=object, name=name)
+        if leaves.notna().any() or not any(nested):
+            parts.append(_one_type(leaves).infer_objects())
+    if not parts:
+        return pd.DataFrame(index=df.index)
+    return pd.concat(parts, axis=1)
+
+
+def _one_type(column):
+    # a field holding numbers in some records and text in others becomes
+    # text, and lists are kept as JSON text, so every column has one type
+    if pd.api.types.infer_dtype(column, skipna=True).startswith('mixed'):
+        return column.astype(str).where(column.notna())
+    return column
+
+
+def _schema_type(type_):
+    """``type_`` with timestamps as text and all-null fields left out, or None if nothing is left."""
+    if pa.types.is_null(type_):
+        return None
+    if pa.types.is_timestamp(type_):
+        # read ISO dates as text, like CSV
+        return pa.string()
+    if pa.types.is_struct(type_):
+        fields = [field.with_type(_schema_type(field.type)) for field in type_ if _schema_type(field.type)]
+        return pa.struct(fields) if fields else None
+    if pa.types.is_list(type_):
+        value_type = _schema_type(type_.value_type)
+        return pa.list_(value_type) if value_type is not None else None
+    return type_
+
+
+def _chunk_schema(schema):
+    """An explicit schema for the following chunks, so their columns keep the same types."""
+    return pa.schema([field.with_type(_schema_type(field.type)) for field in schema if _schema_type(field.type)])
+
+
+def _selected(name, fields):
+    return not fields or any(name == field or name.startswith(f'{field}.') for field in fields)
+
+
+def _arrow_frame(block, fields, schema):
+    options = pa_json.ParseOptions(explicit_schema=schema) if schema is not None else None
+    table = pa_json.read_json(pa.BufferReader(block), parse_options=options)
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+    table = table.select([name for name in table.column_names if _selected(name, fields)])
+    for i, field in enumerate(table.schema):
+        if pa.types.is_list(field.type):
+            # lists are kept as JSON text so the column stays one type
+            text = [None if v is None else json.dumps(v) for v in table.column(i).to_pylist()]
+            table = table.set_column(i, field.name, pa.array(text, pa.string()))
+    return table.to_pandas()
+
+
+def _ndjson_frame(lines, fields, tree, schema):
+    """``(frame, schema)`` for a batch of NDJSON lines.
+
+    Arrow's JSON reader parses and flattens the batch without building
+    Python objects for every value; batches it cannot type (e.g. a field
+    that is a number in one record and text in another) go through
+    :mod:`json` instead.
+    """
+    block = b''.join(lines)
+    try:
+        if schema is None:
+            schema = _chunk_schema(pa_json.read_json(pa.BufferReader(block)).schema)
+        return _arrow_frame(block, fields, schema), schema
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return _records_frame(json.loads(b'[' + b','.join(lines) + b']'), tree), schema
+
+
+def _text_blocks(fh, size):
+    """The UTF-8 text of ``fh``, decoded ``size`` bytes at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while block := fh.read(size):
+        yield decoder.decode(block)
+    yield decoder.decode(b'', final=True)
+
+
+def _array_records(blocks):
+    """Records of a top-level JSON array, decoded one at a time from text ``blocks``.
+
+    Only the unread rest of the current block is kept, plus whatever a
+    record spanning several blocks needs.
+    """
+    decoder = json.JSONDecoder()
+    blocks = iter(blocks)
+    text, pos = '', 0
+
+    def more():
+        nonlocal text, pos
+        block = next(blocks, None)
+        if block is None:
+            return False
+        text, pos = text[pos:] + block, 0
+        return True
+
+    def next_char():
+        # the next non-blank character, reading blocks as needed
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos < len(text):
+                return text[pos]
+            if not more():
+                raise ValueError("Unexpected end of JSON array")
+
+    if next_char() != '[':
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if next_char() == ']':
+        return
+    count = 0
+    while True:
+        while True:
+            try:
+                record, end = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                # a record cut off at the end of the block
+                if not more():
+                    raise
+                continue
+            # a number at the end of the block may go on in the next one
+            if end < len(text) or not more():
+                break
+        yield record
+        count += 1
+        pos = end
+        char = next_char()
+        if char == ',':
+            pos += 1
+            next_char()
+        elif char == ']':
+            return
+        else:
+            raise ValueError(f"Expected ',' or ']' after record {count}")
+
+
+def iter_json_chunks(source, fields=None, chunk_rows=JSON_CHUNK_ROWS, ndjson=None):
+    """Yield DataFrames of up to ``chunk_rows`` records from a JSON or NDJSON file.
+
+    Nested objects are flattened into dotted columns (``user.name``) as
+    each chunk is built, and lists are kept as JSON text. With ``fields``,
+    only those dotted paths (or whole subtrees, e.g. ``user``) become
+    columns. NDJSON is detected unless ``ndjson`` says otherwise; it is
+    read line by line and parsed by Arrow, so only one chunk is in memory
+    and unselected fields never become Python objects. JSON arrays are
+    decoded record by record from blocks of ``JSON_BLOCK_BYTES``, so they
+    are not held in memory either. The first chunk's types are kept for
+    the rest.
+    """
+    tree = _field_tree(fields)
+    with _binary(source) as fh:
+        if ndjson is None:
+            ndjson = _sniff_ndjson(fh)
+            fh.seek(0)
+        if ndjson:
+            schema = None
+            for lines in _batches(_json_lines(fh), chunk_rows):
+                df, schema = _ndjson_frame(lines, fields, tree, schema)
+                yield df
+            return
+        blocks = _text_blocks(fh, JSON_BLOCK_BYTES)
+        head = ''
+        for block in blocks:
+            head += block
+            if head.strip():
+                break
+        if not head.strip():
+            return
+        if not head.lstrip().startswith('['):
+            # a single object, such as pandas' column-oriented JSON, is read whole
+            df = pd.read_json(io.StringIO(head + ''.join(blocks)))
+            yield df[[col for col in df.columns if col in fields]] if fields else df
+            return
+        for records in _batches(_array_records(itertools.chain([head], blocks)), chunk_rows):
+            yield _records_frame(records, tree)
+
+
+def read_json(source, fields=None, chunk_rows=JSON_CHUNK_ROWS, ndjson=None):
+    """Read a JSON or NDJSON file chunk by chunk into one flattened DataFrame."""
+    frames = list(iter_json_chunks(source, fields=fields, chunk_rows=chunk_rows, ndjson=ndjson))
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    # a field that was empty in the first chunks is typed by the later ones,
+    # and one typed differently by different chunks becomes text
+    df = pd.concat(frames, ignore_index=True).infer_objects()
+    for i in range(df.shape[1]):
+        if df.iloc[:, i].dtype == object:
+            df.isetitem(i, _one_type(df.iloc[:, i]))
+    return df
+
+
+def json_fields(source, sample_rows=JSON_SAMPLE_ROWS, ndjson=None):
+    """Flattened field names found in the first ``sample_rows`` records."""
+    sample = next(iter_json_chunks(source, chunk_rows=sample_rows, ndjson=ndjson), pd.DataFrame())
+    return [str(col) for col in sample.columns]
+
+
+def write_file(df, path, fmt=None):
+    """Write ``df`` to ``path`` in ``fmt`` (inferred from the extension if omitted)."""
+    if fmt is None:
+        fmt = next((f for f in WRITE_FORMATS if str(path).lower().endswith('.' + f)), None)
+    if fmt in EXPORT_FORMATS:
+        # written in chunks, see modules.writers
+        with open(path, 'wb') as fh:
+            write(df, fh, fmt)
+    elif fmt == 'json':
+        df.to_json(path, orient='records')
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    return path
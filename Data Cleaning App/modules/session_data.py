@@ -0,0 +1,244 @@
+"""Per-session datasets under one process-wide memory budget.
+
+Each session keeps its working frame, original and undo history in a
+:class:`SessionData` stored in its ``st.session_state``. The
+:class:`SessionDataManager` tracks the bytes every session holds. Once
+the total passes ``DATA_CLEAN_SESSION_BUDGET_MB``, it spills the least
+recently used sessions to the spill directory: their history is written
+to disk and their frames are dropped. Sessions idle for longer than
+``DATA_CLEAN_SESSION_IDLE_SECONDS`` are spilled regardless. A spilled
+session is reloaded the next time it reads its data.
+
+The manager holds sessions weakly. When Streamlit discards a closed
+session, its spill files are deleted with it. Spill directories left by
+earlier processes are removed when the manager starts.
+"""
+import itertools
+import os
+import shutil
+import threading
+import time
+import weakref
+
+from modules.logger import get_logger
+from modules.metrics import SESSION_IDLE_SECONDS, container_limit, get_registry, register
+from modules.instrumentation import profile
+from modules.streaming import get_workdir
+
+logger = get_logger('session_data')
+
+_limit = container_limit()
+# Half of the container's memory by default, leaving room for parsing and operations
+DEFAULT_BUDGET_BYTES = int(float(os.environ.get('DATA_CLEAN_SESSION_BUDGET_MB', '0')) * 1024**2) or (
+    _limit // 2 if _limit else 4096 * 1024**2)
+
+
+class SessionData:
+    """One session's working frame, original and history; reloads itself after a spill."""
+
+    def __init__(self, manager, spill_path, session_id=None):
+        self.session_id = session_id
+        self.spill_path = spill_path
+        self._manager = manager
+        self._lock = threading.RLock()
+        self._df = None
+        self._df_original = None
+        self._history = None
+        self._spilled = False
+        self.last_used = time.monotonic()
+
+    def _use(self):
+        self.last_used = time.monotonic()
+        if self._spilled:
+            with profile('reload_session') as step:
+                self._df = step.output(self._history.current())
+                self._df_original = self._history.original()
+            self._spilled = False
+            self._manager.reloads += 1
+
+    @property
+    def df(self):
+        with self._lock:
+            self._use()
+            return self._df
+
+    @df.setter
+    def df(self, value):
+        with self._lock:
+            self._use()
+            self._df = value
+
+    @property
+    def df_original(self):
+        with self._lock:
+            self._use()
+            return self._df_original
+
+    @df_original.setter
+    def df_original(self, value):
+        with self._lock:
+            self._use()
+            self._df_original = value
+
+    @property
+    def history(self):
+        with self._lock:
+            self._use()
+            return self._history
+
+    @history.setter
+    def history(self, value):
+        with self._lock:
+            self._use()
+            self._history = value
+
+    def commit(self, df, label):
+        """Make ``df`` the working frame, recording a history version if it changed.
+
+        The history is only changed under the session's lock, so another
+        session's :meth:`SessionDataManager.enforce` cannot spill it halfway.
+        """
+        with self._lock:
+            self._use()
+            if self._history is not None and df is not None:
+                self._history.commit(df, label)
+            self._df = df
+
+    def undo(self):
+        with self._lock:
+            self._use()
+            self._df = self._history.undo()
+            return self._df
+
+    def redo(self):
+        with self._lock:
+            self._use()
+            self._df = self._history.redo()
+            return self._df
+
+    @property
+    def spilled(self):
+        return self._spilled
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory; the working frame and original share the history's buffers."""
+        history = self._history
+        return history.nbytes if history is not None and not self._spilled else 0
+
+    def spill(self, directory):
+        """Move the datasets to ``directory``; ``False`` when there is nothing that can be spilled."""
+        with self._lock:
+            history = self._history
+            # a working frame outside the history (a chunked dataset) stays where it is
+            if self._spilled or history is None or self._df is not history.current():
+                return False
+            with profile('spill_session', self._df):
+                history.spill(directory)
+            self._df = self._df_original = None
+            self._spilled = True
+            return True
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SessionDataManager:
+    """Process-wide registry of :class:`SessionData` enforcing a byte budget."""
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES, idle_seconds=SESSION_IDLE_SECONDS, spill_root=None):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.spill_root = spill_root or os.path.join(get_workdir(), 'spill')
+        self.spill_dir = os.path.join(self.spill_root, str(os.getpid()))
+        self._sessions = weakref.WeakValueDictionary()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.spills = 0
+        self.reloads = 0
+        self._remove_stale()
+
+    def _remove_stale(self):
+        if not os.path.isdir(self.spill_root):
+            return
+        for name in os.listdir(self.spill_root):
+            # this process's own directory can only be left over from an earlier process with its pid
+            if not name.isdigit() or int(name) == os.getpid() or not _alive(int(name)):
+                shutil.rmtree(os.path.join(self.spill_root, name), ignore_errors=True)
+                logger.info(f"Removed stale spill directory {name}")
+
+    def create(self, session_id=None):
+        """A new, empty :class:`SessionData`; its spill files are deleted when it is discarded."""
+        token = next(self._ids)
+        data = SessionData(self, os.path.join(self.spill_dir, str(token)), session_id)
+        self._sessions[token] = data
+        weakref.finalize(data, shutil.rmtree, data.spill_path, True)
+        return data
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    @property
+    def nbytes(self):
+        return sum(data.nbytes for data in self.sessions())
+
+    def enforce(self, keep=None):
+        """Spill idle sessions, then the least recently used ones until the total fits the budget.
+
+        ``keep``, the session whose script is running, is never spilled.
+        """
+        with self._lock:
+            sessions = self.sessions()
+            total = sum(data.nbytes for data in sessions)
+            now = time.monotonic()
+            for data in sorted(sessions, key=lambda d: d.last_used):
+                idle = now - data.last_used > self.idle_seconds
+                if not idle and total <= self.max_bytes:
+                    break
+                held = data.nbytes
+                if data is keep or not held:
+                    continue
+                try:
+                    spilled = data.spill(data.spill_path)
+                except OSError as e:
+                    logger.warning(f"Could not spill a session to {data.spill_path}: {e}")
+                    continue
+                if spilled:
+                    total -= held
+                    self.spills += 1
+                    get_registry().set_session_bytes(data.session_id, 0)
+                    logger.info(f"Spilled {held / 1024**2:.1f} MB of {'an idle' if idle else 'a'} session to disk "
+                                f"({total / 1024**2:.1f} MB of {self.max_bytes / 1024**2:.0f} MB held)")
+            return total
+
+    def stats(self):
+        """Counts for :mod:`modules.metrics`."""
+        sessions = self.sessions()
+        return {
+            'bytes': sum(data.nbytes for data in sessions),
+            'budget_bytes': self.max_bytes,
+            'sessions': len(sessions),
+            'spilled_sessions': sum(data.spilled for data in sessions),
+            'spills': self.spills,
+            'reloads': self.reloads,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionDataManager()
+            register('session_data', _manager.stats)
+    return _manager
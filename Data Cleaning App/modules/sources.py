@@ -0,0 +1,126 @@
+"""Server-side datasets from allow-listed directories.
+
+Directories listed in ``DATA_CLEAN_DATA_DIR`` (separated by ``os.pathsep``)
+can be browsed from the Load Data tab, so files mounted into the
+container are opened where they are instead of passing through the
+browser. Paths are resolved, symlinks included, and must stay inside one
+of those directories.
+
+Arrow IPC (Feather) files are memory-mapped. Uncompressed numeric
+columns without nulls that are stored in a single record batch are used
+in place, with no copy and no read until their pages are touched; other
+columns are copied once, straight from the mapped pages. Parquet files
+are memory-mapped too, and only the selected columns are decoded.
+"""
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules.logger import get_logger
+from modules.readers import READ_EXTENSIONS
+
+logger = get_logger('sources')
+
+DATA_DIR_ENV = 'DATA_CLEAN_DATA_DIR'
+ARROW_EXTENSIONS = ('.parquet', '.feather', '.arrow', '.ipc')
+SOURCE_EXTENSIONS = READ_EXTENSIONS + ARROW_EXTENSIONS
+# Directories with more files than this are listed only in part
+MAX_LISTED_FILES = 1_000
+
+
+def data_dirs():
+    """The allow-listed data directories that exist, as real paths."""
+    value = os.environ.get(DATA_DIR_ENV, '')
+    dirs = [os.path.realpath(d) for d in value.split(os.pathsep) if d.strip()]
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def resolve(path):
+    """Real path of ``path``; raises ``PermissionError`` when it is outside every data directory."""
+    real = os.path.realpath(path)
+    for root in data_dirs():
+        if os.path.commonpath([root, real]) == root:
+            return real
+    raise PermissionError(f"{path} is not inside an allowed data directory")
+
+
+def list_files(max_files=MAX_LISTED_FILES):
+    """``[(label, path, size in bytes)]`` of the readable files in the data directories."""
+    files = []
+    for root in data_dirs():
+        for dirpath, dirnames, filenames in os.walk(root, followlinks=False):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for name in sorted(filenames):
+                if name.startswith('.') or not name.lower().endswith(SOURCE_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    path = resolve(path)
+                    size = os.path.getsize(path)
+                except (OSError, PermissionError):
+                    # broken links and links that leave the data directory
+                    continue
+                label = os.path.join(os.path.basename(root), os.path.relpath(os.path.join(dirpath, name), root))
+                files.append((label, path, size))
+                if len(files) >= max_files:
+                    logger.info(f"Listing stopped at {max_files} files")
+                    return files
+    return files
+
+
+class ServerFile:
+    """A file in a data directory, with the parts of an uploaded file the loader uses."""
+
+    def __init__(self, path):
+        self.path = resolve(path)
+        stat = os.stat(self.path)
+        self.name = os.path.basename(self.path)
+        self.size = stat.st_size
+        # changes when the file is replaced or rewritten
+        self.file_id = f'{self.path}:{stat.st_mtime_ns}:{stat.st_size}'
+
+    def getvalue(self):
+        with open(self.path, 'rb') as fh:
+            return fh.read()
+
+
+def _is_parquet(path):
+    return path.lower().endswith('.parquet')
+
+
+def _ipc_reader(path):
+    source = pa.memory_map(path, 'r')
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        # the streaming IPC format has no footer
+        return pa.ipc.open_stream(pa.memory_map(path, 'r'))
+
+
+def arrow_schema(path):
+    """``(schema, rows)`` of a Parquet or Arrow IPC file, read from its metadata only."""
+    path = resolve(path)
+    if _is_parquet(path):
+        metadata = pq.read_metadata(path)
+        return metadata.schema.to_arrow_schema(), metadata.num_rows
+    reader = _ipc_reader(path)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        # batches are memory-mapped, so counting rows reads no data
+        return reader.schema, sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return reader.schema, None
+
+
+def read_arrow(path, columns=None):
+    """Read a Parquet or Arrow IPC file through a memory map, keeping only ``columns``."""
+    path = resolve(path)
+    if _is_parquet(path):
+        table = pq.read_table(path, columns=list(columns) if columns else None, memory_map=True)
+    else:
+        table = _ipc_reader(path).read_all()
+        if columns:
+            table = table.select(list(columns))
+    # split_blocks keeps columns apart instead of copying them into 2-D blocks
+    df = table.to_pandas(split_blocks=True)
+    logger.info(f"Read {len(df)} rows x {df.shape[1]} columns from {path}")
+    return df
@@ -0,0 +1,290 @@
+"""Per-column statistics, computed once per column version and shared.
+
+:func:`column_stats` returns a :class:`ColumnStats` for a column from the
+per-buffer :class:`~modules.column_cache.ColumnCache`. The EDA, missing
+values and outlier tabs all read from it, and an operation that replaced
+one column only costs new statistics for that column.
+
+``ColumnStats`` is also mergeable: :meth:`ColumnStats.update` folds in one
+chunk at a time (count, nulls, min/max, mean and variance via Chan's
+parallel formula, a KLL-style quantile sketch and a KMV distinct-count
+sketch), which is what chunked, on-disk datasets use. In-memory columns
+get exact quantiles instead, computed once per requested level.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from modules.column_cache import ColumnCache
+
+DESCRIBE_QUANTILES = (0.25, 0.5, 0.75)
+
+_cache = ColumnCache()
+
+
+class QuantileSketch:
+    """Mergeable approximate quantiles (a simplified KLL sketch).
+
+    Level ``i`` holds items of weight ``2**i``. When a level outgrows its
+    capacity it is sorted and every other item, starting at a random
+    offset, moves up a level. With ``k=200`` the rank error is around 1%.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(8, int(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item out stays behind so total weight is preserved
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q):
+        if not self.n:
+            return np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** i) for i, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[order][min(idx, len(items) - 1)])
+
+
+class DistinctSketch:
+    """K-minimum-values distinct count estimate; exact below ``k`` values."""
+
+    def __init__(self, k=1024):
+        self.k = k
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.saturated = False
+
+    def update(self, values):
+        if not len(values):
+            return self
+        hashes = pd.unique(pd.util.hash_array(np.asarray(values)))
+        if len(hashes) > self.k:
+            hashes = np.partition(hashes, self.k - 1)[:self.k]
+            self.saturated = True
+        return self._add(hashes)
+
+    def merge(self, other):
+        self.saturated |= other.saturated
+        return self._add(other.hashes)
+
+    def _add(self, hashes):
+        hashes = np.union1d(self.hashes, hashes)
+        if len(hashes) > self.k:
+            hashes = hashes[:self.k]
+            self.saturated = True
+        self.hashes = hashes
+        return self
+
+    def estimate(self):
+        if not self.saturated:
+            return len(self.hashes)
+        return int((self.k - 1) / (float(self.hashes[-1]) / 2.0 ** 64))
+
+
+def is_numeric(series):
+    return series.dtype.kind in 'iuf'
+
+
+def _numeric_values(series):
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+class ColumnStats:
+    """Count, nulls, min/max, mean/variance and sketches for one column."""
+
+    def __init__(self, sketches=True):
+        # sketches=False (in-memory columns): exact quantiles and distinct
+        # counts are filled in on demand by quantiles() and distinct_count()
+        self.count = 0
+        self.nulls = 0
+        self.numeric = None
+        self.min = np.nan
+        self.max = np.nan
+        self.mean = np.nan
+        self.m2 = 0.0
+        self.sketch = QuantileSketch() if sketches else None
+        self.distinct_sketch = DistinctSketch() if sketches else None
+        self.exact_quantiles = {}
+        self.exact_distinct = None
+
+    @property
+    def rows(self):
+        return self.count + self.nulls
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var))
+
+    @property
+    def distinct(self):
+        if self.exact_distinct is not None:
+            return self.exact_distinct
+        return self.distinct_sketch.estimate() if self.distinct_sketch is not None else None
+
+    def update(self, series):
+        """Fold one chunk of a column into the running statistics."""
+        other = ColumnStats._from_values(series, sketches=self.sketch is not None)
+        return self.merge(other)
+
+    def merge(self, other):
+        if self.numeric is None:
+            self.numeric = other.numeric
+        else:
+            self.numeric = self.numeric and other.numeric
+        if other.count:
+            if self.count:
+                n = self.count + other.count
+                delta = other.mean - self.mean
+                self.m2 += other.m2 + delta * delta * self.count * other.count / n
+                self.mean += delta * other.count / n
+                self.min = min(self.min, other.min)
+                self.max = max(self.max, other.max)
+            else:
+                self.mean, self.m2, self.min, self.max = other.mean, other.m2, other.min, other.max
+        self.count += other.count
+        self.nulls += other.nulls
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+            self.distinct_sketch.merge(other.distinct_sketch)
+        self.exact_quantiles = {}
+        self.exact_distinct = None
+        return self
+
+    def quantile(self, q):
+        """Exact when computed from an in-memory column, else from the sketch."""
+        if q in self.exact_quantiles:
+            return self.exact_quantiles[q]
+        return self.sketch.quantile(q) if self.sketch is not None else np.nan
+
+    @classmethod
+    def _from_values(cls, series, sketches=True):
+        stats = cls(sketches=sketches)
+        present = series.dropna()
+        stats.nulls = len(series) - len(present)
+        stats.count = len(present)
+        stats.numeric = is_numeric(series)
+        if sketches:
+            stats.distinct_sketch.update(present.to_numpy())
+        if stats.numeric and len(present):
+            values = _numeric_values(present)
+            stats.min = float(values.min())
+            stats.max = float(values.max())
+            stats.mean = float(values.mean())
+            stats.m2 = float(((values - stats.mean) ** 2).sum())
+            if stats.sketch is not None:
+                stats.sketch.update(values)
+        return stats
+
+    @classmethod
+    def from_series(cls, series):
+        return cls._from_values(series, sketches=False)
+
+
+def column_stats(series):
+    """The (cached) :class:`ColumnStats` of ``series``."""
+    return _cache.get_or_compute(series, ColumnStats.from_series, tag='stats')
+
+
+def quantiles(series, qs):
+    """Exact quantiles of a numeric column, each computed once per column version."""
+    stats = column_stats(series)
+    todo = [q for q in qs if q not in stats.exact_quantiles]
+    if todo:
+        values = _numeric_values(series) if is_numeric(series) else np.empty(0)
+        values = values[~np.isnan(values)]
+        found = np.quantile(values, todo) if len(values) else [np.nan] * len(todo)
+        stats.exact_quantiles.update({q: float(v) for q, v in zip(todo, found)})
+    return [stats.exact_quantiles[q] for q in qs]
+
+
+def frame_quantiles(df, columns, qs):
+    """:func:`quantiles` of many numeric columns as a ``columns x qs`` frame.
+
+    Columns missing any of the levels are computed together in one
+    vectorized pass; the rest come from the cache.
+    """
+    columns = list(columns)
+    todo = [col for col in columns if any(q not in column_stats(df[col]).exact_quantiles for q in qs)]
+    if todo and len(df):
+        values = np.column_stack([_numeric_values(df[col]) for col in todo])
+        with warnings.catch_warnings():
+            # all-missing columns give NaN, which is what we want
+            warnings.simplefilter('ignore', RuntimeWarning)
+            found = np.nanquantile(values, list(qs), axis=0)
+        for j, col in enumerate(todo):
+            column_stats(df[col]).exact_quantiles.update({q: float(v) for q, v in zip(qs, found[:, j])})
+    return pd.DataFrame([quantiles(df[col], qs) for col in columns], index=columns, columns=list(qs))
+
+
+def distinct_count(series):
+    """Number of distinct non-missing values, counted once per column version."""
+    stats = column_stats(series)
+    if stats.exact_distinct is None:
+        stats.exact_distinct = int(series.nunique(dropna=True))
+    return stats.exact_distinct
+
+
+def null_counts(df):
+    return pd.Series({col: column_stats(df[col]).nulls for col in df.columns}, dtype='int64')
+
+
+def describe(df):
+    """``df.describe().T`` for numeric columns, served from the cache."""
+    rows = {}
+    for col in df.columns:
+        if not is_numeric(df[col]):
+            continue
+        stats = column_stats(df[col])
+        q1, median, q3 = quantiles(df[col], DESCRIBE_QUANTILES)
+        rows[col] = {'count': float(stats.count), 'mean': stats.mean, 'std': stats.std, 'min': stats.min,
+                     '25%': q1, '50%': median, '75%': q3, 'max': stats.max}
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+
+def cache_stats():
+    return {'entries': len(_cache), 'hits': _cache.hits, 'misses': _cache.misses}
@@ -0,0 +1,272 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from modules.logger import get_logger
+from modules.readers import JSON_CHUNK_ROWS, iter_json_chunks
+from modules.stats import ColumnStats, is_numeric
+from modules.utils import NA_VALUES
+
+logger = get_logger('streaming')
+
+DEFAULT_CHUNK_ROWS = 100_000
+# Row hashes are spread over this many bucket files so that duplicate
+# counting never needs more than one bucket in memory at a time.
+HASH_BUCKETS = 64
+
+
+def get_workdir():
+    """Return the directory used for on-disk working datasets."""
+    base = os.environ.get('DATA_CLEAN_WORKDIR') or tempfile.gettempdir()
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def get_export_dir():
+    """Return the directory exports of chunked datasets are written to."""
+    path = os.environ.get('DATA_CLEAN_EXPORT_DIR') or os.path.join(get_workdir(), 'exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _merge_kinds(kinds):
+    """Pick one dtype that can hold every chunk's inferred dtype."""
+    kinds = set(kinds)
+    if not kinds:
+        return 'float64'
+    if len(kinds) == 1:
+        kind = kinds.pop()
+        return {'b': 'bool', 'i': 'int64', 'u': 'int64', 'f': 'float64', 'M': 'datetime64[ns]'}.get(kind, 'object')
+    if kinds <= {'b', 'i', 'u'}:
+        return 'int64'
+    if kinds <= {'b', 'i', 'u', 'f'}:
+        return 'float64'
+    return 'object'
+
+
+def _hash_rows(chunk):
+    """64-bit row hashes that do not depend on the int/float split between chunks."""
+    hashable = chunk.copy(deep=False)
+    for col in hashable.columns:
+        if hashable[col].dtype.kind in ('b', 'i', 'u'):
+            hashable[col] = hashable[col].astype('float64')
+    return pd.util.hash_pandas_object(hashable, index=False).values
+
+
+class ColumnSummary:
+    """Running per-column summary, updated one chunk at a time.
+
+    Tracks row count, null counts, dtype guesses, mergeable statistics of
+    numeric columns (:class:`~modules.stats.ColumnStats` with quantile
+    sketches) and the number of exact duplicate rows. Row hashes are
+    appended to bucket files on disk and only counted in :meth:`finalize`,
+    so memory stays bounded by the chunk size.
+    """
+
+    def __init__(self, hash_dir=None):
+        self.rows = 0
+        self.columns = []
+        self.null_counts = {}
+        self.memory_bytes = 0
+        self.duplicate_rows = None
+        self.stats = {}
+        self._kinds = {}
+        self._hash_dir = hash_dir
+
+    def update(self, chunk):
+        for col in chunk.columns:
+            if col not in self.null_counts:
+                # a column first seen in a later chunk (e.g. a JSON field)
+                # was missing from every earlier row
+                self.columns.append(col)
+                self.null_counts[col] = self.rows
+                self._kinds[col] = set()
+        chunk = chunk.reindex(columns=self.columns)
+        self.rows += len(chunk)
+        self.memory_bytes += int(chunk.memory_usage(deep=True).sum())
+        nulls = chunk.isna().sum()
+        for col in self.columns:
+            self.null_counts[col] += int(nulls[col])
+            # an all-null chunk says nothing about the column type
+            if nulls[col] < len(chunk):
+                self._kinds[col].add(chunk[col].dtype.kind)
+            if is_numeric(chunk[col]):
+                self.stats.setdefault(col, ColumnStats()).update(chunk[col])
+        if self._hash_dir is not None and len(chunk):
+            hashes = _hash_rows(chunk)
+            buckets = hashes % HASH_BUCKETS
+            for b in np.unique(buckets):
+                with open(os.path.join(self._hash_dir, f'{b:02d}.bin'), 'ab') as fh:
+                    hashes[buckets == b].tofile(fh)
+
+    @property
+    def dtypes(self):
+        dtypes = {}
+        for col in self.columns:
+            dtype = _merge_kinds(self._kinds[col])
+            # nulls force the same upcasts pandas applies to a single frame
+            if self.null_counts[col]:
+                dtype = {'int64': 'float64', 'bool': 'object'}.get(dtype, dtype)
+            dtypes[col] = dtype
+        return dtypes
+
+    def numeric_stats(self):
+        """Running statistics of the columns whose every chunk was numeric."""
+        dtypes = self.dtypes
+        return {col: stats for col, stats in self.stats.items() if dtypes[col] in ('int64', 'float64')}
+
+    def finalize(self):
+        """Count duplicate rows from the hash buckets and remove them."""
+        if self._hash_dir is None or not os.path.isdir(self._hash_dir):
+            return self
+        duplicates = 0
+        for name in sorted(os.listdir(self._hash_dir)):
+            path = os.path.join(self._hash_dir, name)
+            hashes = np.fromfile(path, dtype=np.uint64)
+            duplicates += len(hashes) - len(np.unique(hashes))
+            os.remove(path)
+        shutil.rmtree(self._hash_dir, ignore_errors=True)
+        self._hash_dir = None
+        self.duplicate_rows = int(duplicates)
+        return self
+
+    def to_frame(self):
+        dtypes = self.dtypes
+        return pd.DataFrame({
+            'Column': self.columns,
+            'Type': [dtypes[c] for c in self.columns],
+            'Missing Count': [self.null_counts[c] for c in self.columns],
+            'Missing %': [round(self.null_counts[c] / self.rows * 100, 2) if self.rows else 0.0 for c in self.columns],
+        })
+
+
+class ChunkedDataset:
+    """A working dataset stored on disk as a directory of Parquet parts.
+
+    Parts are written as they are read, each with its own inferred schema;
+    :meth:`iter_chunks` casts every part to the dtypes in the summary so
+    callers always see consistent columns.
+    """
+
+    def __init__(self, path, summary, parts):
+        self.path = path
+        self.summary = summary
+        self.parts = parts
+
+    @property
+    def shape(self):
+        return (self.summary.rows, len(self.summary.columns))
+
+    @property
+    def disk_bytes(self):
+        return sum(os.path.getsize(p) for p in self.parts if os.path.exists(p))
+
+    def iter_chunks(self, columns=None):
+        dtypes = self.summary.dtypes
+        wanted = self.summary.columns if columns is None else list(columns)
+        for part in self.parts:
+            chunk = pd.read_parquet(part, columns=columns)
+            # parts written before a column first appeared lack it
+            if list(chunk.columns) != wanted:
+                chunk = chunk.reindex(columns=wanted)
+            for col in chunk.columns:
+                target = dtypes[col]
+                if str(chunk[col].dtype) != target:
+                    try:
+                        chunk[col] = chunk[col].astype(target)
+                    except (TypeError, ValueError):
+                        chunk[col] = chunk[col].astype('object')
+            yield chunk
+
+    def head(self, n=100):
+        frames = []
+        remaining = n
+        for chunk in self.iter_chunks():
+            frames.append(chunk.head(remaining))
+            remaining -= len(frames[-1])
+            if remaining <= 0:
+                break
+        if not frames:
+            return pd.DataFrame(columns=self.summary.columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def map_chunks(self, func):
+        """Apply ``func`` to every chunk and return the result as a new dataset."""
+        writer = _DatasetWriter()
+        try:
+            for chunk in self.iter_chunks():
+                writer.write(func(chunk))
+        except Exception:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def to_pandas(self):
+        frames = list(self.iter_chunks())
+        if not frames:
+            return pd.DataFrame(columns=self.summary.columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class _DatasetWriter:
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix='dataset-', dir=get_workdir())
+        hash_dir = os.path.join(self.path, '_hashes')
+        os.makedirs(hash_dir)
+        self.summary = ColumnSummary(hash_dir=hash_dir)
+        self.parts = []
+
+    def write(self, chunk):
+        part = os.path.join(self.path, f'part-{len(self.parts):05d}.parquet')
+        chunk.to_parquet(part, index=False)
+        self.parts.append(part)
+        self.summary.update(chunk)
+
+    def close(self):
+        self.summary.finalize()
+        return ChunkedDataset(self.path, self.summary, self.parts)
+
+    def abort(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def stream_csv(source, chunk_rows=DEFAULT_CHUNK_ROWS, na_values=None, progress=None):
+    """Read a CSV in bounded chunks into an on-disk :class:`ChunkedDataset`.
+
+    ``source`` may be a path or a file-like object. ``progress`` is an
+    optional callback receiving the number of rows read so far.
+    """
+    if na_values is None:
+        na_values = NA_VALUES
+    return _stream(lambda: pd.read_csv(source, na_values=na_values, keep_default_na=True, chunksize=chunk_rows),
+                   progress)
+
+
+def stream_json(source, fields=None, chunk_rows=JSON_CHUNK_ROWS, progress=None):
+    """Read a JSON or NDJSON file in bounded chunks into an on-disk :class:`ChunkedDataset`.
+
+    Nested records are flattened and ``fields`` selected as in
+    :func:`modules.readers.iter_json_chunks`.
+    """
+    return _stream(lambda: iter_json_chunks(source, fields=fields, chunk_rows=chunk_rows), progress)
+
+
+def _stream(chunks, progress):
+    writer = _DatasetWriter()
+    try:
+        for chunk in chunks():
+            writer.write(chunk)
+            if progress is not None:
+                progress(writer.summary.rows)
+    except Exception:
+        writer.abort()
+        raise
+    dataset = writer.close()
+    logger.info(f"Streamed {dataset.summary.rows} rows into {len(dataset.parts)} parts at {dataset.path}")
+    return dataset
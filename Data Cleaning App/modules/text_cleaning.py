@@ -1,91 +1,127 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from .utils import text_to_number
+from . import cleaning
+from modules.preview import preview_dataframe
+from modules.profiling import profile_column
 
-def handle_text_encoded_values(df):
+def handle_text_encoded_values(df, plan=None):
     st.subheader("🔤 Handle Text-Encoded Values")
     
-    text_to_num = {
-        'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4,
-        'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
-        'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13,
-        'fourteen': 14, 'fifteen': 15, 'sixteen': 16, 'seventeen': 17,
-        'eighteen': 18, 'nineteen': 19, 'twenty': 20, 'thirty': 30,
-        'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70,
-        'eighty': 80, 'ninety': 90, 'hundred': 100
-    }
-    
-    mixed_cols = []
-    for col in df.select_dtypes(include=['object']).columns:
-        values = df[col].astype(str).str.lower()
-        if values.str.contains(r'[a-z]').any() and (values.str.contains(r'\d').any() or df[col].isnull().any()):
-            mixed_cols.append(col)
+    mixed_cols = cleaning.find_mixed_columns(df)
     
     if mixed_cols:
         st.info(f"Detected mixed columns: {', '.join(mixed_cols)}")
         col_to_fix = st.selectbox("Select column", mixed_cols, key="text_encoded_col")
+        st.caption(f"Detected: {profile_column(df[col_to_fix]).summary()}")
         
         # For interactive use we wait for the button. When running tests or
         # in non-interactive environments (pytest), perform automatic conversion.
         import sys
         auto_mode = 'pytest' in sys.modules
 
-        if auto_mode or st.button("Convert", key="convert_text"):
-            converted = 0
-            for idx, val in df[col_to_fix].items():
-                if pd.isna(val):
-                    continue
-                str_val = str(val).lower().strip()
-                # Use utils.text_to_number for conversion
-                num = text_to_number(str_val)
-                if num is not None:
-                    df.at[idx, col_to_fix] = num
-                    converted += 1
+        if plan is not None and not auto_mode:
+            if st.button("Queue conversion", key="convert_text"):
+                plan.add('convert_text_numbers', [col_to_fix])
+                st.info(f"Queued: {plan.steps[-1].describe()}")
+        elif auto_mode or st.button("Convert", key="convert_text"):
+            result = cleaning.convert_text_numbers(df, col_to_fix)
+            # values that were numbers already are not counted
+            converted = cleaning.converted_text_count(df[col_to_fix], result[col_to_fix]) if result is not df else 0
             
             if converted > 0:
-                df[col_to_fix] = pd.to_numeric(df[col_to_fix], errors='coerce')
+                df = result
                 st.success(f"✅ Converted {converted} values")
                 st.subheader("📋 Updated Dataset:")
-                st.dataframe(df, use_container_width=True)
+                preview_dataframe(df, key="text_encoded_preview")
     else:
         st.success("✅ No mixed columns found")
     
     return df
 
-def clean_text_values(df):
+def _apply_or_queue(df, plan, op, columns, message, **params):
+    # With a plan the step is only recorded; it runs, fused with its
+    # neighbours, when the plan is executed.
+    if plan is not None:
+        plan.add(op, columns, **params)
+        st.info(f"Queued: {plan.steps[-1].describe()}")
+        return df
+    df = cleaning.apply_to_columns(df, cleaning.COLUMN_OPERATIONS[op], columns, **params)
+    st.success(message)
+    st.subheader("📋 Updated Dataset:")
+    preview_dataframe(df, key="text_clean_preview")
+    return df
+
+def clean_text_values(df, plan=None):
     st.subheader("🧹 Clean Text Values")
     
-    string_cols = df.select_dtypes(include=['object']).columns.tolist()
+    string_cols = df.select_dtypes(include=cleaning.TEXT_DTYPES).columns.tolist()
     if not string_cols:
         st.info("No text columns")
         return df
+    # queued text steps target whatever is text when the plan runs
+    target_cols = None if plan is not None else string_cols
     
-    operation = st.radio("Operation", ["Replace NULL strings", "Remove spaces", "Remove special chars"], key="text_op")
+    operations = ["Replace NULL strings", "Remove spaces", "Remove special chars"]
+    if plan is not None:
+        operations += ["Convert to numeric", "Clip to range"]
+    operation = st.radio("Operation", operations, key="text_op")
     
     if operation == "Replace NULL strings":
         if st.button("Replace", key="replace_null"):
-            null_strings = ['None', 'none', 'NONE', 'null', 'NULL', 'NaN', 'nan', 'NA', 'N/A', '?', '??']
-            for col in string_cols:
-                df[col] = df[col].replace(null_strings, np.nan)
-            st.success("✅ NULL strings replaced")
-            st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+            df = _apply_or_queue(df, plan, 'replace_null_strings', target_cols, "✅ NULL strings replaced")
     
     elif operation == "Remove spaces":
         if st.button("Clean", key="clean_spaces"):
-            for col in string_cols:
-                df[col] = df[col].astype(str).str.strip()
-            st.success("✅ Spaces removed")
-            st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+            df = _apply_or_queue(df, plan, 'strip_spaces', target_cols, "✅ Spaces removed")
     
     elif operation == "Remove special chars":
         if st.button("Clean", key="clean_special"):
-            for col in string_cols:
-                df[col] = df[col].astype(str).str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
-            st.success("✅ Special chars removed")
-            st.subheader("📋 Updated Dataset:")
-            st.dataframe(df, use_container_width=True)
+            df = _apply_or_queue(df, plan, 'remove_special_chars', target_cols, "✅ Special chars removed")
+    
+    elif operation == "Convert to numeric":
+        selected_cols = st.multiselect("Select columns", df.columns, key="plan_numeric_cols")
+        if selected_cols and st.button("Queue", key="queue_numeric"):
+            df = _apply_or_queue(df, plan, 'to_numeric', selected_cols, "✅ Converted to numeric")
+    
+    elif operation == "Clip to range":
+        selected_cols = st.multiselect("Select columns", df.columns, key="plan_clip_cols")
+        col1, col2 = st.columns(2)
+        with col1:
+            lower = st.number_input("Lower bound", value=0.0, key="plan_clip_lower")
+        with col2:
+            upper = st.number_input("Upper bound", value=100.0, key="plan_clip_upper")
+        if selected_cols and st.button("Queue", key="queue_clip"):
+            df = _apply_or_queue(df, plan, 'clip', selected_cols, "✅ Clipped", lower=lower, upper=upper)
+    
+    return df
+
+def show_plan(df, plan):
+    """Show queued steps with a cheap preview; run them only when asked."""
+    if not len(plan):
+        return df
+    st.markdown("---")
+    st.write(f"**Queued steps ({len(plan)}, {len(plan.stages())} fused passes):**")
+    for i, line in enumerate(plan.describe(), 1):
+        st.write(f"{i}. {line}")
+    st.write("Preview (first 20 rows):")
+    try:
+        st.dataframe(plan.preview(df), use_container_width=True)
+    except Exception as e:
+        st.error(f"❌ Plan preview failed: {str(e)}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Run plan", key="run_plan"):
+            try:
+                df = plan.execute(df)
+                plan.clear()
+                st.success("✅ Plan applied")
+                st.subheader("📋 Updated Dataset:")
+                preview_dataframe(df, key="text_plan_preview")
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+    with col2:
+        if st.button("Discard plan", key="discard_plan"):
+            plan.clear()
+            st.info("Plan discarded")
     
     return df
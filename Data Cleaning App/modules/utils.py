@@ -1,5 +1,12 @@
 import re
 
+import numpy as np
+
+# Tokens treated as missing when reading files
+NA_VALUES = ['None', 'none', 'NONE', 'null', 'NULL', 'NaN', 'nan', '??', '?', 'NA', 'N/A', '']
+# Strings the cleaning tabs treat as null-like
+NULL_STRINGS = ['None', 'none', 'NONE', 'null', 'NULL', 'NaN', 'nan', 'NA', 'N/A', '?', '??']
+
 # Small utility to convert textual numbers to integers for tests and reuse
 TEXT_TO_NUM = {
     'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4,
@@ -10,12 +17,32 @@ TEXT_TO_NUM = {
     'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70,
     'eighty': 80, 'ninety': 90, 'hundred': 100
 }
+# Scale words close a group: 'two thousand three hundred' is 2 * 1000 + 3 * 100
+SCALES = {'thousand': 1000, 'million': 10**6, 'billion': 10**9, 'trillion': 10**12}
+# Ordinals that are not simply the cardinal word plus 'th'
+ORDINALS = {'first': 1, 'second': 2, 'third': 3, 'fifth': 5, 'eighth': 8, 'ninth': 9, 'twelfth': 12}
+NEGATIVE_WORDS = ('minus', 'negative')
+
+
+def _ordinal_value(word):
+    if word in ORDINALS:
+        return ORDINALS[word]
+    if word.endswith('ieth'):
+        # 'twentieth' -> 'twenty'
+        word = word[:-4] + 'y'
+    elif word.endswith('th'):
+        word = word[:-2]
+    else:
+        return None
+    return TEXT_TO_NUM.get(word, SCALES.get(word))
 
 
 def text_to_number(s: str):
-    """Attempt to convert a small textual number to an int.
-    Supports simple words and hyphenated forms like "twenty-two".
-    Returns int or None if not convertible.
+    """Attempt to convert a textual number to an int (or float).
+    Supports simple words and hyphenated forms like "twenty-two", scale
+    words ("two thousand five hundred"), decimals ("3.5", "three point
+    one four"), ordinals ("twenty-first", "3rd") and thousands separators
+    ("1,250"). Returns the number or None if not convertible.
     """
     if s is None:
         return None
@@ -28,37 +55,128 @@ def text_to_number(s: str):
             return int(s)
         except:
             return None
+    if re.fullmatch(r"[-+]?(\d+\.\d*|\.\d+)", s):
+        return float(s)
+    match = re.fullmatch(r"(\d+)(?:st|nd|rd|th)", s)
+    if match:
+        return int(match.group(1))
+    if re.fullmatch(r"[-+]?\d{1,3}(,\d{3})+(\.\d+)?", s):
+        digits = s.replace(',', '')
+        return float(digits) if '.' in digits else int(digits)
 
     # Clean punctuation and words like 'and'
     s_clean = re.sub(r"[,()]", "", s)
     s_clean = s_clean.replace(" and ", " ")
-    s_clean = re.sub(r"[^a-z0-9\s-]", "", s_clean)
+    s_clean = re.sub(r"[^a-z0-9\s.-]", "", s_clean)
 
     # direct mapping
     if s_clean in TEXT_TO_NUM:
         return TEXT_TO_NUM[s_clean]
 
-    # tokenise on spaces or hyphens and handle scale word 'hundred'
-    parts = re.split(r"[-\s]+", s_clean)
+    # tokenise on spaces or hyphens and handle the scale words
+    parts = [p for p in re.split(r"[-\s]+", s_clean) if p]
+    sign = 1
+    if parts and parts[0] in NEGATIVE_WORDS:
+        sign = -1
+        parts = parts[1:]
     total = 0
     current = 0
-    for p in parts:
-        if not p:
+    decimals = None
+    seen = False
+    for i, p in enumerate(parts):
+        if decimals is not None:
+            # digits after 'point' are read one by one: 'point one four'
+            if p.isdigit():
+                decimals += p
+            elif TEXT_TO_NUM.get(p, 10) < 10:
+                decimals += str(TEXT_TO_NUM[p])
+            else:
+                return None
             continue
-        if p.isdigit():
-            current += int(p)
+        if p == 'point':
+            decimals = ''
             continue
-        if p in TEXT_TO_NUM:
-            val = TEXT_TO_NUM[p]
-            if val == 100:
-                # scale current by 100 (e.g., 'one hundred twenty')
-                if current == 0:
-                    current = 100
-                else:
-                    current = current * 100
+        if re.fullmatch(r"\d+(\.\d+)?", p):
+            current += float(p) if '.' in p else int(p)
+            seen = True
+            continue
+        val = TEXT_TO_NUM.get(p, SCALES.get(p))
+        if val is None and i == len(parts) - 1:
+            # only the last word can be an ordinal: 'twenty-first'
+            val = _ordinal_value(p)
+        if val is None:
+            return None
+        seen = True
+        if val == 100:
+            # scale current by 100 (e.g., 'one hundred twenty')
+            if current == 0:
+                current = 100
             else:
-                current += val
+                current = current * 100
+        elif val >= 1000:
+            total += (current or 1) * val
+            current = 0
         else:
-            return None
+            current += val
+    if not seen or decimals == '':
+        return None
     total += current
-    return total if total != 0 else None
+    if decimals:
+        total += float('0.' + decimals)
+    return sign * total
+
+
+def _array_address(values):
+    # a strided view starts at the same address as a contiguous slice
+    return (values.__array_interface__['data'][0], values.strides)
+
+
+def _buffer_addresses(values):
+    if hasattr(values, '__array_interface__'):
+        return _array_address(values)
+    chunked = getattr(values, '_pa_array', None)
+    if chunked is not None:
+        # slices of an Arrow array share its buffers and differ in offset
+        return tuple(key for chunk in chunked.chunks
+                     for key in [chunk.offset, len(chunk)] + [b.address for b in chunk.buffers() if b is not None])
+    for attr in ('_ndarray', '_data'):
+        # Categorical/datetime arrays keep an _ndarray, nullable arrays _data
+        inner = getattr(values, attr, None)
+        if inner is not None and hasattr(inner, '__array_interface__'):
+            return _array_address(inner)
+    return (id(values),)
+
+
+def buffer_key(obj):
+    """Identity of the memory behind a Series or Index.
+
+    Two objects with equal keys share their data buffer, which is how
+    copy-on-write versions of a frame are recognised as unchanged.
+    """
+    values = obj._values
+    return (str(obj.dtype), len(obj)) + _buffer_addresses(values)
+
+
+def buffer_owner(obj):
+    """The object owning the memory behind a Series or Index.
+
+    Caches keyed by :func:`buffer_key` hold a weak reference to it, so a
+    key whose buffer was freed (and whose address may be reused) goes stale
+    instead of matching new data.
+    """
+    values = obj._values
+    chunked = getattr(values, '_pa_array', None)
+    if chunked is not None:
+        return chunked
+    if not isinstance(values, np.ndarray):
+        for attr in ('_ndarray', '_data'):
+            inner = getattr(values, attr, None)
+            if isinstance(inner, np.ndarray):
+                values = inner
+                break
+    if isinstance(values, np.ndarray):
+        # column views of a 2-D block all lead back to the block itself
+        while isinstance(values.base, np.ndarray):
+            values = values.base
+    return values
+
@@ -0,0 +1,267 @@
+"""Chunked export writers.
+
+Every format is written ``chunk_rows`` rows at a time to a binary file
+object, so an export needs memory for one encoded chunk instead of
+whole-dataset string and bytes copies. The data may be a DataFrame or any
+iterable of DataFrame chunks, such as
+:meth:`modules.streaming.ChunkedDataset.iter_chunks`. :func:`export_to_spool` writes to a
+:class:`tempfile.SpooledTemporaryFile`, which moves to disk once it
+outgrows ``SPOOL_MAX_BYTES``; :func:`export_to_file` writes to a path,
+for exports too large to hand to the browser.
+
+Compressed CSV uses pyarrow's codecs (gzip, zstd), so no extra packages
+are needed. Excel workbooks are streamed through openpyxl's write-only
+mode, which keeps no cell objects in memory, and data longer than
+Excel's 1,048,576-row limit continues on further sheets.
+"""
+import itertools
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules.logger import get_logger
+
+logger = get_logger('writers')
+
+EXPORT_CHUNK_ROWS = 100_000
+# Exports larger than this move from memory to a temporary file on disk
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+# Rows inspected to pick an Arrow type for object columns
+SCHEMA_SAMPLE_ROWS = 10_000
+
+# format -> (label, file extension, MIME type)
+EXPORT_FORMATS = {
+    'csv': ("CSV", 'csv', 'text/csv'),
+    'csv.gz': ("CSV (gzip)", 'csv.gz', 'application/gzip'),
+    'csv.zst': ("CSV (zstd)", 'csv.zst', 'application/zstd'),
+    'parquet': ("Parquet", 'parquet', 'application/vnd.apache.parquet'),
+    'feather': ("Feather (Arrow IPC)", 'feather', 'application/vnd.apache.arrow.file'),
+    'xlsx': ("Excel", 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+# Rows per worksheet, header included
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MAX_TITLE = 31
+_CSV_CODECS = {'csv': None, 'csv.gz': 'gzip', 'csv.zst': 'zstd'}
+
+
+class _KeepOpen:
+    """File proxy whose ``close`` only flushes; Arrow sinks close the file they wrap."""
+
+    def __init__(self, fh):
+        self._fh = fh
+
+    def __getattr__(self, name):
+        return getattr(self._fh, name)
+
+    @property
+    def closed(self):
+        return self._fh.closed
+
+    def close(self):
+        self._fh.flush()
+
+
+def _arrow_sink(fh):
+    return pa.PythonFile(_KeepOpen(fh), mode='w')
+
+
+def iter_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _chunks(data, chunk_rows):
+    """``(sample, chunks)``: the first rows, for schemas and headers, and all chunks."""
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[:SCHEMA_SAMPLE_ROWS], iter_chunks(data, chunk_rows)
+    chunks = iter(data)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("Nothing to export")
+    return first.iloc[:SCHEMA_SAMPLE_ROWS], itertools.chain([first], chunks)
+
+
+def _report(progress, rows):
+    if progress is not None:
+        progress(rows)
+
+
+def write_csv(data, fh, compression=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Write ``data`` as CSV (optionally ``'gzip'`` or ``'zstd'`` compressed) to ``fh``."""
+    sample, chunks = _chunks(data, chunk_rows)
+    sink = pa.CompressedOutputStream(_arrow_sink(fh), compression) if compression else fh
+    sink.write(sample.iloc[:0].to_csv(index=False).encode('utf-8'))
+    rows = 0
+    for chunk in chunks:
+        sink.write(chunk.to_csv(index=False, header=False).encode('utf-8'))
+        rows += len(chunk)
+        _report(progress, rows)
+    if compression:
+        # closing the codec stream flushes its trailer; fh itself stays open
+        sink.close()
+
+
+def _stringify(chunk):
+    chunk = chunk.copy(deep=False)
+    for i in range(chunk.shape[1]):
+        column = chunk.iloc[:, i]
+        if column.dtype == object:
+            chunk.isetitem(i, column.astype(str).where(column.notna()))
+    return chunk
+
+
+def _arrow_schema(sample):
+    """An Arrow schema inferred from the first rows of the data.
+
+    Object columns that mix types, or are empty in the sample, become
+    strings.
+    """
+    try:
+        schema = pa.Schema.from_pandas(sample, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        schema = pa.Schema.from_pandas(_stringify(sample), preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def _to_table(chunk, schema):
+    try:
+        return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        try:
+            return pa.Table.from_pandas(_stringify(chunk), schema=schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"A column mixes value types and cannot be exported in this format; "
+                             f"convert it in the Data Types tab first ({e})") from e
+
+
+def write_parquet(data, fh, chunk_rows=EXPORT_CHUNK_ROWS, compression='snappy', progress=None):
+    """Write ``data`` as a Parquet file with one row group per chunk."""
+    sample, chunks = _chunks(data, chunk_rows)
+    schema = _arrow_schema(sample)
+    rows = 0
+    with pq.ParquetWriter(_arrow_sink(fh), schema, compression=compression) as writer:
+        for chunk in chunks:
+            writer.write_table(_to_table(chunk, schema))
+            rows += len(chunk)
+            _report(progress, rows)
+
+
+def write_feather(data, fh, chunk_rows=EXPORT_CHUNK_ROWS, compression='lz4', progress=None):
+    """Write ``data`` as a Feather v2 (Arrow IPC) file with one record batch per chunk."""
+    sample, chunks = _chunks(data, chunk_rows)
+    schema = _arrow_schema(sample)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    rows = 0
+    with pa.ipc.new_file(_arrow_sink(fh), schema, options=options) as writer:
+        for chunk in chunks:
+            writer.write_table(_to_table(chunk, schema))
+            rows += len(chunk)
+            _report(progress, rows)
+
+
+def _excel_rows(chunk):
+    chunk = chunk.copy(deep=False)
+    for i in range(chunk.shape[1]):
+        column = chunk.iloc[:, i]
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            # Excel has no time zones
+            chunk.isetitem(i, column.dt.tz_localize(None))
+    # plain Python values; missing ones become empty cells rather than NaN,
+    # which Excel rejects
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def _sheet_title(name, part):
+    suffix = f" ({part})" if part > 1 else ''
+    return str(name)[:EXCEL_MAX_TITLE - len(suffix)] + suffix
+
+
+def write_excel(sheets, fh, chunk_rows=EXPORT_CHUNK_ROWS, max_rows=EXCEL_MAX_ROWS, progress=None):
+    """Write ``{sheet name: data}`` as an .xlsx workbook in openpyxl's write-only mode.
+
+    Rows are streamed chunk by chunk. Data that does not fit in
+    ``max_rows`` rows continues on ``"<name> (2)"``, ``"<name> (3)"``...
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    rows = 0
+    for name, data in sheets.items():
+        sample, chunks = _chunks(data, chunk_rows)
+        header = [str(col) for col in sample.columns]
+        part, used = 0, max_rows
+        if not len(sample):
+            chunks = [sample]
+        for chunk in chunks:
+            while True:
+                if used == max_rows:
+                    part += 1
+                    sheet = workbook.create_sheet(_sheet_title(name, part))
+                    sheet.append(header)
+                    used = 1
+                take = min(len(chunk), max_rows - used)
+                for row in _excel_rows(chunk.iloc[:take]):
+                    sheet.append(row)
+                used += take
+                rows += take
+                chunk = chunk.iloc[take:]
+                if not len(chunk):
+                    break
+            _report(progress, rows)
+    workbook.save(_KeepOpen(fh))
+
+
+def write(data, fh, fmt, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Write ``data`` to the binary file object ``fh`` in one of ``EXPORT_FORMATS``.
+
+    For ``'xlsx'``, ``data`` may also be a ``{sheet name: data}`` dict.
+    """
+    if fmt in _CSV_CODECS:
+        write_csv(data, fh, compression=_CSV_CODECS[fmt], chunk_rows=chunk_rows, progress=progress)
+    elif fmt == 'parquet':
+        write_parquet(data, fh, chunk_rows=chunk_rows, progress=progress)
+    elif fmt == 'feather':
+        write_feather(data, fh, chunk_rows=chunk_rows, progress=progress)
+    elif fmt == 'xlsx':
+        sheets = data if isinstance(data, dict) else {'Sheet1': data}
+        write_excel(sheets, fh, chunk_rows=chunk_rows, progress=progress)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def export_to_spool(data, fmt, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Export ``data`` to a spooled temporary file, rewound and ready to read."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        write(data, spool, fmt, chunk_rows=chunk_rows, progress=progress)
+    except Exception:
+        spool.close()
+        raise
+    size = spool.tell()
+    spool.seek(0)
+    logger.info(f"Exported {fmt} ({size} bytes)")
+    return spool
+
+
+def export_to_file(data, fmt, path, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Export ``data`` to the file at ``path``; returns its size in bytes.
+
+    A partly written file is removed when the export fails.
+    """
+    try:
+        with open(path, 'wb') as fh:
+            write(data, fh, fmt, chunk_rows=chunk_rows, progress=progress)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    size = os.path.getsize(path)
+    logger.info(f"Exported {fmt} to {path} ({size} bytes)")
+    return size
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Report what each part of the app adds to a cold start.
+
+Usage:
+  python scripts/import_report.py
+  python scripts/import_report.py --top 15 --json import_times.json
+
+Every measurement runs in a fresh interpreter with ``python -X importtime``:
+
+- Streamlit itself, which every run pays (it already loads pandas, NumPy
+  and pyarrow);
+- the modules ``app.py`` imports at the top, which load before the login
+  page is shown;
+- each tab module ``app.py`` loads with ``lazy_import``, measured on top
+  of the startup imports, which is what its tab costs the first time it
+  runs;
+- the libraries that operations import when they first run (scikit-learn,
+  scipy, openpyxl), also on top of the startup imports.
+
+The lowest of ``--repeat`` runs is reported, with the third-party
+packages each step loads and, with ``--top``, the slowest single imports
+of the startup step. Compare the numbers before and after a change that
+adds imports.
+"""
+import argparse
+import ast
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+LAZY = re.compile(r"lazy_import\('([\w.]+)'\)")
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+# imported inside the functions that need them
+DEFERRED = ['sklearn.impute', 'sklearn.neighbors', 'sklearn.ensemble', 'scipy.sparse.csgraph', 'openpyxl']
+
+
+def startup_modules(app=ROOT / 'app.py'):
+    """Modules ``app.py`` imports at the top level, in order."""
+    names = []
+    for node in ast.parse(app.read_text(encoding='utf-8')).body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return [name for name in dict.fromkeys(names) if name != 'streamlit']
+
+
+def lazy_modules(app=ROOT / 'app.py'):
+    """Modules ``app.py`` loads with ``lazy_import``, in order."""
+    return list(dict.fromkeys(LAZY.findall(app.read_text(encoding='utf-8'))))
+
+
+def importtime(before, modules):
+    """Import ``before`` then ``modules`` in a fresh interpreter.
+
+    Returns the seconds ``modules`` took and the ``-X importtime`` entries
+    (name, self seconds) imported by them.
+    """
+    code = ''.join(f'import {name}\n' for name in before) + "print('-- measured --', file=__import__('sys').stderr)\n"
+    code += ''.join(f'import {name}\n' for name in modules)
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True,
+                         text=True, check=True).stderr
+    entries = []
+    for line in out.split('-- measured --', 1)[1].splitlines():
+        match = LINE.match(line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)) / 1e6, int(match.group(2)) / 1e6,
+                            len(match.group(3)) == 1))
+    # top-level entries are the imports asked for; their cumulative times cover everything they pulled in
+    total = sum(cumulative for _, _, cumulative, top in entries if top)
+    return total, [(name, own) for name, own, _, _ in entries]
+
+
+def measure(label, before, modules, repeat):
+    best = None
+    for _ in range(repeat):
+        total, entries = importtime(before, modules)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+    top_level = {name.split('.')[0] for name, _ in entries}
+    packages = sorted(name for name in top_level - set(sys.stdlib_module_names) - {'modules'}
+                      if not name.startswith('_'))
+    return {'label': label, 'seconds': total, 'packages': packages, 'entries': entries}
+
+
+def _print(results):
+    for result in results:
+        print(f"{result['label']:<30} {result['seconds']:8.3f}  {', '.join(result['packages']) or '-'}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import cost of the app's modules")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=0, help="list the slowest imports of the startup step")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    startup = startup_modules()
+    print(f"{'step':<30} {'seconds':>8}  packages with new imports")
+    results = [measure('streamlit', [], ['streamlit'], args.repeat),
+               measure('app startup', ['streamlit'], startup, args.repeat)]
+    _print(results)
+    for title, names in (("tab modules, on first use:", lazy_modules()),
+                         ("libraries, on first use by an operation:", DEFERRED)):
+        if names:
+            print(title)
+            group = [measure(f'  {name}', ['streamlit'] + startup, [name], args.repeat) for name in names]
+            _print(group)
+            results += group
+    if args.top:
+        print("\nslowest imports of the app startup step (own time):")
+        for name, own in sorted(results[1]['entries'], key=lambda entry: -entry[1])[:args.top]:
+            print(f"  {name:<50} {own:8.4f}s")
+    if args.json:
+        args.json.write_text(json.dumps([{k: v for k, v in r.items() if k != 'entries'} for r in results], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""Run the Streamlit app with its metrics snapshots written from process start.
+
+Usage:
+  python serve.py --server.port=8501 --server.address=0.0.0.0
+
+Arguments are passed to ``streamlit run app.py``. ``app.py`` only runs
+when a browser opens a session, so a server started with plain
+``streamlit run`` writes no metrics snapshot (and ``/ready`` has nothing
+to judge) until the first visitor arrives. This starts the snapshot
+writer first, then the Streamlit server in the same process.
+"""
+import sys
+from pathlib import Path
+
+from streamlit.web import cli
+
+from modules.metrics import start_reporting
+
+
+def main():
+    start_reporting()
+    sys.argv = ['streamlit', 'run', str(Path(__file__).resolve().with_name('app.py'))] + sys.argv[1:]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def copy_on_write():
+    """Run every test with copy-on-write on, as app.py does."""
+    with pd.option_context('mode.copy_on_write', True):
+        yield
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules import cleaning
+from modules.plan import CleaningPlan
+
+
+def test_operations_do_not_mutate_input():
+    df = pd.DataFrame({'a': [1.0, None, 3.0], 'b': [' x ', 'NA', 'y']})
+    before = df.copy()
+    cleaning.fill_missing(df, ['a'], strategy='median')
+    cleaning.strip_spaces(df)
+    cleaning.replace_null_strings(df)
+    cleaning.treat_outliers(df, 'a', 'cap')
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_fill_and_custom_value():
+    df = pd.DataFrame({'a': [1.0, None, 3.0], 'b': ['x', None, 'x']})
+    assert cleaning.fill_missing(df, ['a'], strategy='mean')['a'].tolist() == [1.0, 2.0, 3.0]
+    assert cleaning.fill_missing(df, ['b'], strategy='mode')['b'].tolist() == ['x', 'x', 'x']
+    with pytest.raises(ValueError):
+        cleaning.fill_custom_value(df, 'a', 'abc')
+
+
+def test_fill_new_value_into_category_column():
+    df = pd.DataFrame({'c': pd.Series(['x', None, 'y', None], dtype='category')})
+    out = cleaning.fill_custom_value(df, 'c', 'Unknown')
+    assert out['c'].tolist() == ['x', 'Unknown', 'y', 'Unknown'] and out['c'].dtype == 'category'
+    assert cleaning.fill_missing(df, ['c'], strategy='value', value='Unknown')['c'].tolist() == out['c'].tolist()
+    assert cleaning.fill_value_series(df['c'], 'x').tolist() == ['x', 'x', 'y', 'x']
+    plan = CleaningPlan()
+    plan.add('fill_value', ['c'], value='Unknown')
+    assert plan.execute(df)['c'].tolist() == out['c'].tolist()
+
+
+def test_outliers_and_duplicates():
+    df = pd.DataFrame({'v': [1, 2, 3, 2, 1, 100]})
+    lower, upper = cleaning.iqr_bounds(df['v'])
+    assert len(cleaning.treat_outliers(df, 'v', 'remove')) == 5
+    assert cleaning.treat_outliers(df, 'v', 'cap')['v'].max() == upper
+    assert len(cleaning.remove_duplicates(df)) == 4
+    assert cleaning.remove_duplicates(df, keep='last').index.tolist() == [2, 3, 4, 5]
+
+
+def test_run_steps():
+    df = pd.DataFrame({'age': ['20', 'twenty-two', 'NA'], 'name': [' Ali', 'Sara ', ' Ali']})
+    timings = []
+    out = cleaning.run_steps(df, [
+        {'op': 'replace_null_strings'},
+        {'op': 'convert_text_numbers', 'column': 'age'},
+        {'op': 'fill_missing', 'columns': ['age'], 'strategy': 'median'},
+        {'op': 'strip_spaces', 'columns': ['name']},
+    ], timings=timings)
+    assert out['age'].tolist() == [20, 22, 21]
+    assert out['name'].tolist() == ['Ali', 'Sara', 'Ali']
+    assert [op for op, _ in timings] == ['replace_null_strings', 'convert_text_numbers', 'fill_missing', 'strip_spaces']
+    with pytest.raises(ValueError):
+        cleaning.apply_step(df, {'op': 'nope'})
+
+
+def test_text_numbers_series_matches_per_value_parse():
+    values = ['twenty', None, '42', 'forty-first', 'oops', 'twenty', '1e3', 'two thousand']
+    series = pd.Series(values, index=range(10, 18), name='n')
+    result = cleaning.text_numbers_series(series)
+    expected = [20, np.nan, 42, 41, np.nan, 20, 1000, 2000]
+    np.testing.assert_array_equal(result.to_numpy(), np.array(expected, dtype='float64'))
+    assert result.index.equals(series.index) and result.name == 'n'
+    # categorical columns and columns with nothing to convert
+    assert cleaning.text_numbers_series(series.astype('category')).tolist()[2] == 42
+    untouched = pd.Series(['a', 'b'])
+    assert cleaning.text_numbers_series(untouched) is untouched
+
+
+def test_only_text_values_count_as_converted():
+    series = pd.Series([5, 'twenty', None, 'oops', 7.5, '42', 'twenty'], dtype=object)
+    result = cleaning.text_numbers_series(series)
+    # 5 and 7.5 were numbers already and 'oops' did not convert
+    assert cleaning.converted_text_count(series, result) == 3
+    assert cleaning.converted_text_count(series.astype('string'), result) == 5
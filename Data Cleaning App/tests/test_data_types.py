@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from modules.data_types import compact_dtypes
+
+
+def test_compact_dtypes_preserves_values():
+    df = pd.DataFrame({
+        'small': np.arange(1000, dtype='int64'),
+        'exact': np.full(1000, 0.5),
+        'precise': np.linspace(0, 1, 1000),
+        'city': ['Lahore', 'Karachi'] * 500,
+        'id': [f'row-{i}' for i in range(1000)],
+    })
+    out, report = compact_dtypes(df)
+
+    assert out['small'].dtype == 'int16'
+    assert out['exact'].dtype == 'float32'
+    # float32 would lose precision here, so it stays float64
+    assert out['precise'].dtype == 'float64'
+    assert str(out['city'].dtype) == 'category'
+    assert out['id'].dtype.name.startswith('string')
+    for col in df.columns:
+        assert out[col].astype(object).tolist() == df[col].astype(object).tolist()
+    assert (report['Bytes Saved'] >= 0).all()
+    assert report['Bytes Saved'].sum() > 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules import cleaning, fingerprints
+from modules.fingerprints import column_duplicate_counts, row_index
+
+
+def _frame(n=2000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'a': rng.integers(0, 5, n),
+        'b': rng.choice(['x', 'y', None], n),
+        'c': rng.choice([1.5, np.nan], n),
+    }, index=rng.permutation(n))
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', False])
+@pytest.mark.parametrize('subset', [None, ['a'], ['b', 'c']])
+def test_matches_pandas(keep, subset):
+    df = _frame()
+    index = row_index(df, subset)
+    np.testing.assert_array_equal(index.duplicated(keep), df.duplicated(subset, keep=keep).to_numpy())
+    pd.testing.assert_frame_equal(cleaning.remove_duplicates(df, subset, keep), df.drop_duplicates(subset, keep=keep))
+    assert index.duplicate_count == df.duplicated(subset).sum()
+
+
+def test_samples_and_column_counts():
+    df = _frame()
+    positions = row_index(df).duplicate_positions(limit=10)
+    pd.testing.assert_frame_equal(df.iloc[positions], df[df.duplicated(keep=False)].head(10))
+    expected = [df[col].duplicated().sum() for col in df.columns]
+    assert column_duplicate_counts(df).tolist() == expected
+
+
+def test_dropping_rows_does_not_rehash():
+    df = _frame()
+    fingerprints._hashes.clear()
+    fingerprints._indexes.clear()
+    row_index(df)
+    hashed = fingerprints._hashes.misses
+    out = cleaning.drop_missing_rows(df, ['c'])
+    out = cleaning.remove_duplicates(out)
+    assert row_index(out).duplicate_count == 0
+    # hashes of the smaller frames were carried over, none recomputed
+    assert fingerprints._hashes.misses == hashed
+    assert column_duplicate_counts(out).tolist() == [out[c].duplicated().sum() for c in out.columns]
+
+
+def test_in_place_edits_without_copy_on_write():
+    with pd.option_context('mode.copy_on_write', False):
+        d = pd.DataFrame({'a': [1, 1, 2, 3], 'b': [1, 1, 2, 3]})
+        assert fingerprints.duplicate_count(d) == 1
+        d.loc[1, 'a'] = 5
+        assert fingerprints.duplicate_count(d) == d.duplicated().sum() == 0
+        pd.testing.assert_frame_equal(cleaning.remove_duplicates(d), d.drop_duplicates())
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', False])
+def test_colliding_fingerprints_are_not_duplicates(keep, monkeypatch):
+    df = _frame(500)
+    # every value hashes alike, so every row collides with every other
+    monkeypatch.setattr(fingerprints, 'column_hashes', lambda s: np.zeros(len(s), dtype=np.uint64))
+    fingerprints._indexes.clear()
+    np.testing.assert_array_equal(row_index(df).duplicated(keep), df.duplicated(keep=keep).to_numpy())
+    pd.testing.assert_frame_equal(cleaning.remove_duplicates(df, keep=keep), df.drop_duplicates(keep=keep))
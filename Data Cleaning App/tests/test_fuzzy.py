@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from modules import cleaning, fuzzy
+from modules.fuzzy import find_fuzzy_duplicates, merge_clusters, minhash_signatures, normalize_text
+
+
+def _customers():
+    return pd.DataFrame({
+        'name': ['John Smith', 'john  smith.', 'Jon Smith', 'Alice Brown', 'ALICE BROWN', 'Bob Stone', 'John Smith'],
+        'city': ['Lahore', 'Lahore', 'Lahore', 'Karachi', 'Karachi', 'Lahore', 'Karachi'],
+        'email': [None, 'john@x.com', None, 'alice@y.com', None, 'bob@z.com', 'js@k.com'],
+    })
+
+
+def _jaccard(a, b):
+    def grams(s):
+        return {f' {s} '[i:i + 3] for i in range(len(s))}
+    return len(grams(a) & grams(b)) / len(grams(a) | grams(b))
+
+
+def test_normalize_text():
+    values = normalize_text(pd.Series(['  John,  SMITH ', None, 'a-b']))
+    assert values.tolist() == ['john smith', '', 'a b']
+
+
+def test_signature_agreement_estimates_jaccard():
+    pairs = [('john smith 1234 street', 'jon smith 1234 street'), ('john smith', 'maria garcia')]
+    for a, b in pairs:
+        signatures = minhash_signatures([a, b], num_perm=512)
+        agreement = (signatures[0] == signatures[1]).mean()
+        assert abs(agreement - _jaccard(a, b)) < 0.1
+
+
+def test_signatures_do_not_depend_on_length_batches():
+    texts = ['ab', 'john smith', 'x' * 10_000, '', 'maria garcia', 'jon smith']
+    expected = np.vstack([minhash_signatures([text]) for text in texts])
+    # a batch may hold only a few short texts, and the long one is alone
+    np.testing.assert_array_equal(minhash_signatures(texts, max_cells=40), expected)
+    np.testing.assert_array_equal(minhash_signatures(texts), expected)
+
+
+def test_clusters_respect_blocking():
+    df = _customers()
+    labels = find_fuzzy_duplicates(df, ['name'], 0.85).labels
+    assert labels[0] == labels[1] == labels[2] == labels[6]
+    assert labels[3] == labels[4] != labels[0]
+    assert labels[5] not in labels[[0, 3]]
+
+    result = find_fuzzy_duplicates(df, ['name'], {'name': 0.85}, blocking=['city'])
+    assert result.labels[0] == result.labels[1] == result.labels[2] != result.labels[6]
+    assert result.clusters == 2
+    assert result.duplicate_rows == 3
+    assert result.cluster_positions().tolist() == [0, 1, 2, 3, 4]
+
+
+def test_merge_fills_missing_values():
+    df = _customers()
+    result = find_fuzzy_duplicates(df, ['name'], 0.85, blocking=['city'])
+    merged = merge_clusters(df, result.labels)
+    assert merged.index.tolist() == [0, 3, 5, 6]
+    assert merged.loc[0, 'email'] == 'john@x.com'
+    assert merged.loc[3, 'name'] == 'Alice Brown'
+
+    last = merge_clusters(df, result.labels, keep='last', fill_missing=False)
+    assert last.index.tolist() == [2, 4, 5, 6]
+    assert last['email'].isna().sum() == 2
+
+
+def test_cleaning_operation_and_parallel_scoring(monkeypatch):
+    df = _customers()
+    merged = cleaning.apply_step(df, {'op': 'remove_fuzzy_duplicates', 'columns': ['name'], 'blocking': ['city']})
+    assert len(merged) == 4
+    exact = pd.DataFrame({'name': ['a', 'b']})
+    assert cleaning.remove_fuzzy_duplicates(exact, ['name']) is exact
+
+    monkeypatch.setattr(fuzzy, 'PARALLEL_MIN_PAIRS', 1)
+    records = [np.array(['john smith', 'jon smith', 'maria'], dtype=object)]
+    pairs = np.array([[0, 1], [0, 2], [1, 2]])
+    accepted = fuzzy.score_pairs(records, pairs, [0.85], n_jobs=2, chunk_size=1)
+    assert accepted.tolist() == [True, False, False]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from modules import cleaning
+from modules.history import DatasetHistory
+
+
+def _frame(n=10000):
+    return pd.DataFrame({'a': np.arange(n, dtype='float64'), 'b': np.ones(n), 'c': np.zeros(n)})
+
+
+def test_versions_share_unchanged_columns():
+    df = _frame()
+    history = DatasetHistory(df)
+    base = history.nbytes
+    column_bytes = df['a'].nbytes
+
+    for i in range(5):
+        df = cleaning.apply_to_columns(df, cleaning.clip_series, ['a'], lower=i + 1)
+        history.commit(df, f'clip {i}')
+    # only the changed column is held once per version
+    assert history.nbytes == base + 5 * column_bytes
+    assert len(history) == 6
+
+
+def test_undo_redo_and_original():
+    df = _frame(5)
+    history = DatasetHistory(df)
+    changed = cleaning.fill_missing(df.assign(a=[None, 1.0, 2.0, 3.0, 4.0]), ['a'], strategy='value', value=9)
+    history.commit(changed, 'fill')
+    assert history.can_undo and not history.can_redo
+
+    pd.testing.assert_frame_equal(history.undo(), df)
+    pd.testing.assert_frame_equal(history.redo(), changed)
+    # in-place edits of the current frame never reach stored versions
+    current = history.current()
+    current.loc[0, 'b'] = -1
+    pd.testing.assert_frame_equal(history.original(), df)
+
+    history.undo()
+    history.commit(df.head(2), 'head')
+    assert not history.can_redo
+    assert history.labels == ['Loaded', 'head']
+
+
+def test_eviction_keeps_original_and_current():
+    df = _frame()
+    history = DatasetHistory(df, max_bytes=_frame().memory_usage(index=False).sum() + 2 * df['a'].nbytes)
+    for i in range(6):
+        df = cleaning.apply_to_columns(df, cleaning.clip_series, ['a'], lower=i + 1)
+        history.commit(df, f'clip {i}')
+    assert history.nbytes <= history.max_bytes
+    assert history.labels[0] == 'Loaded' and history.labels[-1] == 'clip 5'
+    pd.testing.assert_frame_equal(history.original(), _frame())
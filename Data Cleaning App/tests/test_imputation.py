@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from sklearn.impute import KNNImputer
+from modules import cleaning, imputation
+from modules.imputation import impute_array
+
+
+def _values(n=500, missing=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n, 4))
+    values[rng.random(n) < missing, 2] = np.nan
+    return values
+
+
+def test_matches_knn_imputer_with_complete_donors():
+    values = _values()
+    expected = KNNImputer(n_neighbors=3).fit_transform(values)
+    np.testing.assert_allclose(impute_array(values, n_neighbors=3, chunk_size=7), expected)
+
+
+def test_patterns_and_all_missing_rows():
+    values = _values()
+    values[::50, 0] = np.nan
+    values[5] = np.nan
+    filled = impute_array(values, n_neighbors=3, max_donors=100)
+    assert not np.isnan(filled).any()
+    observed = ~np.isnan(values)
+    np.testing.assert_array_equal(filled[observed], values[observed])
+    np.testing.assert_allclose(filled[5], np.nanmean(values, axis=0))
+
+
+def test_few_complete_rows_fall_back_to_exact():
+    values = np.array([[1.0, np.nan, 3.0], [np.nan, 2.0, np.nan], [1.5, 2.5, np.nan]])
+    np.testing.assert_allclose(impute_array(values, n_neighbors=2), KNNImputer(n_neighbors=2).fit_transform(values))
+
+
+def test_knn_impute_only_replaces_incomplete_columns_and_caches():
+    df = pd.DataFrame(_values(), columns=list('abcd'))
+    df['text'] = 'x'
+    result = cleaning.knn_impute(df, n_neighbors=3)
+    assert result['c'].notna().all()
+    assert np.shares_memory(result['a'].to_numpy(), df['a'].to_numpy())
+    assert df['c'].isna().any()
+
+    hits = imputation._cache.hits
+    again = cleaning.apply_step(df, {'op': 'knn_impute', 'n_neighbors': 3})
+    assert imputation._cache.hits == hits + 1
+    pd.testing.assert_frame_equal(again, result)
@@ -0,0 +1,55 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from modules import cleaning, instrumentation
+from modules.logger import JsonFormatter
+from modules.metrics import rss_bytes
+
+
+@pytest.fixture
+def log():
+    log = instrumentation.ProfileLog()
+    instrumentation.set_session_log(log)
+    yield log
+    instrumentation.set_session_log(None)
+
+
+def test_operations_record_time_memory_and_shapes(log):
+    df = pd.DataFrame({'a': [1.0, np.nan, 3.0], 'b': ['x', None, 'z']})
+    cleaning.drop_missing_rows(df)
+    record = log.records[-1]
+    assert record['operation'] == 'drop_missing_rows'
+    assert (record['rows_in'], record['cols_in'], record['rows_out'], record['cols_out']) == (3, 2, 2, 2)
+    assert record['wall_s'] >= 0 and record['cpu_s'] >= 0 and record['error'] is None
+    assert list(log.slowest(5).columns)[:4] == ['Step', 'Wall (s)', 'CPU (s)', 'Peak (MB)']
+
+
+@pytest.mark.parametrize('meter', ['rss', 'tracemalloc'])
+def test_nested_peaks_and_errors(log, monkeypatch, meter):
+    if meter == 'rss' and rss_bytes() is None:
+        pytest.skip('resident memory is read from /proc')
+    meter = instrumentation._RssSampler() if meter == 'rss' else instrumentation._Tracemalloc()
+    monkeypatch.setattr(instrumentation, '_meter', meter)
+    with pytest.raises(ValueError):
+        with instrumentation.profile('outer') as outer:
+            with instrumentation.profile('inner'):
+                block = np.ones(2_000_000)
+            del block
+            outer.output(pd.DataFrame({'a': [1]}))
+            raise ValueError('boom')
+    inner, outer = log.records
+    assert inner['depth'] == 1 and outer['depth'] == 0
+    # the inner step's 16 MB allocation counts towards the outer step too
+    assert inner['peak_mb'] >= 15 and outer['peak_mb'] >= inner['peak_mb']
+    assert outer['error'] == 'ValueError' and outer['rows_out'] == 1
+
+
+def test_structured_log_records():
+    record = logging.LogRecord('instrumentation', logging.INFO, __file__, 1, 'step done', None, None)
+    record.event = 'profile'
+    record.fields = {'operation': 'knn_impute', 'wall_s': 1.5}
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['event'] == 'profile' and entry['operation'] == 'knn_impute' and entry['message'] == 'step done'
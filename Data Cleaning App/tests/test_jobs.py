@@ -0,0 +1,54 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from modules import cleaning, jobs, instrumentation
+
+
+def test_progress_result_and_session_profile():
+    log = instrumentation.ProfileLog()
+    instrumentation.set_session_log(log)
+    try:
+        df = pd.DataFrame({'a': [1.0, np.nan, 3.0, 4.0] * 50, 'b': [2.0, 3.0, np.nan, 5.0] * 50})
+        calls = []
+
+        def impute(report):
+            return cleaning.knn_impute(df, ['a', 'b'], n_neighbors=2, progress=lambda done, total: (
+                calls.append((done, total)), report(done / total)))
+
+        job = jobs.JobExecutor(max_workers=2).submit("KNN", impute)
+        assert job.wait(30)
+    finally:
+        instrumentation.set_session_log(None)
+    assert job.status == jobs.DONE and job.progress == 1.0
+    assert job.result.isna().sum().sum() == 0
+    assert calls[-1] == (100, 100)
+    # records of the job thread reach the session that submitted it
+    assert [r['operation'] for r in log.records] == ['knn_impute']
+
+
+def test_cancel_running_and_queued_jobs():
+    executor = jobs.JobExecutor(max_workers=1)
+    started = threading.Event()
+
+    def loop(report):
+        started.set()
+        while True:
+            report(0.5, "working")
+            threading.Event().wait(0.01)
+
+    running = executor.submit("loop", loop)
+    queued = executor.submit("never", lambda report: 1 / 0)
+    assert started.wait(10)
+    queued.cancel()
+    running.cancel()
+    assert running.wait(10) and queued.wait(10)
+    assert running.status == queued.status == jobs.CANCELLED
+    assert running.text == "working" and queued.started is None
+    assert executor.stats()['finished'][jobs.CANCELLED] == 2
+
+
+def test_failures_are_kept_on_the_job():
+    job = jobs.JobExecutor(max_workers=1).submit("broken", lambda report: 1 / 0)
+    assert job.wait(10)
+    assert job.status == jobs.FAILED and isinstance(job.error, ZeroDivisionError) and job.result is None
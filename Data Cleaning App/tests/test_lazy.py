@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from modules import instrumentation
+from modules.lazy import lazy_import
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_first_import_is_profiled_once():
+    sys.modules.pop('colorsys', None)
+    log = instrumentation.ProfileLog()
+    instrumentation.set_session_log(log)
+    try:
+        module = lazy_import('colorsys')
+        assert lazy_import('colorsys') is module
+    finally:
+        instrumentation.set_session_log(None)
+    assert module.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert [r['operation'] for r in log.records] == ['import colorsys']
+
+
+def test_startup_does_not_load_heavy_libraries():
+    sys.path.insert(0, str(APP_DIR / 'scripts'))
+    try:
+        from import_report import startup_modules
+    finally:
+        sys.path.pop(0)
+    code = ''.join(f'import {name}\n' for name in startup_modules())
+    code += "import sys; print(sorted(m for m in ('sklearn', 'scipy', 'openpyxl') if m in sys.modules))"
+    out = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
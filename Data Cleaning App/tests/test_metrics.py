@@ -0,0 +1,58 @@
+import pandas as pd
+from modules import metrics
+from modules.parse_cache import ParseCache
+
+
+def _registry():
+    registry = metrics.Registry()
+    registry.observe({'operation': 'knn_impute', 'wall_s': 0.3, 'error': None})
+    registry.observe({'operation': 'knn_impute', 'wall_s': 12.0, 'error': None})
+    registry.observe({'operation': 'export "csv"', 'wall_s': 0.001, 'error': 'ValueError'})
+    registry.track_session('0123456789abcdef', 1000)
+    registry.track_session('fedcba9876543210', 500)
+    return registry
+
+
+def test_snapshot_renders_prometheus_text(tmp_path):
+    registry = _registry()
+    cache = ParseCache()
+    cache.get_or_parse('k', lambda: pd.DataFrame({'a': [1]}))
+    cache.get('k')
+    registry.register('parse_cache', lambda: {'memory': {'hits': cache.hits, 'misses': cache.misses,
+                                                         'bytes': cache.nbytes}})
+    path = tmp_path / 'snapshot.json'
+    metrics.write_snapshot(str(path), registry)
+    snapshot = metrics.read_snapshot(str(path))
+    text = metrics.render(snapshot, now=snapshot['time'])
+    assert 'data_clean_active_sessions 2' in text
+    assert 'data_clean_session_dataframe_bytes{session="01234567"} 1000' in text
+    assert 'data_clean_dataframe_bytes 1500' in text
+    # buckets are cumulative and end with +Inf
+    assert 'data_clean_operation_seconds_bucket{operation="knn_impute",le="0.25"} 0' in text
+    assert 'data_clean_operation_seconds_bucket{operation="knn_impute",le="0.5"} 1' in text
+    assert 'data_clean_operation_seconds_bucket{operation="knn_impute",le="+Inf"} 2' in text
+    assert 'data_clean_operation_seconds_count{operation="knn_impute"} 2' in text
+    assert 'data_clean_operation_errors_total{operation="export \\"csv\\""} 1' in text
+    assert 'data_clean_parse_cache_hit_ratio{tier="memory"} 0.5' in text
+    assert metrics.read_snapshot(str(tmp_path / 'missing.json')) is None
+
+
+def test_readiness_fails_over_budget_or_when_stale(monkeypatch):
+    snapshot = _registry().snapshot(now=1000.0)
+    snapshot.update(rss_bytes=900, memory_budget_bytes=1000)
+    assert metrics.readiness(snapshot, now=1001.0) == (True, 'ok')
+    snapshot['rss_bytes'] = 1100
+    ready, reason = metrics.readiness(snapshot, now=1001.0)
+    assert not ready and 'budget' in reason
+    assert 'data_clean_ready 0' in metrics.render(snapshot, now=1001.0)
+    snapshot['rss_bytes'] = 900
+    assert not metrics.readiness(snapshot, now=1000.0 + metrics.STALE_SECONDS + 1)[0]
+    assert not metrics.readiness(None)[0]
+    monkeypatch.setenv('DATA_CLEAN_MEMORY_BUDGET_MB', '1.5')
+    assert metrics.memory_budget() == 1.5 * 1024**2
+
+
+def test_idle_sessions_are_dropped():
+    registry = _registry()
+    later = registry.snapshot()['time'] + metrics.SESSION_IDLE_SECONDS + 1
+    assert registry.snapshot(now=later)['sessions'] == {}
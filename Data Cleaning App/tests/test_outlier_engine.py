@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules import cleaning
+from modules.outlier_engine import bounds_from_stats, isolation_forest_mask, outlier_bounds, outlier_mask
+from modules.stats import ColumnStats
+
+
+def _frame(n=5000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'x': rng.normal(size=n), 'y': rng.normal(10, 2, n), 'name': 'a'})
+    df.loc[[3, 7], 'x'] = [50.0, -40.0]
+    df.loc[[3, 7, 11], 'y'] = [-30.0, 100.0, np.nan]
+    return df
+
+
+def test_bounds_match_per_column_definitions():
+    df = _frame()
+    iqr = outlier_bounds(df)
+    assert list(iqr.index) == ['x', 'y']
+    assert tuple(iqr.loc['x']) == pytest.approx(cleaning.iqr_bounds(df['x']))
+
+    z = outlier_bounds(df, ['y'], method='zscore', k=2)
+    assert z.at['y', 'upper'] == pytest.approx(df['y'].mean() + 2 * df['y'].std())
+
+    mad = outlier_bounds(df, ['x'], method='mad')
+    median = df['x'].median()
+    spread = 3.5 * 1.4826 * (df['x'] - median).abs().median()
+    assert tuple(mad.loc['x']) == pytest.approx((median - spread, median + spread))
+    with pytest.raises(ValueError):
+        outlier_bounds(df, method='nope')
+
+
+def test_sketch_bounds_from_chunks_are_close():
+    df = _frame()
+    stats = {col: ColumnStats() for col in ('x', 'y')}
+    for start in range(0, len(df), 700):
+        for col in stats:
+            stats[col].update(df[col].iloc[start:start + 700])
+    for method in ('iqr', 'zscore', 'mad'):
+        exact = outlier_bounds(df, ['x', 'y'], method=method)
+        approx = bounds_from_stats(stats, method=method)
+        np.testing.assert_allclose(approx.to_numpy(), exact.to_numpy(), atol=0.25)
+
+
+def test_combined_mask_and_treatment():
+    df = _frame()
+    bounds = outlier_bounds(df, ['x', 'y'], method='zscore')
+    mask = outlier_mask(df, bounds)
+    assert mask.loc[[3, 7], 'x'].all() and mask.at[7, 'y'] and not mask.at[11, 'y']
+
+    removed = cleaning.treat_outlier_columns(df, method='zscore')
+    assert len(removed) == len(df) - mask.to_numpy().any(axis=1).sum()
+    assert not {3, 7} & set(removed.index)
+
+    capped = cleaning.treat_outlier_columns(df, ['x'], method='zscore', action='cap')
+    assert capped['x'].max() == pytest.approx(bounds.at['x', 'upper'])
+    assert np.shares_memory(capped['y'].to_numpy(), df['y'].to_numpy())
+    replaced = cleaning.apply_step(df, {'op': 'treat_outlier_columns', 'columns': ['x'], 'action': 'median'})
+    assert replaced.at[3, 'x'] == pytest.approx(df['x'].median())
+
+
+def test_isolation_forest():
+    df = _frame()
+    anomalous = isolation_forest_mask(df, ['x', 'y'], contamination=0.001)
+    assert anomalous[[3, 7]].all()
+    assert anomalous.sum() <= 10
+    assert len(cleaning.remove_anomalies(df, ['x', 'y'], contamination=0.001)) == len(df) - anomalous.sum()
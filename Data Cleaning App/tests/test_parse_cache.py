@@ -0,0 +1,59 @@
+import pandas as pd
+from modules.parse_cache import DiskCache, ParseCache, content_key
+
+
+def test_content_key_depends_on_bytes_and_options():
+    assert content_key(b'a,b\n1,2\n', name='csv') == content_key(b'a,b\n1,2\n', name='csv')
+    assert content_key(b'a,b\n1,2\n', name='csv') != content_key(b'a,b\n1,3\n', name='csv')
+    assert content_key(b'a,b\n1,2\n', name='csv') != content_key(b'a,b\n1,2\n', name='json')
+
+
+def test_lru_eviction_and_copies():
+    df = pd.DataFrame({'a': range(100)})
+    size = int(df.memory_usage(deep=True).sum())
+    cache = ParseCache(max_bytes=size * 2)
+    calls = []
+
+    def parse():
+        calls.append(1)
+        return df
+
+    first = cache.get_or_parse('one', parse)
+    first.loc[0, 'a'] = -1
+    again = cache.get_or_parse('one', parse)
+    assert len(calls) == 1
+    assert again.loc[0, 'a'] == 0
+    assert cache.hits == 1 and cache.misses == 1
+
+    cache.put('two', df)
+    cache.get('one')
+    cache.put('three', df)
+    # 'two' was least recently used
+    assert cache.get('two') is None
+    assert cache.get('one') is not None
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_disk_tier_survives_a_fresh_memory_cache(tmp_path, monkeypatch):
+    from modules import parse_cache
+
+    df = pd.DataFrame({'a': range(100), 'b': ['x'] * 100})
+    disk = DiskCache(path=str(tmp_path), max_bytes=10**6)
+    monkeypatch.setattr(parse_cache, '_disk_cache', disk)
+    calls = []
+
+    def parse():
+        calls.append(1)
+        return df
+
+    ParseCache().get_or_parse('key', parse, persist=True)
+    again = ParseCache().get_or_parse('key', parse, persist=True)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(again, df)
+    # object columns mixing numbers and text are simply not kept on disk
+    disk.put('mixed', pd.DataFrame({'m': [1, 'x']}))
+    assert disk.get('mixed') is None
+
+    disk.max_bytes = 1
+    disk.put('other', df)
+    assert disk.get('key') is None
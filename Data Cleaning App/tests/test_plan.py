@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from modules import cleaning
+from modules.plan import CleaningPlan
+
+
+def _messy(n=1000):
+    rng = np.random.default_rng(0)
+    tokens = np.array([' 12 ', 'NA', 'twenty-two', ' x', 'null', '3', ' forty ', None], dtype=object)
+    return pd.DataFrame({
+        'a': tokens[rng.integers(0, len(tokens), n)],
+        'b': tokens[rng.integers(0, len(tokens), n)],
+        'c': rng.normal(size=n),
+    })
+
+
+def test_fused_plan_matches_sequential_steps():
+    df = _messy()
+    plan = CleaningPlan()
+    plan.add('strip_spaces', ['a', 'b'])
+    plan.add('replace_null_strings', ['a', 'b'])
+    plan.add('convert_text_numbers', ['a'])
+    plan.add('clip', ['a', 'c'], lower=0, upper=20)
+    plan.add('remove_duplicates')
+
+    assert [kind for kind, _ in plan.stages()] == ['columns', 'frame']
+
+    expected = cleaning.strip_spaces(df, ['a', 'b'])
+    expected = cleaning.replace_null_strings(expected, ['a', 'b'])
+    expected = cleaning.convert_text_numbers(expected, 'a')
+    expected = cleaning.apply_to_columns(expected, cleaning.clip_series, ['a', 'c'], lower=0, upper=20)
+    expected = cleaning.remove_duplicates(expected)
+
+    timings = []
+    out = plan.execute(df, timings=timings)
+    pd.testing.assert_frame_equal(out, expected)
+    assert len(timings) == 2
+    # the input frame is untouched
+    pd.testing.assert_frame_equal(df, _messy())
+
+
+def test_untargeted_step_is_not_fused_behind_numeric_conversion():
+    plan = CleaningPlan.from_steps([
+        {'op': 'convert_text_numbers', 'column': 'a'},
+        {'op': 'strip_spaces'},
+    ])
+    assert len(plan.stages()) == 2
+    out = plan.execute(_messy())
+    assert out['a'].dtype.kind == 'f'
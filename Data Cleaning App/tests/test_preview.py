@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from modules import preview
+from modules.preview import get_page, row_positions
+
+
+def _frame():
+    return pd.DataFrame({'a': [3, 1, np.nan, 2], 'b': ['apple', 'Banana', None, 'cherry']})
+
+
+def test_row_positions_sort_and_filter():
+    df = _frame()
+    assert row_positions(df).tolist() == [0, 1, 2, 3]
+    assert row_positions(df, sort_by='a').tolist() == [1, 3, 0, 2]
+    assert row_positions(df, sort_by='a', ascending=False).tolist() == [0, 3, 1, 2]
+    # case-insensitive, and missing values never match
+    assert row_positions(df, filter_column='b', filter_text='AN').tolist() == [1]
+    assert row_positions(df, filter_column='b', filter_text='none').tolist() == []
+
+
+def test_get_page_serializes_only_the_window():
+    df = pd.DataFrame({'x': np.arange(1000), 'y': np.arange(1000) * 2, 'z': ['t'] * 1000})
+    table, total = get_page(df, page=2, page_size=10, columns=['y'])
+    assert total == 1000
+    assert table.num_rows == 10
+    page = table.to_pandas()
+    assert page['y'].tolist() == list(range(40, 60, 2))
+    assert page.index.tolist() == list(range(20, 30))
+
+
+def test_pages_are_cached_per_frame():
+    df = pd.DataFrame({'x': np.arange(100)})
+    first, _ = get_page(df, page=1, page_size=10)
+    again, _ = get_page(df, page=1, page_size=10)
+    assert again is first
+    # an equal but different frame is not served from the cache
+    other, _ = get_page(df.copy(), page=1, page_size=10)
+    assert other is not first
+
+
+def test_mixed_object_column_falls_back_to_text():
+    df = pd.DataFrame({'m': [1, 'two', 3.5, None]})
+    table, _ = get_page(df)
+    assert table.to_pandas()['m'].tolist()[:3] == ['1', 'two', '3.5']
+    preview._pages.clear()
+    assert len(preview._pages) == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from modules import cleaning, profiling
+from modules.profiling import profile_column, wilson_interval
+
+
+def test_kinds_of_small_column_are_exact():
+    series = pd.Series(['12', '3.5', 'twenty-two', '2024-01-31', 'NULL', 'hello', None])
+    profile = profile_column(series)
+    assert profile.exact and profile.missing == 1
+    assert profile.counts == {'numeric': 2, 'word_number': 1, 'date': 1, 'null_token': 1, 'text': 1}
+    assert profile.kind == 'numeric'
+    assert profile.mixed
+
+
+def test_mixed_matches_full_scan_rule():
+    df = pd.DataFrame({
+        'name': ['Ali', 'Sara', 'Bob'],
+        'age': ['20', 'twenty-two', '30'],
+        'code': ['1', '2', '3'],
+        'city': ['Lahore', None, 'Karachi'],
+        'n': [1, 2, 3],
+    })
+    assert cleaning.find_mixed_columns(df) == ['age', 'city']
+
+
+def test_large_column_is_sampled():
+    rng = np.random.default_rng(1)
+    series = pd.Series(rng.choice(['alpha', 'beta', 'gamma'], 500_000))
+    profile = profile_column(series)
+    assert not profile.exact and profile.sampled < len(series)
+    low, high = profile.bounds['text']
+    assert low <= 1.0 <= high + 1e-9
+    assert not profile.mixed
+    # a handful of digits among half a million words still makes it mixed
+    series.iloc[-5:] = '42'
+    assert profile_column(series.copy()).mixed
+
+
+def test_rare_word_numbers_in_large_column_are_mixed():
+    series = pd.Series(np.arange(500_000).astype(str), dtype=object)
+    assert not profile_column(series).mixed
+    series.iloc[[10, 250_000]] = 'twenty'
+    profile = profile_column(series.copy())
+    assert not profile.exact and profile.mixed
+    assert cleaning.find_mixed_columns(pd.DataFrame({'age': series})) == ['age']
+
+
+def test_profiles_are_reused_for_unchanged_columns():
+    df = pd.DataFrame({'a': ['x', 'y'] * 50, 'b': ['1', 'one'] * 50})
+    profiling._cache.clear()
+    cleaning.find_mixed_columns(df)
+    df = cleaning.strip_spaces(df, ['a'])
+    cleaning.find_mixed_columns(df)
+    assert profiling._cache.misses == 3 and profiling._cache.hits == 1
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(0, 4000)
+    assert low == 0 and high < 0.001
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
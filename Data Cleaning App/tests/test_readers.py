@@ -0,0 +1,122 @@
+import io
+import json
+import tracemalloc
+
+import pandas as pd
+import pytest
+from modules import readers
+from modules.readers import excel_header, excel_sheets, is_ndjson, json_fields, read_excel, read_file, read_json
+
+
+@pytest.fixture
+def workbook():
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Sales'
+    ws.append(['id', 'region', None, 'amount'])
+    ws.append([1, 'north', 'x', 10.5])
+    ws.append([2, 'N/A', None, 'NA'])
+    ws.append([3, 'south', 'y', 7.0])
+    ws.append([None, None, None, None])
+    other = wb.create_sheet('Returns')
+    other.append(['id', 'amount', 'reason'])
+    other.append([4, -2.0, 'damaged'])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def test_sheets_and_headers(workbook):
+    assert excel_sheets(workbook) == [('Sales', 5, 4), ('Returns', 2, 3)]
+    assert excel_header(workbook, 'Sales') == ['id', 'region', 'Unnamed: 2', 'amount']
+
+
+def test_first_sheet_matches_pandas_with_null_tokens(workbook):
+    df = read_excel(workbook, chunk_rows=2)
+    expected = pd.read_excel(io.BytesIO(workbook), na_values=['N/A', 'NA'])
+    # trailing empty rows are dropped
+    expected = expected.dropna(how='all')
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert df['amount'].dtype == 'float64'
+    assert read_file(workbook, 'book.xlsx').shape == df.shape
+
+
+def test_selected_sheets_and_columns(workbook):
+    df = read_excel(workbook, sheets=['Sales', 'Returns'], columns=['id', 'amount'])
+    assert list(df.columns) == ['sheet', 'id', 'amount']
+    assert df['sheet'].tolist() == ['Sales'] * 3 + ['Returns']
+    assert df['amount'].tolist()[-1] == -2.0
+    assert read_excel(workbook, columns=['amount']).columns.tolist() == ['amount']
+
+
+def _records():
+    return [{'id': i, 'user': {'name': f'u{i}', 'geo': {'lat': i / 2}}, 'tags': ['a', 'b'], 'when': '2020-01-01'}
+            for i in range(5)]
+
+
+def test_ndjson_is_detected_and_flattened_like_a_json_array():
+    records = _records()
+    ndjson = '\n'.join(json.dumps(r) for r in records).encode()
+    array = json.dumps(records, indent=2).encode()
+    assert is_ndjson(ndjson) and not is_ndjson(array)
+
+    df = read_json(ndjson, chunk_rows=2)
+    assert list(df.columns) == ['id', 'user.name', 'user.geo.lat', 'tags', 'when']
+    assert df['user.geo.lat'].dtype == 'float64'
+    # lists become JSON text, ISO dates stay text as with CSV
+    assert df.loc[0, 'tags'] == '["a", "b"]'
+    assert df.loc[0, 'when'] == '2020-01-01'
+    pd.testing.assert_frame_equal(read_json(array, chunk_rows=2), df)
+    assert json_fields(ndjson) == list(df.columns)
+
+
+def test_json_fields_read_only_the_first_records(tmp_path):
+    lines = [json.dumps(r) for r in _records()[:2]] + ['{not json'] * 1000
+    path = tmp_path / 'big.jsonl'
+    path.write_text('\n'.join(lines))
+    assert json_fields(path, sample_rows=2) == ['id', 'user.name', 'user.geo.lat', 'tags', 'when']
+    with open(path, 'rb') as fh:
+        assert json_fields(fh, sample_rows=2, ndjson=True) == ['id', 'user.name', 'user.geo.lat', 'tags', 'when']
+
+
+def test_json_array_records_across_block_boundaries(monkeypatch):
+    monkeypatch.setattr(readers, 'JSON_BLOCK_BYTES', 7)
+    values = [{'name': 'Zoë ☃', 'n': 12345}, 678, 'x,]', None, [1, {'a': 2.5}], 9]
+    text = json.dumps(values, ensure_ascii=False).encode('utf-8-sig')
+    df = read_json(text, chunk_rows=2)
+    assert df['name'].tolist()[0] == 'Zoë ☃'
+    monkeypatch.undo()
+    pd.testing.assert_frame_equal(df, read_json(text, chunk_rows=2))
+    assert read_json(b' [ ] ').empty
+    with pytest.raises(ValueError):
+        read_json(b'[{"a": 1}, {"a": 2}')
+
+
+def test_json_array_is_not_read_whole(tmp_path):
+    path = tmp_path / 'big.json'
+    records = _records()
+    path.write_text(json.dumps(records * 40_000))
+    assert path.stat().st_size > 16 * 1024**2
+    tracemalloc.start()
+    try:
+        assert json_fields(path, sample_rows=10) == ['id', 'user.name', 'user.geo.lat', 'tags', 'when']
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # a few blocks, not the whole file
+    assert peak < 8 * 1024**2
+
+
+def test_json_field_selection_and_mixed_types():
+    records = _records()
+    records[3]['id'] = 'three'
+    ndjson = '\n'.join(json.dumps(r) for r in records).encode()
+    df = read_json(ndjson, fields=['id', 'user.geo'], chunk_rows=2)
+    assert list(df.columns) == ['id', 'user.geo.lat']
+    # a field that is a number in one record and text in another becomes text
+    assert df['id'].tolist() == ['0', '1', '2', 'three', '4']
+    assert read_file(ndjson, 'events.jsonl').shape == (5, 5)
+    # pandas' column-oriented JSON still loads
+    assert read_file(pd.DataFrame({'a': [1, 2]}).to_json().encode(), 'frame.json')['a'].tolist() == [1, 2]
@@ -0,0 +1,109 @@
+import gc
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from modules import cleaning
+from modules.history import DatasetHistory
+from modules.session_data import SessionDataManager
+
+
+def _frame(n=1000):
+    return pd.DataFrame({
+        'a': np.arange(n, dtype='float64'),
+        'mixed': pd.Series([1, 'x'] * (n // 2), dtype=object),
+        'cat': pd.Categorical(['u', 'v'] * (n // 2)),
+        's': pd.Series(['p', None] * (n // 2), dtype='string[pyarrow]'),
+        'i': pd.array([1, None] * (n // 2), dtype='Int64'),
+        't': pd.date_range('2020-01-01', periods=n, tz='UTC'),
+    }, index=pd.RangeIndex(n, name='row'))
+
+
+def _load(manager, df):
+    data = manager.create()
+    history = DatasetHistory(df)
+    data.history, data.df, data.df_original = history, df, df
+    data.commit(cleaning.apply_to_columns(df, cleaning.clip_series, ['a'], lower=10), 'clip')
+    return data
+
+
+def test_history_spills_each_buffer_once_and_reloads(tmp_path):
+    df = _frame()
+    history = DatasetHistory(df)
+    changed = cleaning.apply_to_columns(df, cleaning.clip_series, ['a'], lower=10)
+    history.commit(changed, 'clip')
+    held = history.nbytes
+    history.spill(str(tmp_path / 'h'))
+    assert history.spilled and history.nbytes == 0
+    # six shared columns, one changed column and the shared index
+    assert len(os.listdir(tmp_path / 'h')) == 8
+
+    pd.testing.assert_frame_equal(history.current(), changed)
+    # buffers shared before the spill are shared again (categories lose only their hash table)
+    assert not history.spilled and history.nbytes == pytest.approx(held, rel=0.01)
+    assert not (tmp_path / 'h').exists()
+    pd.testing.assert_frame_equal(history.undo(), df)
+    pd.testing.assert_frame_equal(history.original(), df)
+
+
+def test_manager_spills_least_recently_used_within_budget(tmp_path):
+    manager = SessionDataManager(max_bytes=10**12, idle_seconds=3600, spill_root=str(tmp_path))
+    first, second = _load(manager, _frame()), _load(manager, _frame())
+    expected = first.df
+    manager.max_bytes = first.nbytes + second.nbytes - 1
+    second.df
+    manager.enforce(keep=second)
+    assert first.spilled and not second.spilled
+    assert first.nbytes == 0 and manager.stats()['spilled_sessions'] == 1
+
+    # reading the data reloads it
+    pd.testing.assert_frame_equal(first.df, expected)
+    pd.testing.assert_frame_equal(first.df_original, _frame())
+    assert not first.spilled and manager.reloads == 1
+    # the session running is never spilled, even when it alone is over budget
+    manager.max_bytes = 0
+    manager.enforce(keep=first)
+    assert second.spilled and not first.spilled
+
+
+def test_idle_sessions_spill_and_discarded_sessions_leave_no_files(tmp_path):
+    (tmp_path / '999999999').mkdir()
+    manager = SessionDataManager(idle_seconds=0, spill_root=str(tmp_path))
+    # directories of processes that are gone are removed at start-up
+    assert not (tmp_path / '999999999').exists()
+    data = _load(manager, _frame())
+    manager.enforce()
+    assert data.spilled and os.listdir(data.spill_path)
+    path = data.spill_path
+    del data
+    gc.collect()
+    assert not os.path.exists(path) and manager.sessions() == []
+
+
+def test_commits_and_undo_are_safe_while_other_sessions_enforce(tmp_path):
+    manager = SessionDataManager(max_bytes=0, idle_seconds=3600, spill_root=str(tmp_path))
+    data = _load(manager, _frame())
+    stop = threading.Event()
+
+    def enforce():
+        while not stop.is_set():
+            # another session's run spills this one whenever it can
+            manager.enforce()
+
+    thread = threading.Thread(target=enforce)
+    thread.start()
+    try:
+        for i in range(30):
+            data.commit(cleaning.apply_to_columns(data.df, cleaning.clip_series, ['a'], lower=20 + i), f'clip {i}')
+            if i % 3 == 2:
+                data.undo()
+                data.redo()
+    finally:
+        stop.set()
+        thread.join()
+    assert len(data.history) == 32
+    assert data.df['a'].min() == 49
+    pd.testing.assert_frame_equal(data.undo(), data.history.current())
+    assert data.df['a'].min() == 48
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+from modules import sources
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    root = tmp_path / 'data'
+    (root / 'nested').mkdir(parents=True)
+    monkeypatch.setenv(sources.DATA_DIR_ENV, str(root))
+    return root
+
+
+def test_only_allow_listed_files_are_listed_and_opened(data_dir, tmp_path):
+    pd.DataFrame({'a': [1, 2]}).to_csv(data_dir / 'one.csv', index=False)
+    pd.DataFrame({'a': [1, 2]}).to_parquet(data_dir / 'nested' / 'two.parquet')
+    (data_dir / 'notes.txt').write_text('skip me')
+    outside = tmp_path / 'secret.csv'
+    outside.write_text('a\n1\n')
+    os.symlink(outside, data_dir / 'link.csv')
+
+    labels = [label for label, _, _ in sources.list_files()]
+    assert labels == [os.path.join('data', 'one.csv'), os.path.join('data', 'nested', 'two.parquet')]
+    with pytest.raises(PermissionError):
+        sources.ServerFile(data_dir / 'link.csv')
+    with pytest.raises(PermissionError):
+        sources.ServerFile(str(data_dir / '..' / 'secret.csv'))
+    server_file = sources.ServerFile(data_dir / 'one.csv')
+    assert server_file.name == 'one.csv' and server_file.getvalue() == b'a\n1\n2\n'
+
+
+def test_arrow_files_are_memory_mapped(data_dir):
+    df = pd.DataFrame({'a': np.arange(100_000), 'b': np.random.rand(100_000), 'c': ['x', 'y'] * 50_000})
+    path = str(data_dir / 'frame.feather')
+    feather.write_feather(df, path, compression='uncompressed', chunksize=len(df))
+    df.to_parquet(data_dir / 'frame.parquet')
+
+    schema, rows = sources.arrow_schema(path)
+    assert rows == len(df) and schema.names[:3] == ['a', 'b', 'c']
+    before = pa.total_allocated_bytes()
+    back = sources.read_arrow(path, columns=['a', 'b'])
+    # numeric columns point into the mapped file instead of new buffers
+    assert pa.total_allocated_bytes() - before < df[['a', 'b']].memory_usage().sum() / 10
+    pd.testing.assert_frame_equal(back, df[['a', 'b']])
+    pd.testing.assert_frame_equal(sources.read_arrow(data_dir / 'frame.parquet', columns=['c']), df[['c']])
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules import cleaning, stats
+from modules.stats import ColumnStats, DistinctSketch, QuantileSketch
+
+
+def _frame(n=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'x': rng.normal(size=n),
+        'y': pd.array(rng.integers(0, 10, n), dtype='Int64'),
+        's': rng.choice(['a', 'b', None], n),
+    })
+
+
+def test_describe_and_nulls_match_pandas():
+    df = _frame()
+    df.loc[::7, 'x'] = np.nan
+    pd.testing.assert_frame_equal(stats.describe(df), df.describe().T, check_dtype=False)
+    pd.testing.assert_series_equal(stats.null_counts(df), df.isnull().sum(), check_dtype=False)
+    q1, q3 = df['x'].quantile([0.25, 0.75])
+    assert cleaning.iqr_bounds(df['x']) == pytest.approx((q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)))
+    assert stats.distinct_count(df['s']) == df['s'].nunique()
+
+
+def test_only_changed_columns_are_recomputed():
+    df = _frame()
+    stats._cache.clear()
+    stats.describe(df)
+    assert stats._cache.misses == 2
+    df = cleaning.normalize(df, ['x'])
+    stats.describe(df)
+    assert stats._cache.misses == 3 and stats._cache.hits >= 1
+
+
+@pytest.mark.parametrize('dtype', ['float64', 'Float64', 'double[pyarrow]'])
+def test_strided_view_is_not_a_cached_slice(dtype):
+    df = pd.DataFrame({'x': np.arange(10.)}).astype(dtype)
+    # both start at the first row's address and have five rows
+    assert stats.describe(df.iloc[:5]).loc['x', 'mean'] == 2.0
+    assert stats.describe(df.iloc[::2]).loc['x', 'mean'] == 4.0
+    assert stats.describe(df.iloc[5:]).loc['x', 'mean'] == 7.0
+
+
+def test_chunked_stats_merge():
+    values = pd.Series(np.random.default_rng(1).exponential(size=50_000))
+    values.iloc[::10] = np.nan
+    merged = ColumnStats()
+    for start in range(0, len(values), 4096):
+        merged.update(values.iloc[start:start + 4096])
+    assert merged.count == values.count() and merged.nulls == values.isna().sum()
+    assert merged.mean == pytest.approx(values.mean())
+    assert merged.std == pytest.approx(values.std())
+    assert merged.min == values.min() and merged.max == values.max()
+    present = np.sort(values.dropna().to_numpy())
+    for q in (0.05, 0.5, 0.95):
+        rank = np.searchsorted(present, merged.quantile(q)) / len(present)
+        assert abs(rank - q) < 0.02
+
+
+def test_distinct_sketch():
+    sketch = DistinctSketch(k=256)
+    sketch.update(np.arange(100))
+    assert sketch.estimate() == 100
+    for start in range(0, 100_000, 10_000):
+        sketch.update(np.arange(start, start + 10_000))
+    assert abs(sketch.estimate() - 100_000) / 100_000 < 0.2
+    assert np.isnan(QuantileSketch().quantile(0.5))
@@ -0,0 +1,46 @@
+import io
+from modules.streaming import stream_csv, stream_json
+
+
+def test_stream_csv_summary(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATA_CLEAN_WORKDIR', str(tmp_path))
+    csv = "name,age,score\nAli,20,88\nSara,NA,92\nAli,20,88\nBob,19,1.5\nBob,19,1.5\n"
+    dataset = stream_csv(io.StringIO(csv), chunk_rows=2)
+
+    summary = dataset.summary
+    assert summary.rows == 5
+    assert summary.null_counts == {'name': 0, 'age': 1, 'score': 0}
+    # int chunks and float chunks merge to float
+    assert summary.dtypes['score'] == 'float64'
+    assert summary.dtypes['age'] == 'float64'
+    assert summary.duplicate_rows == 2
+    assert len(dataset.parts) == 3
+    # numeric columns carry mergeable statistics; age has a null in one chunk
+    assert set(summary.numeric_stats()) == {'age', 'score'}
+    assert summary.stats['score'].max == 92.0
+    assert summary.stats['age'].count == 4
+
+    full = dataset.to_pandas()
+    assert full['score'].tolist() == [88.0, 92.0, 88.0, 1.5, 1.5]
+
+    cleaned = dataset.map_chunks(lambda chunk: chunk.dropna())
+    assert cleaned.summary.rows == 4
+    assert cleaned.summary.duplicate_rows == 2
+    dataset.cleanup()
+    cleaned.cleanup()
+
+
+def test_stream_json_adds_fields_seen_later(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATA_CLEAN_WORKDIR', str(tmp_path))
+    lines = [b'{"id": 1, "user": {"name": "a"}}', b'{"id": 2, "user": {"name": "b"}}',
+             b'{"id": 3, "user": {"name": "c", "age": 30}}']
+    dataset = stream_json(b'\n'.join(lines), chunk_rows=2)
+
+    summary = dataset.summary
+    assert summary.columns == ['id', 'user.name', 'user.age']
+    assert summary.null_counts['user.age'] == 2
+    assert summary.dtypes['user.age'] == 'float64'
+    full = dataset.to_pandas()
+    assert full['user.age'].isna().tolist() == [True, True, False]
+    assert list(dataset.head(1).columns) == summary.columns
+    dataset.cleanup()
@@ -8,3 +8,16 @@ def test_simple_numbers():
     assert text_to_number('eighty') == 80
     assert text_to_number(None) is None
     assert text_to_number('unknown') is None
+
+
+def test_larger_numbers_decimals_and_ordinals():
+    assert text_to_number('two thousand five hundred') == 2500
+    assert text_to_number('one million') == 1000000
+    assert text_to_number('one hundred and five') == 105
+    assert text_to_number('3.5') == 3.5
+    assert text_to_number('three point one four') == 3.14
+    assert text_to_number('1,250') == 1250
+    assert text_to_number('twenty-first') == 21
+    assert text_to_number('3rd') == 3
+    assert text_to_number('minus five') == -5
+    assert text_to_number('point') is None
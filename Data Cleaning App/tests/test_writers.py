@@ -0,0 +1,103 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from modules import writers
+from modules.readers import write_file
+
+
+def _frame(n=250):
+    df = pd.DataFrame({
+        'a': np.arange(n),
+        'b': pd.Series(['x', None] * (n // 2), dtype=object),
+        'c': pd.Categorical(['u', 'v'] * (n // 2)),
+        'mixed': [1, 's'] * (n // 2),
+        'd': pd.date_range('2020-01-01', periods=n),
+    })
+    df.loc[:120, 'b'] = None
+    return df
+
+
+def _read(data, fmt):
+    if fmt == 'parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    if fmt == 'feather':
+        return pd.read_feather(io.BytesIO(data))
+    if fmt == 'xlsx':
+        return pd.read_excel(io.BytesIO(data))
+    if fmt == 'csv.zst':
+        return pd.read_csv(pa.CompressedInputStream(pa.py_buffer(data), 'zstd'))
+    return pd.read_csv(io.BytesIO(data), compression='gzip' if fmt == 'csv.gz' else None)
+
+
+@pytest.mark.parametrize('fmt', list(writers.EXPORT_FORMATS))
+def test_round_trip_in_chunks(fmt):
+    df = _frame()
+    rows = []
+    with writers.export_to_spool(df, fmt, chunk_rows=100, progress=rows.append) as spool:
+        back = _read(spool.read(), fmt)
+    assert rows == [100, 200, 250]
+    assert back.shape == df.shape
+    assert back['a'].tolist() == df['a'].tolist()
+    assert back['b'].isna().sum() == df['b'].isna().sum()
+    # the object column mixing ints and strings is written as text
+    assert back['mixed'].astype(str).tolist() == df['mixed'].astype(str).tolist()
+    if fmt in ('parquet', 'feather', 'xlsx'):
+        pd.testing.assert_series_equal(back['d'], df['d'])
+    if fmt in ('parquet', 'feather'):
+        assert back['c'].dtype == 'category'
+
+
+def test_csv_matches_pandas_and_chunk_iterables():
+    df = _frame()
+    spool = writers.export_to_spool(iter([df.iloc[:10], df.iloc[10:]]), 'csv')
+    assert spool.read().decode('utf-8') == df.to_csv(index=False)
+    empty = writers.export_to_spool(df.iloc[:0], 'csv')
+    assert empty.read().decode('utf-8') == df.iloc[:0].to_csv(index=False)
+    with pytest.raises(ValueError):
+        writers.export_to_spool(iter([]), 'parquet')
+    with pytest.raises(ValueError):
+        writers.export_to_spool(df, 'xml')
+
+
+def test_export_to_file_writes_chunks_and_removes_failed_files(tmp_path):
+    df = _frame()
+    path = tmp_path / 'out.csv'
+    size = writers.export_to_file(iter([df.iloc[:10], df.iloc[10:]]), 'csv', path)
+    assert size == path.stat().st_size
+    assert path.read_text() == df.to_csv(index=False)
+    with pytest.raises(ValueError):
+        writers.export_to_file(iter([]), 'parquet', tmp_path / 'empty.parquet')
+    assert not (tmp_path / 'empty.parquet').exists()
+
+
+def test_write_file_infers_compound_extensions(tmp_path):
+    df = _frame()
+    path = write_file(df, tmp_path / 'out.csv.gz')
+    back = pd.read_csv(path)
+    assert back.shape == df.shape
+    write_file(df, tmp_path / 'out.feather')
+    assert len(pd.read_feather(tmp_path / 'out.feather')) == len(df)
+
+
+def test_excel_splits_sheets_and_streams_rows():
+    df = pd.DataFrame({'a': [1.5, np.nan, 3.0, 4.0, 5.0], 'b': ['x', None, 'z', 'w', 'v'],
+                       't': pd.date_range('2020-01-01', periods=5, tz='UTC')})
+    rows = []
+    buffer = io.BytesIO()
+    writers.write_excel({'Cleaned': df, 'Original': df.iloc[:2]}, buffer, chunk_rows=2, max_rows=3,
+                        progress=rows.append)
+    sheets = pd.read_excel(io.BytesIO(buffer.getvalue()), sheet_name=None)
+    assert list(sheets) == ['Cleaned', 'Cleaned (2)', 'Cleaned (3)', 'Original']
+    back = pd.concat([sheets['Cleaned'], sheets['Cleaned (2)'], sheets['Cleaned (3)']], ignore_index=True)
+    expected = df.assign(t=df['t'].dt.tz_localize(None))
+    pd.testing.assert_frame_equal(back.fillna('-'), expected.fillna('-'), check_dtype=False)
+    assert rows == [2, 4, 5, 7]
+
+
+def test_excel_export_errors_are_raised():
+    df = pd.DataFrame({'a': ['bad \x01 control character']})
+    with pytest.raises(Exception):
+        writers.export_to_spool({'Cleaned': df}, 'xlsx')